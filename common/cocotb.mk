@@ -18,8 +18,15 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
+# shared python helpers for the benches (tb/common)
+TB_COMMON_DIR := $(abspath $(dir $(lastword $(MAKEFILE_LIST)))../tb/common)
+export PYTHONPATH := $(TB_COMMON_DIR)$(if $(PYTHONPATH),:$(PYTHONPATH))
+
 TOPLEVEL_LANG ?= vhdl
 
+# top level generics, NAME=VALUE
+SIM_ARGS += $(addprefix -g,$(GENERICS))
+
 SIM ?= ghdl
 WAVES ?= 1
 
@@ -31,6 +38,9 @@ ifeq ($(SIM), questa)
 #VHDL_GPI_INTERFACE = vhpi
 COMPILE_ARGS += -2008
 
+# compile order from the sources, cocotb passes them to a single vcom call
+VHDL_SOURCES := $(shell python3 $(TB_COMMON_DIR)/../../common/vhdl_deps.py order $(VHDL_SOURCES))
+
 else ifeq ($(SIM), ghdl)
 
 COMPILE_ARGS += --std=08
@@ -39,7 +49,69 @@ SIM_ARGS += --wave=${MODULE}.ghw
 
 endif
 
+# clocks and resets generated in VHDL by the wrapper of the bench, a bench
+# Makefile that has one names it in HDL_CLK_WRAPPER
+HDL_CLOCKS ?= 0
+ifeq ($(HDL_CLK_WRAPPER),)
+override HDL_CLOCKS := 0
+endif
+export HDL_CLOCKS
+
+# benchmark results database, "make results" stores the last run
+BENCH_RESULTS_DB ?= $(abspath $(TB_COMMON_DIR)/../../bench_results.db)
+export BENCH_METRICS_FILE ?= $(abspath bench_metrics.jsonl)
+
+# binary frame trace, render with tb/common/trace_recorder.py
+export TB_TRACE_FILE ?= $(abspath trace.bin)
+
+# hang watchdog, see tb/common/watchdog.py: simulated time budgets are scaled
+# by TB_WATCHDOG_MARGIN, a simulator whose time stops advancing for
+# TB_STALL_TIMEOUT wall seconds exits with status 124
+export TB_WATCHDOG_MARGIN ?= 2
+export TB_STALL_TIMEOUT ?= 300
+
+# idle fast-forward, see tb/common/quiescence.py: TB_FAST_FORWARD=0 steps every
+# idle cycle, for comparing wall times
+export TB_FAST_FORWARD ?= 1
+
+# MII benches, see tb/common/gmii_speed.py: TB_TIME_COMPRESS=0 runs 10 and
+# 100 Mb/s with clk_enable at the real rate instead of one MII speed with
+# clk_enable every second cycle
+export TB_TIME_COMPRESS ?= 1
+
+# run_test_faults, see tb/common/fault_inject.py: TB_FAULT_RATES, e.g.
+# error=0.01,no_term=0.01, replaces the default fault rate sets
+export TB_FAULT_RATES ?=
+
 include $(shell cocotb-config --makefiles)/Makefile.sim
 
+.PHONY: results
+results:
+	python3 $(TB_COMMON_DIR)/bench_results.py --db $(BENCH_RESULTS_DB) ingest --bench $(MODULE) --simulator $(SIM) \
+		--results $(COCOTB_RESULTS_FILE) --metrics $(BENCH_METRICS_FILE)
+
+# simulated ns per wall second with Python clocks and with the VHDL clock wrapper
+ifneq ($(HDL_CLK_WRAPPER),)
+.PHONY: clock_bench
+clock_bench:
+	rm -rf $(SIM_BUILD)
+	$(MAKE) HDL_CLOCKS=0 && cp $(COCOTB_RESULTS_FILE) results_py_clocks.xml
+	rm -rf $(SIM_BUILD)
+	$(MAKE) HDL_CLOCKS=1 && cp $(COCOTB_RESULTS_FILE) results_hdl_clocks.xml
+	python3 $(TB_COMMON_DIR)/bench_results.py rate results_py_clocks.xml results_hdl_clocks.xml
+endif
+
+# stream frames from an external generator through a UNIX socket into the
+# bench's run_test_cosim, see tb/common/cosim_bridge.py
+COSIM_SOCKET ?= $(abspath cosim.sock)
+COSIM_CLIENT_ARGS ?= --gen 1000 --size 64
+
+.PHONY: cosim
+cosim:
+	python3 $(TB_COMMON_DIR)/cosim_bridge.py client $(COSIM_SOCKET) $(COSIM_CLIENT_ARGS) & \
+	COSIM_SOCKET=$(COSIM_SOCKET) $(MAKE) TESTCASE=run_test_cosim_001; status=$$?; \
+	wait $$! || status=1; exit $$status
+
 clean::
-	rm -rf __pycache__
+	rm -rf __pycache__ bench_metrics.jsonl trace.bin results_py_clocks.xml results_hdl_clocks.xml \
+		results_selected.xml results_rest.xml sim_build
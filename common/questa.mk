@@ -18,26 +18,37 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
+SELF_DIR := $(dir $(lastword $(MAKEFILE_LIST)))
+
 SRC_FILES ?=
 SIM_FILES ?=
 SIM_TOP ?= unknown_tb
 WORK_LIB ?= work
 
+VCOM_ARGS ?= -suppress 1346,1236,1090 -2008
+
+# files are compiled in dependency order with a single vcom call, only the
+# ones changed since the last compile and the units depending on them
+VHDL_DEPS = python3 $(SELF_DIR)vhdl_deps.py
+VHDL_DEPS_STATE = $(WORK_LIB)/.vhdl_deps.json
+VHDL_DEPS_KEY = "$(VCOM_ARGS)"
+
 ifneq ($(GUI),)
 SIM_CMD = vsim -voptargs=+acc $(WORK_LIB).$(SIM_TOP)
 else
 SIM_CMD = vsim -c -voptargs=+acc $(WORK_LIB).$(SIM_TOP) -do "run -all; exit -f"
 endif
 
-.PHONY: sim simclean
-sim:
-	vlib $(WORK_LIB)
-	for x in $(SRC_FILES); do \
-		vcom -suppress 1346,1236,1090 -2008 -work $(WORK_LIB) $$x; \
-	done
-	for x in $(SIM_FILES); do \
-		vcom -suppress 1346,1236,1090 -2008 -work $(WORK_LIB) $$x; \
-	done
+.PHONY: compile sim simclean
+compile:
+	test -d $(WORK_LIB) || vlib $(WORK_LIB)
+	files="$$($(VHDL_DEPS) changed --state $(VHDL_DEPS_STATE) --key=$(VHDL_DEPS_KEY) $(SRC_FILES) $(SIM_FILES))"; \
+	if [ -n "$$files" ]; then \
+		vcom $(VCOM_ARGS) -work $(WORK_LIB) $$files && \
+		$(VHDL_DEPS) update --state $(VHDL_DEPS_STATE) --key=$(VHDL_DEPS_KEY) $$files; \
+	fi
+
+sim: compile
 	$(SIM_CMD)
 
 simclean:
@@ -0,0 +1,486 @@
+#!/usr/bin/env python
+"""
+Copyright (c) 2024 Marcin Zaremba
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+
+
+# Change-aware bench and test selection
+#
+#   select_tests.py index                                    benches, builds and the files they depend on
+#   select_tests.py select [--base REF] [FILE...]            benches and tests affected by a change
+#   select_tests.py run [--base REF] [--rest] [FILE...]      simulate them, with --rest the others afterwards
+#
+# The index comes from the bench Makefiles (VHDL_SOURCES, MODULE and the
+# included makefiles), the example Makefiles (SRC_FILES), the entity, package
+# and component references of the VHDL files (vhdl_deps.py) and the local
+# imports of the bench modules. Without FILE... the changed files are the
+# ones of "git diff REF" (default HEAD, the uncommitted changes) and the
+# untracked ones. An edit inside the run_test* functions of a bench module
+# selects only the tests generated from them, any other change selects the
+# whole bench. A changed file the index does not know, other than
+# documentation and style settings, selects every bench.
+#
+# Makefile conditionals are not evaluated, both branches count: the
+# HDL_CLOCKS wrapper of a bench belongs to it whether or not it is enabled.
+
+import argparse
+import ast
+import os
+import re
+import subprocess
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+import vhdl_deps
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+SEARCH_DIRS = ["tb", "examples"]
+SKIP_DIRS = {"simlib", "work", "sim_build", "__pycache__", ".git"}
+
+# changes that never alter a simulation result
+IGNORE_RES = [
+    re.compile(r"(^|/)[^/]*\.md$"),
+    re.compile(r"^LICENSE$"),
+    re.compile(r"^\.gitignore$"),
+    re.compile(r"^common/(style\.mk|vsg_config\.yaml|vivado\.mk|select_tests\.py)$"),
+    re.compile(r"^tb/pytest\.ini$"),
+]
+
+ASSIGN_RE = re.compile(r"^(?:export\s+|override\s+)?(\w+)\s*(\?=|:=|\+=|=)\s*(.*)$")
+INCLUDE_RE = re.compile(r"^-?include\s+(.*)$")
+VAR_RE = re.compile(r"\$[({](\w+)[)}]")
+HUNK_RE = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+TEST_RE = re.compile(r"^run_test\w*$")
+
+LIST_TESTS = """
+import importlib, sys
+import cocotb
+cocotb.SIM_NAME = "select_tests"
+mod = importlib.import_module(sys.argv[1])
+for name, obj in vars(mod).items():
+    if isinstance(obj, cocotb.test):
+        print(name)
+"""
+
+
+def rel(path):
+    return os.path.relpath(os.path.abspath(path), ROOT)
+
+
+def read_makefile(path):
+    """Variables and included files, conditionals ignored, simple expansion only"""
+
+    env = {}
+    includes = []
+
+    def expand(text):
+        return VAR_RE.sub(lambda m: env.get(m.group(1), ""), text)
+
+    with open(path) as f:
+        text = f.read().replace("\\\n", " ")
+
+    for line in text.splitlines():
+        if line.startswith("\t"):
+            continue
+        line = line.split("#", 1)[0].strip()
+        if not line or "$(shell" in line:
+            continue
+
+        m = INCLUDE_RE.match(line)
+        if m:
+            includes.extend(expand(m.group(1)).split())
+            continue
+
+        m = ASSIGN_RE.match(line)
+        if m:
+            name, op, value = m.groups()
+            value = expand(value).strip()
+            if op == "+=":
+                env[name] = (env.get(name, "") + " " + value).strip()
+            elif op != "?=" or name not in env:
+                env[name] = value
+
+    return env, includes
+
+
+def python_deps(path, search):
+    """The module and the local modules it imports, transitively"""
+
+    found = []
+    stack = [path]
+    while stack:
+        p = stack.pop()
+        if p in found:
+            continue
+        found.append(p)
+        try:
+            with open(p) as f:
+                tree = ast.parse(f.read(), p)
+        except (OSError, SyntaxError):
+            continue
+        names = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names.update(a.name.split(".")[0] for a in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names.add(node.module.split(".")[0])
+        for name in names:
+            for d in search:
+                cand = os.path.join(d, name + ".py")
+                if os.path.isfile(cand):
+                    stack.append(cand)
+                    break
+
+    return found
+
+
+class Target:
+    def __init__(self, path, kind, module, sources, makefiles, python):
+        self.path = path
+        self.kind = kind
+        self.module = module
+        self.sources = sources
+        self.makefiles = makefiles
+        self.python = python
+        self.files = set(sources) | set(makefiles) | set(python)
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+
+def find_makefiles():
+    for top in SEARCH_DIRS:
+        for dirpath, dirnames, filenames in os.walk(os.path.join(ROOT, top)):
+            dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS)
+            if "Makefile" in filenames:
+                yield os.path.join(dirpath, "Makefile")
+
+
+def vhdl_files():
+    files = []
+    for top in ["hdl"] + SEARCH_DIRS:
+        for dirpath, dirnames, filenames in os.walk(os.path.join(ROOT, top)):
+            dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS)
+            files.extend(rel(os.path.join(dirpath, f)) for f in sorted(filenames) if f.endswith((".vhd", ".vhdl")))
+    return files
+
+
+def build_index():
+    targets = []
+    for mk in find_makefiles():
+        d = os.path.dirname(mk)
+        env, includes = read_makefile(mk)
+        includes = [rel(os.path.join(d, i)) for i in includes]
+
+        if any(i.endswith("cocotb.mk") for i in includes):
+            kind = "bench"
+            sources = env.get("VHDL_SOURCES", "")
+        elif env.get("SRC_FILES"):
+            kind = "build"
+            sources = env.get("SRC_FILES", "")
+        else:
+            continue
+
+        sources = [rel(os.path.join(d, s)) for s in sources.split()]
+        makefiles = [rel(mk)] + [i for i in includes if os.path.isfile(os.path.join(ROOT, i))]
+
+        module = env.get("MODULE")
+        python = []
+        if kind == "bench" and module:
+            search = [d, os.path.join(ROOT, "tb", "common")]
+            python = [rel(p) for p in python_deps(os.path.join(d, module + ".py"), search)]
+
+        targets.append(Target(rel(d), kind, module, sources, makefiles, python))
+
+    # files the listed sources reference, in case a list is short of one
+    files = vhdl_files()
+    cwd = os.getcwd()
+    os.chdir(ROOT)
+    try:
+        deps = vhdl_deps.dependencies(files)
+    finally:
+        os.chdir(cwd)
+
+    for t in targets:
+        stack = [s for s in t.sources if s in deps]
+        while stack:
+            for f in deps[stack.pop()]:
+                if f not in t.files:
+                    t.files.add(f)
+                    stack.append(f)
+
+    return targets
+
+
+def git(*args):
+    return subprocess.run(["git", "-C", ROOT] + list(args), check=True, capture_output=True, text=True).stdout
+
+
+def changed_lines(base):
+    """Changed files and, for modified ones, the new line numbers touched"""
+
+    changes = {}
+    current = None
+    for line in git("diff", "-U0", "--no-color", base, "--").splitlines():
+        if line.startswith("+++ "):
+            current = None if line[4:] == "/dev/null" else line[6:]
+            if current is not None:
+                changes.setdefault(current, set())
+        elif line.startswith("--- ") and line[4:] != "/dev/null":
+            # deleted files count as changed too
+            changes.setdefault(line[6:], set())
+        elif current is not None:
+            m = HUNK_RE.match(line)
+            if m:
+                start, count = int(m.group(1)), int(m.group(2) or 1)
+                changes[current].update(range(start, start + max(count, 1)))
+
+    for f in git("ls-files", "--others", "--exclude-standard").splitlines():
+        changes[f] = None
+
+    return changes
+
+
+def touched_tests(path, lines):
+    """run_test* functions containing all the touched lines, None if any line is outside of them"""
+
+    if not lines:
+        return None
+    try:
+        with open(os.path.join(ROOT, path)) as f:
+            tree = ast.parse(f.read(), path)
+    except (OSError, SyntaxError):
+        return None
+
+    spans = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and TEST_RE.match(node.name):
+            first = min([node.lineno] + [d.lineno for d in node.decorator_list])
+            spans.append((node.name, first, node.end_lineno))
+
+    funcs = set()
+    for line in lines:
+        names = [name for name, lo, hi in spans if lo <= line <= hi]
+        if not names:
+            return None
+        funcs.update(names)
+    return funcs
+
+
+def list_tests(target):
+    """Test names the bench module generates, None if it cannot be imported here"""
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.path.join(ROOT, "tb", "common"), env.get("PYTHONPATH")]))
+    res = subprocess.run([sys.executable, "-B", "-c", LIST_TESTS, target.module], cwd=os.path.join(ROOT, target.path),
+        env=env, capture_output=True, text=True)
+    if res.returncode:
+        return None
+    return res.stdout.split()
+
+
+def tests_of(names, funcs):
+    return [n for n in names if any(n == f or re.fullmatch(re.escape(f) + r"_\d{3}", n) for f in funcs)]
+
+
+class Selection:
+    """Benches affected by a change, each with the test functions to run or None for all of them"""
+
+    def __init__(self, targets, changes):
+        self.targets = targets
+        self.benches = {}
+        self.builds = []
+        self.unknown = []
+        self.reasons = {}
+
+        known = set()
+        for t in targets:
+            known |= t.files
+
+        for path, lines in sorted(changes.items()):
+            if any(r.search(path) for r in IGNORE_RES):
+                continue
+            if path not in known:
+                self.unknown.append(path)
+                continue
+            for t in targets:
+                if path not in t.files:
+                    continue
+                if t.kind == "build":
+                    if t not in self.builds:
+                        self.builds.append(t)
+                    continue
+                self.reasons.setdefault(t.path, []).append(path)
+                funcs = None
+                if t.module and path == os.path.join(t.path, t.module + ".py"):
+                    funcs = touched_tests(path, lines)
+                self._add(t, funcs)
+
+        # not in the index: no telling what it affects
+        if self.unknown:
+            for t in targets:
+                if t.kind == "bench":
+                    self.reasons.setdefault(t.path, []).extend(self.unknown)
+                    self._add(t, None)
+
+    def _add(self, target, funcs):
+        if funcs is None or self.benches.get(target.path, set()) is None:
+            self.benches[target.path] = None
+        else:
+            self.benches[target.path] = self.benches.get(target.path, set()) | funcs
+
+    def selected(self):
+        return [t for t in self.targets if t.path in self.benches]
+
+    def rest(self):
+        return [t for t in self.targets if t.kind == "bench" and t.path not in self.benches]
+
+
+def results_summary(path):
+    passed = failed = 0
+    try:
+        for tc in ET.parse(path).iter("testcase"):
+            if tc.find("failure") is not None or tc.find("error") is not None:
+                failed += 1
+            elif tc.find("skipped") is None:
+                passed += 1
+    except (OSError, ET.ParseError):
+        return None
+    return passed, failed
+
+
+def run_bench(target, tests, make_args, results):
+    cmd = ["make", "-C", os.path.join(ROOT, target.path), f"COCOTB_RESULTS_FILE={results}"] + make_args
+    if tests is not None:
+        cmd.append("TESTCASE=" + ",".join(tests))
+
+    print(f"select_tests: {target.path}: {'all tests' if tests is None else ', '.join(tests)}", flush=True)
+    start = time.time()
+    status = subprocess.run(cmd).returncode
+    summary = results_summary(os.path.join(ROOT, target.path, results))
+
+    if status == 0 and summary is not None and summary[1] == 0:
+        print(f"select_tests: {target.path}: {summary[0]} passed in {time.time() - start:.1f} s", flush=True)
+        return True
+
+    detail = f"make exited with {status}" if summary is None else f"{summary[1]} failed, {summary[0]} passed"
+    print(f"select_tests: {target.path}: {detail} in {time.time() - start:.1f} s", flush=True)
+    return False
+
+
+def plan(selection):
+    """(target, tests) pairs to run first, and the ones to run after them"""
+
+    first = []
+    later = []
+    for t in selection.selected():
+        funcs = selection.benches[t.path]
+        if funcs is None:
+            first.append((t, None))
+            continue
+        names = list_tests(t)
+        if names is None:
+            print(f"select_tests: {t.path}: cannot list the tests of {t.module}, running all", file=sys.stderr)
+            first.append((t, None))
+            continue
+        tests = tests_of(names, funcs)
+        others = [n for n in names if n not in tests]
+        if tests:
+            first.append((t, tests))
+        if others:
+            later.append((t, others))
+
+    later.extend((t, None) for t in selection.rest())
+    return first, later
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Change-aware bench and test selection")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    sub.add_parser("index", help="benches, builds and the files they depend on")
+
+    for cmd, desc in (("select", "benches and tests affected by a change"),
+            ("run", "simulate the affected tests")):
+        p = sub.add_parser(cmd, help=desc)
+        p.add_argument("--base", default="HEAD", help="git revision to diff against")
+        p.add_argument("files", nargs="*", help="changed files instead of the git diff")
+        if cmd == "run":
+            p.add_argument("--rest", action="store_true", help="then run every other bench and test")
+            p.add_argument("--make-arg", action="append", default=[], help="extra make argument, e.g. SIM=questa")
+
+    args = parser.parse_args(argv)
+
+    targets = build_index()
+
+    if args.cmd == "index":
+        for t in targets:
+            print(f"{t.path} ({t.kind}{', ' + t.module if t.module else ''})")
+            for f in sorted(t.files):
+                print(f"    {f}")
+        return 0
+
+    if args.files:
+        changes = {rel(f): None for f in args.files}
+    else:
+        changes = changed_lines(args.base)
+
+    selection = Selection(targets, changes)
+
+    if args.cmd == "select":
+        for t in selection.selected():
+            funcs = selection.benches[t.path]
+            tests = "all tests" if funcs is None else ", ".join(sorted(funcs))
+            print(f"{t.path}: {tests}")
+            for f in selection.reasons[t.path]:
+                print(f"    {f}")
+        for t in selection.builds:
+            print(f"{t.path}: build only, not simulated")
+        if selection.unknown:
+            print(f"not in the index, selecting every bench: {' '.join(selection.unknown)}", file=sys.stderr)
+        return 0
+
+    first, later = plan(selection)
+
+    if not first:
+        print("select_tests: no bench affected", flush=True)
+
+    ok = True
+    start = time.time()
+    for t, tests in first:
+        ok &= run_bench(t, tests, args.make_arg, "results_selected.xml")
+    print(f"select_tests: {len(first)} affected benches in {time.time() - start:.1f} s, "
+          f"{'passed' if ok else 'FAILED'}", flush=True)
+
+    if args.rest:
+        for t, tests in later:
+            ok &= run_bench(t, tests, args.make_arg, "results_rest.xml")
+        print(f"select_tests: all benches in {time.time() - start:.1f} s, {'passed' if ok else 'FAILED'}", flush=True)
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
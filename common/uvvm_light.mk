@@ -19,14 +19,74 @@
 # THE SOFTWARE.
 
 SELF_DIR := $(dir $(lastword $(MAKEFILE_LIST)))
+UVVM_Light_mk := $(abspath $(lastword $(MAKEFILE_LIST)))
+
+# UVVM_Light is compiled once per submodule commit, simulator and simulator
+# version into a user level cache shared by all checkouts and parallel runs.
+#   UVVM_SIM                questa, ghdl or nvc
+#   UVVM_Light_lib          compiled library directory (uvvm_util inside)
+#   UVVM_Light_lib_args     simulator options to find uvvm_util
 
 UVVM_Light_src ?= $(SELF_DIR)../simlib/UVVM_Light
-UVVM_Light_lib ?= $(SELF_DIR)../simlib/UVVM_Light_lib
+UVVM_SIM ?= $(or $(SIM),questa)
+UVVM_CACHE_DIR ?= $(or $(XDG_CACHE_HOME),$(HOME)/.cache)/vhdl-components/uvvm_light
+
+# checked out submodule commit, or the one recorded in the superproject
+UVVM_Light_commit ?= $(shell if [ -z "$$(git -C $(UVVM_Light_src) rev-parse --show-prefix 2>/dev/null)" ]; \
+	then git -C $(UVVM_Light_src) rev-parse --short=12 HEAD; \
+	else git -C $(SELF_DIR).. rev-parse --short=12 HEAD:simlib/UVVM_Light; fi 2>/dev/null || echo unknown)
+
+ifeq ($(UVVM_SIM), questa)
+UVVM_SIM_VERSION_CMD = vsim -version
+UVVM_Light_lib_args = -L $(UVVM_Light_lib)/uvvm_util
+else ifeq ($(UVVM_SIM), ghdl)
+UVVM_SIM_VERSION_CMD = ghdl --version
+UVVM_Light_lib_args = -P$(UVVM_Light_lib)
+else ifeq ($(UVVM_SIM), nvc)
+UVVM_SIM_VERSION_CMD = nvc --version
+UVVM_Light_lib_args = -L $(UVVM_Light_lib)
+else
+$(error UVVM_SIM=$(UVVM_SIM) not supported, use questa, ghdl or nvc)
+endif
+
+UVVM_SIM_VERSION ?= $(shell $(UVVM_SIM_VERSION_CMD) 2>/dev/null | head -1 | cksum | cut -d' ' -f1)
+
+UVVM_Light_lib ?= $(UVVM_CACHE_DIR)/$(UVVM_Light_commit)-$(UVVM_SIM)-$(UVVM_SIM_VERSION)
+
+# the first run builds into a temporary directory and renames it in place,
+# concurrent runs wait on the lock and then find the library built
+$(UVVM_Light_lib):
+	mkdir -p $(UVVM_CACHE_DIR)
+	flock $@.lock $(MAKE) --no-print-directory -f $(UVVM_Light_mk) \
+		UVVM_Light_src=$(abspath $(UVVM_Light_src)) UVVM_SIM=$(UVVM_SIM) \
+		UVVM_Light_lib=$@ uvvm_light_build
 
-$(UVVM_Light_lib): $(UVVM_Light_src)
-	mkdir -p $@
-	vsim -c -do "do $(UVVM_Light_src)/script/compile.do $(UVVM_Light_src) $@; exit -f"
+.PHONY: uvvm_light_build
+uvvm_light_build:
+	if [ ! -d $(UVVM_Light_lib) ]; then \
+		tmp=$(UVVM_Light_lib).tmp$$$$; \
+		rm -rf $$tmp && mkdir -p $$tmp && \
+		$(MAKE) --no-print-directory -f $(UVVM_Light_mk) \
+			UVVM_Light_src=$(UVVM_Light_src) UVVM_SIM=$(UVVM_SIM) \
+			UVVM_Light_lib=$(UVVM_Light_lib) UVVM_Light_tmp=$$tmp uvvm_light_compile_$(UVVM_SIM) && \
+		mv $$tmp $(UVVM_Light_lib) || { rm -rf $$tmp; exit 1; }; \
+	fi
 
-.PHONY: clean_UVVM_Light_lib
+UVVM_Light_files = $(addprefix $(UVVM_Light_src)/,$(shell grep -v '^\s*\#' $(UVVM_Light_src)/compile_order.txt 2>/dev/null))
+
+.PHONY: uvvm_light_compile_questa uvvm_light_compile_ghdl uvvm_light_compile_nvc
+uvvm_light_compile_questa:
+	cd $(UVVM_Light_tmp) && vsim -c -do "do $(UVVM_Light_src)/script/compile.do $(UVVM_Light_src) $(UVVM_Light_tmp); exit -f"
+
+uvvm_light_compile_ghdl:
+	ghdl -a --std=08 -frelaxed --work=uvvm_util --workdir=$(UVVM_Light_tmp) $(UVVM_Light_files)
+
+uvvm_light_compile_nvc:
+	nvc --std=2008 --work=uvvm_util:$(UVVM_Light_tmp)/uvvm_util -a --relaxed $(UVVM_Light_files)
+
+.PHONY: clean_UVVM_Light_lib clean_UVVM_Light_cache
 clean_UVVM_Light_lib:
-	rm -rf $(UVVM_Light_lib)
+	rm -rf $(UVVM_Light_lib) $(UVVM_Light_lib).lock
+
+clean_UVVM_Light_cache:
+	rm -rf $(UVVM_CACHE_DIR)
@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+"""
+Copyright (c) 2024 Marcin Zaremba
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+
+# VHDL compile order and incremental recompile lists
+#
+#   vhdl_deps.py order FILE...                       all files in dependency order
+#   vhdl_deps.py changed --state STATE FILE...       changed files and their dependents, in order
+#   vhdl_deps.py update --state STATE FILE...        record the files as compiled
+#
+# Dependencies come from architecture/package body to entity/package, use
+# clauses, component declarations and direct entity instantiations. Units of
+# libraries other than the ones defined in FILE... (ieee, std, ...) are ignored.
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+
+COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+
+DEF_RES = [
+    re.compile(r"\bentity\s+(\w+)\s+is\b", re.I),
+    re.compile(r"\bpackage\s+(?!body\b)(\w+)\s+is\b", re.I),
+]
+
+# architecture X of E, package body P: the primary unit in another file
+PRIMARY_RES = [
+    re.compile(r"\barchitecture\s+\w+\s+of\s+(\w+)\s+is\b", re.I),
+    re.compile(r"\bpackage\s+body\s+(\w+)\s+is\b", re.I),
+    re.compile(r"\bconfiguration\s+\w+\s+of\s+(\w+)\s+is\b", re.I),
+]
+
+USE_RES = [
+    re.compile(r"\buse\s+\w+\s*\.\s*(\w+)", re.I),
+    re.compile(r"\bentity\s+\w+\s*\.\s*(\w+)", re.I),
+    re.compile(r"(?<!\bend)\s+component\s+(\w+)", re.I),
+]
+
+
+def parse(path):
+    with open(path, errors="replace") as f:
+        text = COMMENT_RE.sub(" ", f.read())
+
+    defs = set()
+    for r in DEF_RES:
+        defs.update(m.lower() for m in r.findall(text))
+
+    uses = set()
+    for r in PRIMARY_RES + USE_RES:
+        uses.update(m.lower() for m in r.findall(text))
+
+    return defs, uses - defs
+
+
+def dependencies(files):
+    parsed = {f: parse(f) for f in files}
+
+    owner = {}
+    for f in files:
+        for unit in parsed[f][0]:
+            owner.setdefault(unit, f)
+
+    return {f: {owner[u] for u in parsed[f][1] if u in owner and owner[u] != f} for f in files}
+
+
+def compile_order(files, deps=None):
+    """Topological order, ties keep the order given"""
+
+    if deps is None:
+        deps = dependencies(files)
+
+    order = []
+    done = set()
+    visiting = set()
+
+    def visit(f):
+        if f in done:
+            return
+        if f in visiting:
+            print(f"vhdl_deps: dependency cycle through {f}", file=sys.stderr)
+            return
+        visiting.add(f)
+        for d in sorted(deps[f], key=files.index):
+            visit(d)
+        visiting.discard(f)
+        done.add(f)
+        order.append(f)
+
+    for f in files:
+        visit(f)
+
+    return order
+
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def load_state(path, key):
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if state.get("key") != key:
+        return {}
+    return state.get("files", {})
+
+
+def changed(files, state_path, key=""):
+    """Files to recompile: new or modified ones and everything depending on them, in compile order"""
+
+    deps = dependencies(files)
+    state = load_state(state_path, key)
+
+    dirty = {f for f in files if state.get(os.path.abspath(f)) != file_hash(f)}
+
+    dependents = {f: set() for f in files}
+    for f, ds in deps.items():
+        for d in ds:
+            dependents[d].add(f)
+
+    stack = list(dirty)
+    while stack:
+        for f in dependents[stack.pop()]:
+            if f not in dirty:
+                dirty.add(f)
+                stack.append(f)
+
+    return [f for f in compile_order(files, deps) if f in dirty]
+
+
+def update(files, state_path, key=""):
+    state = load_state(state_path, key)
+    state.update({os.path.abspath(f): file_hash(f) for f in files})
+
+    os.makedirs(os.path.dirname(os.path.abspath(state_path)), exist_ok=True)
+    with open(state_path, "w") as f:
+        json.dump({"key": key, "files": state}, f, indent=1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="VHDL compile order and incremental recompile lists")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    sub.add_parser("order", help="all files in dependency order").add_argument("files", nargs="*")
+
+    for cmd, desc in (("changed", "changed files and their dependents, in order"),
+            ("update", "record the files as compiled")):
+        p = sub.add_parser(cmd, help=desc)
+        p.add_argument("--state", required=True, help="state file, kept in the compiled library")
+        p.add_argument("--key", default="", help="compile options, a different key recompiles everything")
+        p.add_argument("files", nargs="*")
+
+    args = parser.parse_args(argv)
+
+    # keep the first of duplicate entries
+    files = list(dict.fromkeys(args.files))
+
+    if args.cmd == "order":
+        print(" ".join(compile_order(files)))
+    elif args.cmd == "changed":
+        print(" ".join(changed(files, args.state, args.key)))
+    else:
+        update(files, args.state, args.key)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
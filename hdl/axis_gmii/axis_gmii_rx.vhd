@@ -18,6 +18,12 @@
 -- OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 -- THE SOFTWARE.
 
+-- GMII receiver. At 10/100 Mb/s the MAC clock keeps running and clk_enable
+-- marks the cycles carrying data, at 1000 Mb/s it is left at its default '1'.
+-- With mii_select the data is a nibble on gmii_rxd(3 downto 0) per enabled
+-- cycle, low nibble first, aligned to bytes on the SFD. m_axis_tvalid and the
+-- status outputs pulse for one clock per byte.
+
 library ieee;
     use ieee.std_logic_1164.all;
 -- use ieee.numeric_std.all;
@@ -31,6 +37,9 @@ entity axis_gmii_rx is
         gmii_rx_dv : in    std_logic;
         gmii_rx_er : in    std_logic;
 
+        clk_enable : in    std_logic := '1';
+        mii_select : in    std_logic := '0';
+
         m_axis_tdata  : out   std_logic_vector(7 downto 0);
         m_axis_tvalid : out   std_logic;
         m_axis_tlast  : out   std_logic;
@@ -60,6 +69,18 @@ architecture rtl of axis_gmii_rx is
     signal crc_state  : std_logic_vector(31 downto 0);
     signal crc_next   : std_logic_vector(31 downto 0);
 
+    -- nibble assembly in MII mode, rx_en marks the cycles with a byte on rx_d
+    signal mii_odd    : std_logic;
+    signal mii_locked : std_logic;
+    signal mii_rxd    : std_logic_vector(3 downto 0);
+    signal mii_rx_dv  : std_logic;
+    signal mii_rx_er  : std_logic;
+
+    signal rx_en : std_logic;
+    signal rx_d  : std_logic_vector(7 downto 0);
+    signal rx_dv : std_logic;
+    signal rx_er : std_logic;
+
     signal gmii_rxd_d0 : std_logic_vector(7 downto 0);
     signal gmii_rxd_d1 : std_logic_vector(7 downto 0);
     signal gmii_rxd_d2 : std_logic_vector(7 downto 0);
@@ -154,7 +175,10 @@ begin
                 reset_crc <= '1';
 
                 if (gmii_rx_dv_d4 = '1' and gmii_rx_er_d4 /= '1' and gmii_rxd_d4 = ETH_PRE) then
-                    pre_cnt_next <= pre_cnt + 1;
+                    -- a longer preamble, or the nibble-wise search of MII, may exceed 7
+                    if (pre_cnt /= 7) then
+                        pre_cnt_next <= pre_cnt + 1;
+                    end if;
                 else
                     pre_cnt_next <= 0;
                 end if;
@@ -176,7 +200,7 @@ begin
                     m_axis_tuser_next    <= '1';
                     error_bad_frame_next <= '1';
                     state_next           <= WAIT_LAST;
-                elsif (gmii_rx_dv /= '1') then
+                elsif (rx_dv /= '1') then
                     -- end of packet
                     m_axis_tlast_next <= '1';
 
@@ -199,13 +223,46 @@ begin
                 end if;
             when WAIT_LAST =>
                 -- wait for end of packet
-                if (gmii_rx_dv /= '1') then
+                if (rx_dv /= '1') then
                     state_next <= IDLE;
                 end if;
         end case;
 
     end process COMB_PROC;
 
+    -- before the SFD every nibble completes a byte, so the SFD is found in
+    -- either alignment; from it on a byte completes on every other nibble
+    rx_en <= clk_enable and (not mii_select or mii_odd or not mii_locked);
+    rx_d  <= gmii_rxd(3 downto 0) & mii_rxd when mii_select = '1' else gmii_rxd;
+    rx_dv <= gmii_rx_dv and mii_rx_dv when mii_select = '1' else gmii_rx_dv;
+    rx_er <= gmii_rx_er or mii_rx_er when mii_select = '1' else gmii_rx_er;
+
+    MII_PROC : process (clk) is
+    begin
+        if rising_edge(clk) then
+            if (rst = '1') then
+                mii_odd    <= '0';
+                mii_locked <= '0';
+                mii_rx_dv  <= '0';
+                mii_rx_er  <= '0';
+            elsif (clk_enable = '1' and mii_select = '1') then
+                mii_rxd   <= gmii_rxd(3 downto 0);
+                mii_rx_dv <= gmii_rx_dv;
+                mii_rx_er <= gmii_rx_er;
+
+                mii_odd <= not mii_odd;
+
+                if (mii_locked = '1') then
+                    mii_locked <= gmii_rx_dv;
+                elsif (rx_dv = '1' and rx_d = ETH_SFD) then
+                    mii_locked <= '1';
+                    mii_odd    <= '0';
+                end if;
+            end if;
+        end if;
+
+    end process MII_PROC;
+
     SEQ_PROC : process (clk) is
     begin
         if rising_edge(clk) then
@@ -227,6 +284,13 @@ begin
                 gmii_rx_dv_d4 <= '0';
 
                 crc_state <= (others => '1');
+            elsif (rx_en /= '1') then
+                -- no byte this cycle, hold the state and end the output pulses
+                m_axis_tvalid_reg <= '0';
+
+                start_packet_reg    <= '0';
+                error_bad_frame_reg <= '0';
+                error_bad_fcs_reg   <= '0';
             else
                 state_reg <= state_next;
 
@@ -235,19 +299,19 @@ begin
                 m_axis_tlast_reg  <= m_axis_tlast_next;
                 m_axis_tuser_reg  <= m_axis_tuser_next;
 
-                gmii_rxd_d0 <= gmii_rxd;
+                gmii_rxd_d0 <= rx_d;
                 gmii_rxd_d1 <= gmii_rxd_d0;
                 gmii_rxd_d2 <= gmii_rxd_d1;
                 gmii_rxd_d3 <= gmii_rxd_d2;
                 gmii_rxd_d4 <= gmii_rxd_d3;
 
-                gmii_rx_dv_d0 <= gmii_rx_dv;
-                gmii_rx_dv_d1 <= gmii_rx_dv_d0 and gmii_rx_dv;
-                gmii_rx_dv_d2 <= gmii_rx_dv_d1 and gmii_rx_dv;
-                gmii_rx_dv_d3 <= gmii_rx_dv_d2 and gmii_rx_dv;
-                gmii_rx_dv_d4 <= gmii_rx_dv_d3 and gmii_rx_dv;
+                gmii_rx_dv_d0 <= rx_dv;
+                gmii_rx_dv_d1 <= gmii_rx_dv_d0 and rx_dv;
+                gmii_rx_dv_d2 <= gmii_rx_dv_d1 and rx_dv;
+                gmii_rx_dv_d3 <= gmii_rx_dv_d2 and rx_dv;
+                gmii_rx_dv_d4 <= gmii_rx_dv_d3 and rx_dv;
 
-                gmii_rx_er_d0 <= gmii_rx_er;
+                gmii_rx_er_d0 <= rx_er;
                 gmii_rx_er_d1 <= gmii_rx_er_d0;
                 gmii_rx_er_d2 <= gmii_rx_er_d1;
                 gmii_rx_er_d3 <= gmii_rx_er_d2;
@@ -18,6 +18,13 @@
 -- OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 -- THE SOFTWARE.
 
+-- GMII transmitter. At 10/100 Mb/s the MAC clock keeps running and
+-- clk_enable marks the cycles carrying data, at 1000 Mb/s it is left at its
+-- default '1'. With mii_select every byte goes out as two nibbles on
+-- gmii_txd(3 downto 0) in consecutive enabled cycles, low nibble first. The
+-- outputs hold between enabled cycles, s_axis_tready is only high in the
+-- cycles a byte is taken.
+
 library ieee;
     use ieee.std_logic_1164.all;
 -- use ieee.numeric_std.all;
@@ -34,7 +41,10 @@ entity axis_gmii_tx is
 
         gmii_txd   : out   std_logic_vector(7 downto 0);
         gmii_tx_en : out   std_logic;
-        gmii_tx_er : out   std_logic
+        gmii_tx_er : out   std_logic;
+
+        clk_enable : in    std_logic := '1';
+        mii_select : in    std_logic := '0'
     );
 end entity axis_gmii_tx;
 
@@ -65,6 +75,12 @@ architecture rtl of axis_gmii_tx is
     signal gmii_tx_en_reg,      gmii_tx_en_next : std_logic;
     signal gmii_tx_er_reg,      gmii_tx_er_next : std_logic;
 
+    -- in MII mode the state machine advances on the low nibble, the high
+    -- nibble of the byte follows from mii_txd_reg
+    signal tx_en       : std_logic;
+    signal mii_odd     : std_logic;
+    signal mii_txd_reg : std_logic_vector(3 downto 0);
+
     procedure crc_step (
         signal crcIn  : in std_logic_vector(31 downto 0);
         signal data   : in std_logic_vector(7 downto 0);
@@ -285,8 +301,19 @@ begin
                 gmii_tx_en_reg <= '0';
                 gmii_tx_er_reg <= '0';
 
+                mii_odd     <= '0';
+                mii_txd_reg <= (others => '0');
+
                 crc_state <= (others => '1');
+            elsif (tx_en /= '1') then
+                if (clk_enable = '1' and mii_select = '1') then
+                    -- high nibble
+                    mii_odd      <= '0';
+                    gmii_txd_reg <= x"0" & mii_txd_reg;
+                end if;
             else
+                mii_odd <= mii_select;
+
                 state_reg <= state_next;
 
                 frame_ptr_reg       <= frame_ptr_next;
@@ -295,7 +322,13 @@ begin
                 s_tdata_reg       <= s_tdata_next;
                 s_axis_tready_reg <= s_axis_tready_next;
 
-                gmii_txd_reg   <= gmii_txd_next;
+                if (mii_select = '1') then
+                    gmii_txd_reg <= x"0" & gmii_txd_next(3 downto 0);
+                    mii_txd_reg  <= gmii_txd_next(7 downto 4);
+                else
+                    gmii_txd_reg <= gmii_txd_next;
+                end if;
+
                 gmii_tx_en_reg <= gmii_tx_en_next;
                 gmii_tx_er_reg <= gmii_tx_er_next;
 
@@ -311,7 +344,9 @@ begin
 
     crc_step(crc_state, s_tdata_reg, crc_next);
 
-    s_axis_tready <= s_axis_tready_reg;
+    tx_en <= clk_enable and (not mii_select or not mii_odd);
+
+    s_axis_tready <= s_axis_tready_reg and tx_en;
 
     gmii_txd   <= gmii_txd_reg;
     gmii_tx_en <= gmii_tx_en_reg;
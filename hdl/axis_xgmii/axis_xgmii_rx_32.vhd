@@ -22,6 +22,9 @@ library ieee;
     use ieee.std_logic_1164.all;
 
 entity axis_xgmii_rx_32 is
+    generic (
+        PTP_TS_ENABLE : boolean := false
+    );
     port (
         clk : in    std_logic;
         rst : in    std_logic;
@@ -37,6 +40,10 @@ entity axis_xgmii_rx_32 is
 
         cfg_rx_enable : in    std_logic;
 
+        ptp_ts           : in    std_logic_vector(95 downto 0) := (others => '0');
+        m_axis_ts_tdata  : out   std_logic_vector(95 downto 0);
+        m_axis_ts_tvalid : out   std_logic;
+
         start_packet    : out   std_logic;
         error_bad_frame : out   std_logic;
         error_bad_fcs   : out   std_logic
@@ -84,6 +91,10 @@ architecture rtl of axis_xgmii_rx_32 is
     signal error_bad_frame_reg, error_bad_frame_next : std_logic;
     signal error_bad_fcs_reg,   error_bad_fcs_next   : std_logic;
 
+    signal ptp_ts_reg           : std_logic_vector(95 downto 0);
+    signal m_axis_ts_tdata_reg  : std_logic_vector(95 downto 0);
+    signal m_axis_ts_tvalid_reg : std_logic;
+
     procedure crc_step (
         signal crcIn  : in std_logic_vector(31 downto 0);
         signal data   : in std_logic_vector(31 downto 0);
@@ -232,6 +243,10 @@ begin
                 error_bad_frame_reg <= '0';
                 error_bad_fcs_reg   <= '0';
 
+                ptp_ts_reg           <= (others => '0');
+                m_axis_ts_tdata_reg  <= (others => '0');
+                m_axis_ts_tvalid_reg <= '0';
+
                 framing_error_reg <= '0';
 
                 xgmii_start_d0 <= '0';
@@ -252,6 +267,18 @@ begin
                 error_bad_frame_reg <= error_bad_frame_next;
                 error_bad_fcs_reg   <= error_bad_fcs_next;
 
+                -- timestamp taken when the SFD word is sampled, output with start_packet
+                if (xgmii_start_d0 = '1') then
+                    ptp_ts_reg <= ptp_ts;
+                end if;
+
+                m_axis_ts_tvalid_reg <= '0';
+
+                if (PTP_TS_ENABLE and start_packet_next = '1') then
+                    m_axis_ts_tdata_reg  <= ptp_ts_reg;
+                    m_axis_ts_tvalid_reg <= '1';
+                end if;
+
                 term_lane_reg     <= 0;
                 term_present_reg  <= '0';
                 framing_error_reg <= '1' when xgmii_rxc /= x"0" else '0';
@@ -304,6 +331,9 @@ begin
     m_axis_tlast  <= m_axis_tlast_reg;
     m_axis_tuser  <= m_axis_tuser_reg;
 
+    m_axis_ts_tdata  <= m_axis_ts_tdata_reg;
+    m_axis_ts_tvalid <= m_axis_ts_tvalid_reg;
+
     start_packet    <= start_packet_reg;
     error_bad_frame <= error_bad_frame_reg;
     error_bad_fcs   <= error_bad_fcs_reg;
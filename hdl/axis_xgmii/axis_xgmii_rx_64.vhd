@@ -22,6 +22,9 @@ library ieee;
     use ieee.std_logic_1164.all;
 
 entity axis_xgmii_rx_64 is
+    generic (
+        PTP_TS_ENABLE : boolean := false
+    );
     port (
         clk : in    std_logic;
         rst : in    std_logic;
@@ -37,6 +40,10 @@ entity axis_xgmii_rx_64 is
 
         cfg_rx_enable : in    std_logic;
 
+        ptp_ts           : in    std_logic_vector(95 downto 0) := (others => '0');
+        m_axis_ts_tdata  : out   std_logic_vector(95 downto 0);
+        m_axis_ts_tvalid : out   std_logic;
+
         start_packet    : out   std_logic_vector(1 downto 0);
         error_bad_frame : out   std_logic;
         error_bad_fcs   : out   std_logic
@@ -94,6 +101,10 @@ architecture rtl of axis_xgmii_rx_64 is
     signal error_bad_frame_reg, error_bad_frame_next : std_logic;
     signal error_bad_fcs_reg,   error_bad_fcs_next   : std_logic;
 
+    signal ptp_ts_reg           : std_logic_vector(95 downto 0);
+    signal m_axis_ts_tdata_reg  : std_logic_vector(95 downto 0);
+    signal m_axis_ts_tvalid_reg : std_logic;
+
     procedure crc_step (
         signal crcIn  : in std_logic_vector(31 downto 0);
         signal data   : in std_logic_vector(63 downto 0);
@@ -254,6 +265,10 @@ begin
                 error_bad_frame_reg <= '0';
                 error_bad_fcs_reg   <= '0';
 
+                ptp_ts_reg           <= (others => '0');
+                m_axis_ts_tdata_reg  <= (others => '0');
+                m_axis_ts_tvalid_reg <= '0';
+
                 xgmii_rxc_d0 <= (others => '0');
 
                 xgmii_start_swap <= '0';
@@ -295,6 +310,7 @@ begin
                     for i in 7 downto 0 loop
 
                         if (((xgmii_term_lane(3 downto 0) & swap_rxc_term) and (x"01" sll i)) /= x"00") then
+                            xgmii_rxd_d0      <= (xgmii_rxd_masked(31 downto 0) & swap_rxd) and (x"FFFFFFFFFFFFFFFF" srl (64 - 8*i));
                             term_lane_reg     <= i;
                             term_present_reg  <= '1';
                             framing_error_reg <= '1' when ((xgmii_rxc(3 downto 0) & swap_rxc) and (x"FF" srl (8-i))) /= x"00" else '0';
@@ -314,6 +330,7 @@ begin
                     for i in 7 downto 0 loop
 
                         if (xgmii_rxc(i) = '1' and xgmii_rxd((i+1)*8-1 downto i*8) = XGMII_TERM) then
+                            xgmii_rxd_d0      <= xgmii_rxd_masked and (x"FFFFFFFFFFFFFFFF" srl (64 - 8*i));
                             term_lane_reg     <= i;
                             term_present_reg  <= '1';
                             framing_error_reg <= '1' when (xgmii_rxc and (x"FF" srl (8-i))) /= x"00" else '0';
@@ -324,23 +341,18 @@ begin
 
                 end if;
 
-                -- start control character detection
+                -- start control character detection, a terminate found above in the
+                -- same word still ends the previous frame (short inter-frame gap)
                 if (xgmii_rxc(0) = '1' and xgmii_rxd(7 downto 0) = XGMII_START) then
                     lanes_swapped <= '0';
 
                     xgmii_start_d0 <= '1';
 
-                    term_lane_reg     <= 0;
-                    term_present_reg  <= '0';
-                    framing_error_reg <= '1' when xgmii_rxc(7 downto 0) /= x"00" else '0';
+                    ptp_ts_reg <= ptp_ts;
                 elsif (xgmii_rxc(4) = '1' and xgmii_rxd(39 downto 32) = XGMII_START) then
                     lanes_swapped <= '1';
 
                     xgmii_start_swap <= '1';
-
-                    term_lane_reg     <= 0;
-                    term_present_reg  <= '0';
-                    framing_error_reg <= '1' when xgmii_rxc(7 downto 5) /= "000" else '0';
                 end if;
 
                 if (xgmii_start_swap = '1') then
@@ -351,6 +363,21 @@ begin
                     start_packet_reg <= "01";
                 end if;
 
+                -- timestamp taken when the SFD word is sampled, output with start_packet
+                m_axis_ts_tvalid_reg <= '0';
+
+                if (PTP_TS_ENABLE) then
+                    if (xgmii_start_swap = '1') then
+                        m_axis_ts_tdata_reg  <= ptp_ts;
+                        m_axis_ts_tvalid_reg <= '1';
+                    end if;
+
+                    if (xgmii_start_d0 = '1' and lanes_swapped = '0') then
+                        m_axis_ts_tdata_reg  <= ptp_ts_reg;
+                        m_axis_ts_tvalid_reg <= '1';
+                    end if;
+                end if;
+
                 term_lane_d0_reg     <= term_lane_reg;
                 framing_error_d0_reg <= framing_error_reg;
 
@@ -385,6 +412,9 @@ begin
     m_axis_tlast  <= m_axis_tlast_reg;
     m_axis_tuser  <= m_axis_tuser_reg;
 
+    m_axis_ts_tdata  <= m_axis_ts_tdata_reg;
+    m_axis_ts_tvalid <= m_axis_ts_tvalid_reg;
+
     start_packet    <= start_packet_reg;
     error_bad_frame <= error_bad_frame_reg;
     error_bad_fcs   <= error_bad_fcs_reg;
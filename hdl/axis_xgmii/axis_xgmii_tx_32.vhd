@@ -23,6 +23,9 @@ library ieee;
     use ieee.numeric_std.all;
 
 entity axis_xgmii_tx_32 is
+    generic (
+        PTP_TS_ENABLE : boolean := false
+    );
     port (
         clk : in    std_logic;
         rst : in    std_logic;
@@ -40,6 +43,10 @@ entity axis_xgmii_tx_32 is
         cfg_ifg       : in    std_logic_vector(7 downto 0);
         cfg_tx_enable : in    std_logic;
 
+        ptp_ts           : in    std_logic_vector(95 downto 0) := (others => '0');
+        m_axis_ts_tdata  : out   std_logic_vector(95 downto 0);
+        m_axis_ts_tvalid : out   std_logic;
+
         start_packet    : out   std_logic;
         error_underflow : out   std_logic
     );
@@ -97,6 +104,9 @@ architecture rtl of axis_xgmii_tx_32 is
     signal start_packet_reg,       start_packet_next    : std_logic;
     signal error_underflow_reg,    error_underflow_next : std_logic;
 
+    signal m_axis_ts_tdata_reg  : std_logic_vector(95 downto 0);
+    signal m_axis_ts_tvalid_reg : std_logic;
+
     procedure crc_step_8 (
         signal crcIn  : in std_logic_vector(31 downto 0);
         signal data   : in std_logic_vector(7 downto 0);
@@ -562,6 +572,9 @@ begin
 
                 start_packet_reg    <= '0';
                 error_underflow_reg <= '0';
+
+                m_axis_ts_tdata_reg  <= (others => '0');
+                m_axis_ts_tvalid_reg <= '0';
             else
                 state_reg <= state_next;
 
@@ -594,6 +607,14 @@ begin
 
                 start_packet_reg    <= start_packet_next;
                 error_underflow_reg <= error_underflow_next;
+
+                -- timestamp the start of frame, taken with the SFD word going out
+                m_axis_ts_tvalid_reg <= '0';
+
+                if (PTP_TS_ENABLE and start_packet_next = '1') then
+                    m_axis_ts_tdata_reg  <= ptp_ts;
+                    m_axis_ts_tvalid_reg <= '1';
+                end if;
             end if;
         end if;
 
@@ -609,6 +630,9 @@ begin
     xgmii_txd <= xgmii_txd_reg;
     xgmii_txc <= xgmii_txc_reg;
 
+    m_axis_ts_tdata  <= m_axis_ts_tdata_reg;
+    m_axis_ts_tvalid <= m_axis_ts_tvalid_reg;
+
     start_packet    <= start_packet_reg;
     error_underflow <= error_underflow_reg;
 
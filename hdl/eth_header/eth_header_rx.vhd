@@ -22,16 +22,47 @@
 --  Field                       Length
 --  Destination MAC address     6 octets
 --  Source MAC address          6 octets
+--  VLAN tags (VLAN_ENABLE)     4 octets each, at most 2
+--   TPID                       2 octets, 0x88A8, 0x8100 or 0x9100
+--   TCI                        2 octets, PCP (3 bits), DEI (1 bit), VID (12 bits)
 --  Ethertype                   2 octets
 
 -- This module receives an Ethernet frame on an AXI stream interface, decodes
 -- and strips the headers, then produces the header fields in parallel along
 -- with the payload in a separate AXI stream.
 
+-- With FILTER_ENABLE frames are accepted by destination MAC address: a hit
+-- in the CAM_DEPTH entries of cfg_cam_mac marked in cfg_cam_valid, broadcast
+-- with cfg_accept_broadcast, other group addresses with cfg_accept_multicast,
+-- or any address with cfg_promiscuous. The decision is taken while the source
+-- address is received. A rejected frame produces no header and no payload, it
+-- is consumed at one byte per cycle whatever the state of the outputs and
+-- filter_drop pulses once for it. The entries are plain inputs and may be
+-- changed at any time, a change takes effect from the next frame. Left
+-- unconnected they accept every frame.
+
+-- With VLAN_ENABLE up to two VLAN tags following the source address are
+-- parsed at the same one byte per cycle and stripped from the payload.
+-- m_eth_vlan_tags gives the number of tags, m_eth_vlan_tci the TCI of the
+-- outer tag, m_eth_inner_vlan_tci the TCI of the inner (QinQ) tag and
+-- m_eth_type the ethertype following the tags. TCIs of missing tags are zero.
+-- A third tag is left at the start of the payload with its TPID in m_eth_type.
+
+-- m_eth_class flags the entries of cfg_class_type marked in cfg_class_valid
+-- that match the ethertype, one bit per entry, for steering the frame to an
+-- output port. All zero means no entry matched.
+
 library ieee;
     use ieee.std_logic_1164.all;
+    use ieee.numeric_std.all;
 
 entity eth_header_rx is
+    generic (
+        VLAN_ENABLE   : boolean  := false;
+        FILTER_ENABLE : boolean  := false;
+        CAM_DEPTH     : positive := 4;
+        CLASS_DEPTH   : positive := 4
+    );
     port (
         aclk    : in    std_logic;
         aresetn : in    std_logic;
@@ -47,17 +78,33 @@ entity eth_header_rx is
         m_eth_dst_mac             : out   std_logic_vector(47 downto 0);
         m_eth_src_mac             : out   std_logic_vector(47 downto 0);
         m_eth_type                : out   std_logic_vector(15 downto 0);
+        m_eth_vlan_tags           : out   std_logic_vector(1 downto 0);
+        m_eth_vlan_tci            : out   std_logic_vector(15 downto 0);
+        m_eth_inner_vlan_tci      : out   std_logic_vector(15 downto 0);
         m_eth_payload_axis_tdata  : out   std_logic_vector(7 downto 0);
         m_eth_payload_axis_tvalid : out   std_logic;
         m_eth_payload_axis_tready : in    std_logic;
         m_eth_payload_axis_tlast  : out   std_logic;
-        m_eth_payload_axis_tuser  : out   std_logic_vector(0 downto 0)
+        m_eth_payload_axis_tuser  : out   std_logic_vector(0 downto 0);
+        m_eth_class               : out   std_logic_vector(CLASS_DEPTH - 1 downto 0);
+
+        cfg_cam_mac          : in    std_logic_vector(CAM_DEPTH * 48 - 1 downto 0)   := (others => '0');
+        cfg_cam_valid        : in    std_logic_vector(CAM_DEPTH - 1 downto 0)        := (others => '0');
+        cfg_accept_broadcast : in    std_logic                                       := '1';
+        cfg_accept_multicast : in    std_logic                                       := '0';
+        cfg_promiscuous      : in    std_logic                                       := '1';
+        cfg_class_type       : in    std_logic_vector(CLASS_DEPTH * 16 - 1 downto 0) := (others => '0');
+        cfg_class_valid      : in    std_logic_vector(CLASS_DEPTH - 1 downto 0)      := (others => '0');
+
+        filter_drop : out   std_logic
     );
 end entity eth_header_rx;
 
 architecture rtl of eth_header_rx is
 
-    type t_state is (DST_MAC, SRC_MAC, ETH_TYPE, ETH_PAYLOAD);
+    type t_state is (DST_MAC, SRC_MAC, ETH_TYPE, VLAN_TCI, ETH_PAYLOAD);
+
+    constant MAX_VLAN_TAGS : natural := 2;
 
     type t_reg is record
         state          : t_state;
@@ -65,16 +112,71 @@ architecture rtl of eth_header_rx is
         dst_mac        : std_logic_vector(47 downto 0);
         src_mac        : std_logic_vector(47 downto 0);
         eth_type       : std_logic_vector(15 downto 0);
+        vlan_tags      : natural range 0 to MAX_VLAN_TAGS;
+        vlan_tci       : std_logic_vector(15 downto 0);
+        inner_vlan_tci : std_logic_vector(15 downto 0);
         payload_tvalid : std_logic;
         payload_tdata  : std_logic_vector(7 downto 0);
         payload_tlast  : std_logic;
         payload_tuser  : std_logic_vector(0 downto 0);
         byte_cnt       : std_logic_vector(2 downto 0);
+        accept         : std_logic;
+        eth_class      : std_logic_vector(CLASS_DEPTH - 1 downto 0);
+        filter_drop    : std_logic;
     end record t_reg;
 
     signal r      : t_reg;
     signal r_next : t_reg;
 
+    function mac_accept (
+        mac       : in std_logic_vector(47 downto 0);
+        cam_mac   : in std_logic_vector;
+        cam_valid : in std_logic_vector;
+        broadcast : in std_logic;
+        multicast : in std_logic;
+        promisc   : in std_logic
+    ) return std_logic is
+    begin
+        if (not FILTER_ENABLE or promisc = '1') then
+            return '1';
+        end if;
+
+        if (mac = x"FFFFFFFFFFFF") then
+            return broadcast;
+        end if;
+
+        for i in 0 to CAM_DEPTH - 1 loop
+
+            if (cam_valid(i) = '1' and cam_mac(i * 48 + 47 downto i * 48) = mac) then
+                return '1';
+            end if;
+
+        end loop;
+
+        -- individual/group bit, the lsb of the first octet
+        return multicast and mac(40);
+    end function mac_accept;
+
+    function type_class (
+        ethertype   : in std_logic_vector(15 downto 0);
+        class_type  : in std_logic_vector;
+        class_valid : in std_logic_vector
+    ) return std_logic_vector is
+        variable res : std_logic_vector(CLASS_DEPTH - 1 downto 0);
+    begin
+        res := (others => '0');
+
+        for i in 0 to CLASS_DEPTH - 1 loop
+
+            if (class_valid(i) = '1' and class_type(i * 16 + 15 downto i * 16) = ethertype) then
+                res(i) := '1';
+            end if;
+
+        end loop;
+
+        return res;
+    end function type_class;
+
 begin
 
     COMB_PROC : process (all) is
@@ -82,6 +184,9 @@ begin
         variable s_axis_xfer    : boolean;
         variable last_mac_byte  : boolean;
         variable last_type_byte : boolean;
+        variable type_next      : std_logic_vector(15 downto 0);
+        variable vlan_tag       : boolean;
+        variable hdr_done       : boolean;
 
     begin
         r_next <= r;
@@ -89,9 +194,17 @@ begin
         s_axis_xfer    := s_axis_tvalid = '1' and s_axis_tready = '1';
         last_mac_byte  := r.byte_cnt = "100";
         last_type_byte := r.byte_cnt = "001";
+        type_next      := r.eth_type(7 downto 0) & s_axis_tdata;
 
+        vlan_tag := VLAN_ENABLE and r.vlan_tags < MAX_VLAN_TAGS and
+                    (type_next = x"88A8" or type_next = x"8100" or type_next = x"9100");
+        hdr_done := s_axis_xfer and r.state = ETH_TYPE and last_type_byte and not vlan_tag;
+
+        -- tags and ethertype are two octet fields, restart the count for each
         if (s_axis_xfer and s_axis_tlast = '1') then
             r_next.byte_cnt <= (others => '0');
+        elsif (s_axis_xfer and last_type_byte and (r.state = ETH_TYPE or r.state = VLAN_TCI)) then
+            r_next.byte_cnt <= (others => '0');
         elsif (s_axis_xfer) then
             r_next.byte_cnt <= r.byte_cnt(1 downto 0) & not r.byte_cnt(2);
         end if;
@@ -112,9 +225,17 @@ begin
             when ETH_TYPE =>
                 if (s_axis_xfer and s_axis_tlast = '1') then
                     r_next.state <= DST_MAC;
+                elsif (s_axis_xfer and last_type_byte and vlan_tag) then
+                    r_next.state <= VLAN_TCI;
                 elsif (s_axis_xfer and last_type_byte) then
                     r_next.state <= ETH_PAYLOAD;
                 end if;
+            when VLAN_TCI =>
+                if (s_axis_xfer and s_axis_tlast = '1') then
+                    r_next.state <= DST_MAC;
+                elsif (s_axis_xfer and last_type_byte) then
+                    r_next.state <= ETH_TYPE;
+                end if;
             when ETH_PAYLOAD =>
                 if (s_axis_xfer and s_axis_tlast = '1') then
                     r_next.state <= DST_MAC;
@@ -130,16 +251,53 @@ begin
         end if;
 
         if (s_axis_xfer and r.state = ETH_TYPE) then
-            r_next.eth_type <= r.eth_type(7 downto 0) & s_axis_tdata;
+            r_next.eth_type <= type_next;
+        end if;
+
+        if (s_axis_xfer and r.state = DST_MAC) then
+            r_next.vlan_tags <= 0;
+        elsif (s_axis_xfer and r.state = ETH_TYPE and last_type_byte and vlan_tag) then
+            r_next.vlan_tags <= r.vlan_tags + 1;
+        end if;
+
+        if (s_axis_xfer and r.state = DST_MAC) then
+            r_next.vlan_tci <= (others => '0');
+        elsif (s_axis_xfer and r.state = VLAN_TCI and r.vlan_tags = 1) then
+            r_next.vlan_tci <= r.vlan_tci(7 downto 0) & s_axis_tdata;
+        end if;
+
+        if (s_axis_xfer and r.state = DST_MAC) then
+            r_next.inner_vlan_tci <= (others => '0');
+        elsif (s_axis_xfer and r.state = VLAN_TCI and r.vlan_tags = 2) then
+            r_next.inner_vlan_tci <= r.inner_vlan_tci(7 downto 0) & s_axis_tdata;
+        end if;
+
+        -- the destination address is complete for the whole source address,
+        -- the first cycle of which still sees the previous decision forced to '1'
+        if (r.state = DST_MAC) then
+            r_next.accept <= '1';
+        elsif (r.state = SRC_MAC) then
+            r_next.accept <= mac_accept(r.dst_mac, cfg_cam_mac, cfg_cam_valid, cfg_accept_broadcast,
+                                        cfg_accept_multicast, cfg_promiscuous);
+        end if;
+
+        if (hdr_done and r.accept = '1') then
+            r_next.eth_class <= type_class(type_next, cfg_class_type, cfg_class_valid);
+        end if;
+
+        if (hdr_done and r.accept = '0') then
+            r_next.filter_drop <= '1';
+        else
+            r_next.filter_drop <= '0';
         end if;
 
         if (m_eth_hdr_valid = '1' and m_eth_hdr_ready = '1') then
             r_next.hdr_valid <= '0';
-        elsif (s_axis_xfer and r.state = ETH_TYPE and last_type_byte) then
+        elsif (hdr_done and r.accept = '1') then
             r_next.hdr_valid <= '1';
         end if;
 
-        if (s_axis_xfer and r.state = ETH_PAYLOAD) then
+        if (s_axis_xfer and r.state = ETH_PAYLOAD and r.accept = '1') then
             r_next.payload_tvalid <= '1';
             r_next.payload_tdata  <= s_axis_tdata;
             if (s_axis_tlast = '1') then
@@ -160,27 +318,41 @@ begin
             r.dst_mac        <= (others => '0');
             r.src_mac        <= (others => '0');
             r.eth_type       <= (others => '0');
+            r.vlan_tags      <= 0;
+            r.vlan_tci       <= (others => '0');
+            r.inner_vlan_tci <= (others => '0');
             r.payload_tvalid <= '0';
             r.payload_tdata  <= (others => '0');
             r.payload_tlast  <= '0';
             r.payload_tuser  <= (others => '0');
             r.byte_cnt       <= (others => '0');
+            r.accept         <= '1';
+            r.eth_class      <= (others => '0');
+            r.filter_drop    <= '0';
         elsif rising_edge(aclk) then
             r <= r_next;
         end if;
 
     end process SEQ_PROC;
 
-    s_axis_tready <= m_eth_payload_axis_tready or not m_eth_payload_axis_tvalid when r.state = ETH_PAYLOAD else
+    -- a rejected frame is consumed without waiting for the outputs
+    s_axis_tready <= '1' when r.state /= DST_MAC and r.accept = '0' else
+                     m_eth_payload_axis_tready or not m_eth_payload_axis_tvalid when r.state = ETH_PAYLOAD else
                      m_eth_hdr_ready or not m_eth_hdr_valid;
 
     m_eth_hdr_valid           <= r.hdr_valid;
     m_eth_dst_mac             <= r.dst_mac;
     m_eth_src_mac             <= r.src_mac;
     m_eth_type                <= r.eth_type;
+    m_eth_vlan_tags           <= std_logic_vector(to_unsigned(r.vlan_tags, 2));
+    m_eth_vlan_tci            <= r.vlan_tci;
+    m_eth_inner_vlan_tci      <= r.inner_vlan_tci;
     m_eth_payload_axis_tdata  <= r.payload_tdata;
     m_eth_payload_axis_tvalid <= r.payload_tvalid;
     m_eth_payload_axis_tlast  <= r.payload_tlast;
     m_eth_payload_axis_tuser  <= r.payload_tuser;
+    m_eth_class               <= r.eth_class;
+
+    filter_drop <= r.filter_drop;
 
 end architecture rtl;
@@ -0,0 +1,163 @@
+-- Copyright (c) 2024 Marcin Zaremba
+--
+-- Permission is hereby granted, free of charge, to any person obtaining a copy
+-- of this software and associated documentation files (the "Software"), to deal
+-- in the Software without restriction, including without limitation the rights
+-- to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+-- copies of the Software, and to permit persons to whom the Software is
+-- furnished to do so, subject to the following conditions:
+--
+-- The above copyright notice and this permission notice shall be included in
+-- all copies or substantial portions of the Software.
+--
+-- THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+-- IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+-- FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+-- AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+-- LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+-- OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+-- THE SOFTWARE.
+
+-- Ethernet frame
+--  Field                       Length
+--  Destination MAC address     6 octets
+--  Source MAC address          6 octets
+--  Ethertype                   2 octets
+
+-- This module takes the header fields in parallel along with the payload in a
+-- separate AXI stream, as produced by eth_header_rx, and transmits the
+-- Ethernet frame on an AXI stream interface. The first header byte is loaded
+-- into the output register together with the header, so back-to-back frames
+-- are transmitted without idle cycles between them.
+
+library ieee;
+    use ieee.std_logic_1164.all;
+
+entity eth_header_tx is
+    port (
+        aclk    : in    std_logic;
+        aresetn : in    std_logic;
+
+        s_eth_hdr_valid           : in    std_logic;
+        s_eth_hdr_ready           : out   std_logic;
+        s_eth_dst_mac             : in    std_logic_vector(47 downto 0);
+        s_eth_src_mac             : in    std_logic_vector(47 downto 0);
+        s_eth_type                : in    std_logic_vector(15 downto 0);
+        s_eth_payload_axis_tdata  : in    std_logic_vector(7 downto 0);
+        s_eth_payload_axis_tvalid : in    std_logic;
+        s_eth_payload_axis_tready : out   std_logic;
+        s_eth_payload_axis_tlast  : in    std_logic;
+        s_eth_payload_axis_tuser  : in    std_logic_vector(0 downto 0);
+
+        m_axis_tdata  : out   std_logic_vector(7 downto 0);
+        m_axis_tvalid : out   std_logic;
+        m_axis_tready : in    std_logic;
+        m_axis_tlast  : out   std_logic;
+        m_axis_tuser  : out   std_logic
+    );
+end entity eth_header_tx;
+
+architecture rtl of eth_header_tx is
+
+    constant HDR_LENGTH : natural := 14;
+
+    type t_state is (IDLE, HEADER, PAYLOAD);
+
+    type t_reg is record
+        state    : t_state;
+        hdr      : std_logic_vector(HDR_LENGTH * 8 - 1 downto 0);
+        byte_cnt : natural range 0 to HDR_LENGTH - 1;
+        tdata    : std_logic_vector(7 downto 0);
+        tvalid   : std_logic;
+        tlast    : std_logic;
+        tuser    : std_logic;
+    end record t_reg;
+
+    signal r      : t_reg;
+    signal r_next : t_reg;
+
+    signal out_ready : std_logic;
+
+begin
+
+    COMB_PROC : process (all) is
+
+        variable hdr_xfer     : boolean;
+        variable payload_xfer : boolean;
+
+    begin
+        r_next <= r;
+
+        hdr_xfer     := s_eth_hdr_valid = '1' and s_eth_hdr_ready = '1';
+        payload_xfer := s_eth_payload_axis_tvalid = '1' and s_eth_payload_axis_tready = '1';
+
+        if (m_axis_tready = '1') then
+            r_next.tvalid <= '0';
+        end if;
+
+        case r.state is
+            when IDLE =>
+                if (hdr_xfer) then
+                    -- first destination MAC byte straight out, keep the rest
+                    r_next.tdata    <= s_eth_dst_mac(47 downto 40);
+                    r_next.tvalid   <= '1';
+                    r_next.tlast    <= '0';
+                    r_next.tuser    <= '0';
+                    r_next.hdr      <= s_eth_dst_mac(39 downto 0) & s_eth_src_mac & s_eth_type & x"00";
+                    r_next.byte_cnt <= 1;
+                    r_next.state    <= HEADER;
+                end if;
+            when HEADER =>
+                if (out_ready = '1') then
+                    r_next.tdata  <= r.hdr(r.hdr'high downto r.hdr'high - 7);
+                    r_next.tvalid <= '1';
+                    r_next.hdr    <= r.hdr(r.hdr'high - 8 downto 0) & x"00";
+
+                    if (r.byte_cnt = HDR_LENGTH - 1) then
+                        r_next.state <= PAYLOAD;
+                    else
+                        r_next.byte_cnt <= r.byte_cnt + 1;
+                    end if;
+                end if;
+            when PAYLOAD =>
+                if (payload_xfer) then
+                    r_next.tdata  <= s_eth_payload_axis_tdata;
+                    r_next.tvalid <= '1';
+                    r_next.tlast  <= s_eth_payload_axis_tlast;
+                    r_next.tuser  <= s_eth_payload_axis_tuser(0);
+
+                    if (s_eth_payload_axis_tlast = '1') then
+                        r_next.state <= IDLE;
+                    end if;
+                end if;
+        end case;
+
+    end process COMB_PROC;
+
+    SEQ_PROC : process (aclk, aresetn) is
+    begin
+        if (aresetn = '0') then
+            r.state    <= IDLE;
+            r.hdr      <= (others => '0');
+            r.byte_cnt <= 0;
+            r.tdata    <= (others => '0');
+            r.tvalid   <= '0';
+            r.tlast    <= '0';
+            r.tuser    <= '0';
+        elsif rising_edge(aclk) then
+            r <= r_next;
+        end if;
+
+    end process SEQ_PROC;
+
+    out_ready <= m_axis_tready or not r.tvalid;
+
+    s_eth_hdr_ready           <= out_ready when r.state = IDLE else '0';
+    s_eth_payload_axis_tready <= out_ready when r.state = PAYLOAD else '0';
+
+    m_axis_tdata  <= r.tdata;
+    m_axis_tvalid <= r.tvalid;
+    m_axis_tlast  <= r.tlast;
+    m_axis_tuser  <= r.tuser;
+
+end architecture rtl;
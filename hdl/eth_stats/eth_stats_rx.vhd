@@ -0,0 +1,270 @@
+-- Copyright (c) 2024 Marcin Zaremba
+--
+-- Permission is hereby granted, free of charge, to any person obtaining a copy
+-- of this software and associated documentation files (the "Software"), to deal
+-- in the Software without restriction, including without limitation the rights
+-- to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+-- copies of the Software, and to permit persons to whom the Software is
+-- furnished to do so, subject to the following conditions:
+--
+-- The above copyright notice and this permission notice shall be included in
+-- all copies or substantial portions of the Software.
+--
+-- THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+-- IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+-- FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+-- AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+-- LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+-- OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+-- THE SOFTWARE.
+
+-- Receive statistics
+--  Counter                     Increment
+--  stat_start_packets          start_packet pulse
+--  stat_frames                 frame received (tlast)
+--  stat_frames_good            frame received with tuser = '0'
+--  stat_octets                 frame octets, including 4 octets of FCS
+--  stat_bad_frame              error_bad_frame pulse
+--  stat_bad_fcs                error_bad_fcs pulse
+--  stat_size_*                 frame received, bucketed by octets with FCS
+
+-- This module counts receive statistics from the AXI stream output and the
+-- status outputs of axis_gmii_rx (KEEP_WIDTH = 1, tkeep tied to '1'),
+-- axis_xgmii_rx_32 (KEEP_WIDTH = 4) or axis_xgmii_rx_64 (KEEP_WIDTH = 8,
+-- start_packet is the or of both start_packet lanes). All counters are 64-bit
+-- and saturate. stat_snapshot copies the running counters to the stat_*
+-- outputs, stat_clear restarts the running counters from zero. Asserting both
+-- in the same cycle gives a read-and-clear without losing any event.
+
+library ieee;
+    use ieee.std_logic_1164.all;
+    use ieee.numeric_std.all;
+
+entity eth_stats_rx is
+    generic (
+        KEEP_WIDTH : natural := 8
+    );
+    port (
+        clk : in    std_logic;
+        rst : in    std_logic;
+
+        s_axis_tkeep  : in    std_logic_vector(KEEP_WIDTH - 1 downto 0);
+        s_axis_tvalid : in    std_logic;
+        s_axis_tlast  : in    std_logic;
+        s_axis_tuser  : in    std_logic;
+
+        start_packet    : in    std_logic;
+        error_bad_frame : in    std_logic;
+        error_bad_fcs   : in    std_logic;
+
+        stat_snapshot : in    std_logic;
+        stat_clear    : in    std_logic;
+
+        stat_start_packets  : out   std_logic_vector(63 downto 0);
+        stat_frames         : out   std_logic_vector(63 downto 0);
+        stat_frames_good    : out   std_logic_vector(63 downto 0);
+        stat_octets         : out   std_logic_vector(63 downto 0);
+        stat_bad_frame      : out   std_logic_vector(63 downto 0);
+        stat_bad_fcs        : out   std_logic_vector(63 downto 0);
+        stat_size_lt_64     : out   std_logic_vector(63 downto 0);
+        stat_size_64        : out   std_logic_vector(63 downto 0);
+        stat_size_65_127    : out   std_logic_vector(63 downto 0);
+        stat_size_128_255   : out   std_logic_vector(63 downto 0);
+        stat_size_256_511   : out   std_logic_vector(63 downto 0);
+        stat_size_512_1023  : out   std_logic_vector(63 downto 0);
+        stat_size_1024_1518 : out   std_logic_vector(63 downto 0);
+        stat_size_gt_1518   : out   std_logic_vector(63 downto 0)
+    );
+end entity eth_stats_rx;
+
+architecture rtl of eth_stats_rx is
+
+    constant FCS_LENGTH    : natural := 4;
+    constant MAX_FRAME_LEN : natural := 65535;
+
+    constant CNT_START_PACKETS  : natural := 0;
+    constant CNT_FRAMES         : natural := 1;
+    constant CNT_FRAMES_GOOD    : natural := 2;
+    constant CNT_OCTETS         : natural := 3;
+    constant CNT_BAD_FRAME      : natural := 4;
+    constant CNT_BAD_FCS        : natural := 5;
+    constant CNT_SIZE_LT_64     : natural := 6;
+    constant CNT_SIZE_64        : natural := 7;
+    constant CNT_SIZE_65_127    : natural := 8;
+    constant CNT_SIZE_128_255   : natural := 9;
+    constant CNT_SIZE_256_511   : natural := 10;
+    constant CNT_SIZE_512_1023  : natural := 11;
+    constant CNT_SIZE_1024_1518 : natural := 12;
+    constant CNT_SIZE_GT_1518   : natural := 13;
+    constant CNT_NUM            : natural := 14;
+
+    type t_cnt is array (0 to CNT_NUM - 1) of unsigned(63 downto 0);
+
+    type t_inc is array (0 to CNT_NUM - 1) of natural range 0 to MAX_FRAME_LEN;
+
+    type t_reg is record
+        frame_len    : natural range 0 to MAX_FRAME_LEN;
+        frame_done   : std_logic;
+        frame_good   : std_logic;
+        frame_octets : natural range 0 to MAX_FRAME_LEN;
+        start_packet : std_logic;
+        bad_frame    : std_logic;
+        bad_fcs      : std_logic;
+        cnt          : t_cnt;
+        stat         : t_cnt;
+    end record t_reg;
+
+    signal r      : t_reg;
+    signal r_next : t_reg;
+
+    function keep2count (
+        k : in std_logic_vector
+    ) return natural is
+        variable count : natural range 0 to KEEP_WIDTH;
+    begin
+        -- count of valid bytes
+        count := 0;
+
+        for i in k'range loop
+
+            if (k(i) = '1') then
+                count := count + 1;
+            end if;
+
+        end loop;
+
+        return count;
+    end function keep2count;
+
+    function sat_add (
+        cnt : in unsigned(63 downto 0);
+        inc : in natural
+    ) return unsigned is
+        variable sum : unsigned(64 downto 0);
+    begin
+        sum := resize(cnt, 65) + to_unsigned(inc, 65);
+
+        if (sum(64) = '1') then
+            return (63 downto 0 => '1');
+        end if;
+
+        return sum(63 downto 0);
+    end function sat_add;
+
+begin
+
+    COMB_PROC : process (all) is
+
+        variable r_tmp     : t_reg;
+        variable frame_len : natural range 0 to MAX_FRAME_LEN;
+        variable inc       : t_inc;
+        variable size_cnt  : natural range 0 to CNT_NUM - 1;
+
+    begin
+        r_tmp := r;
+
+        -- stage 1: frame length and status pulses
+        r_tmp.frame_done   := '0';
+        r_tmp.start_packet := start_packet;
+        r_tmp.bad_frame    := error_bad_frame;
+        r_tmp.bad_fcs      := error_bad_fcs;
+
+        if (s_axis_tvalid = '1') then
+            frame_len := minimum(r.frame_len + keep2count(s_axis_tkeep), MAX_FRAME_LEN - FCS_LENGTH);
+
+            if (s_axis_tlast = '1') then
+                r_tmp.frame_done   := '1';
+                r_tmp.frame_good   := not s_axis_tuser;
+                r_tmp.frame_octets := frame_len + FCS_LENGTH;
+                r_tmp.frame_len    := 0;
+            else
+                r_tmp.frame_len := frame_len;
+            end if;
+        end if;
+
+        -- stage 2: counters
+        if (r.frame_octets < 64) then
+            size_cnt := CNT_SIZE_LT_64;
+        elsif (r.frame_octets = 64) then
+            size_cnt := CNT_SIZE_64;
+        elsif (r.frame_octets < 128) then
+            size_cnt := CNT_SIZE_65_127;
+        elsif (r.frame_octets < 256) then
+            size_cnt := CNT_SIZE_128_255;
+        elsif (r.frame_octets < 512) then
+            size_cnt := CNT_SIZE_256_511;
+        elsif (r.frame_octets < 1024) then
+            size_cnt := CNT_SIZE_512_1023;
+        elsif (r.frame_octets < 1519) then
+            size_cnt := CNT_SIZE_1024_1518;
+        else
+            size_cnt := CNT_SIZE_GT_1518;
+        end if;
+
+        if (stat_snapshot = '1') then
+            r_tmp.stat := r.cnt;
+        end if;
+
+        inc := (others => 0);
+
+        inc(CNT_START_PACKETS) := 1 when r.start_packet = '1' else 0;
+        inc(CNT_BAD_FRAME)     := 1 when r.bad_frame = '1' else 0;
+        inc(CNT_BAD_FCS)       := 1 when r.bad_fcs = '1' else 0;
+
+        if (r.frame_done = '1') then
+            inc(CNT_FRAMES)      := 1;
+            inc(CNT_FRAMES_GOOD) := 1 when r.frame_good = '1' else 0;
+            inc(CNT_OCTETS)      := r.frame_octets;
+            inc(size_cnt)        := 1;
+        end if;
+
+        for i in 0 to CNT_NUM - 1 loop
+
+            if (stat_clear = '1') then
+                r_tmp.cnt(i) := to_unsigned(inc(i), 64);
+            else
+                r_tmp.cnt(i) := sat_add(r.cnt(i), inc(i));
+            end if;
+
+        end loop;
+
+        r_next <= r_tmp;
+
+    end process COMB_PROC;
+
+    SEQ_PROC : process (clk) is
+    begin
+        if rising_edge(clk) then
+            if (rst = '1') then
+                r.frame_len    <= 0;
+                r.frame_done   <= '0';
+                r.frame_good   <= '0';
+                r.frame_octets <= 0;
+                r.start_packet <= '0';
+                r.bad_frame    <= '0';
+                r.bad_fcs      <= '0';
+                r.cnt          <= (others => (others => '0'));
+                r.stat         <= (others => (others => '0'));
+            else
+                r <= r_next;
+            end if;
+        end if;
+
+    end process SEQ_PROC;
+
+    stat_start_packets  <= std_logic_vector(r.stat(CNT_START_PACKETS));
+    stat_frames         <= std_logic_vector(r.stat(CNT_FRAMES));
+    stat_frames_good    <= std_logic_vector(r.stat(CNT_FRAMES_GOOD));
+    stat_octets         <= std_logic_vector(r.stat(CNT_OCTETS));
+    stat_bad_frame      <= std_logic_vector(r.stat(CNT_BAD_FRAME));
+    stat_bad_fcs        <= std_logic_vector(r.stat(CNT_BAD_FCS));
+    stat_size_lt_64     <= std_logic_vector(r.stat(CNT_SIZE_LT_64));
+    stat_size_64        <= std_logic_vector(r.stat(CNT_SIZE_64));
+    stat_size_65_127    <= std_logic_vector(r.stat(CNT_SIZE_65_127));
+    stat_size_128_255   <= std_logic_vector(r.stat(CNT_SIZE_128_255));
+    stat_size_256_511   <= std_logic_vector(r.stat(CNT_SIZE_256_511));
+    stat_size_512_1023  <= std_logic_vector(r.stat(CNT_SIZE_512_1023));
+    stat_size_1024_1518 <= std_logic_vector(r.stat(CNT_SIZE_1024_1518));
+    stat_size_gt_1518   <= std_logic_vector(r.stat(CNT_SIZE_GT_1518));
+
+end architecture rtl;
@@ -23,11 +23,14 @@ library ieee;
     use ieee.numeric_std.all;
 
 entity uart_rx is
+    generic (
+        DATA_WIDTH : positive := 8
+    );
     port (
         aclk    : in    std_logic;
         aresetn : in    std_logic;
 
-        m_axis_tdata  : out   std_logic_vector(7 downto 0);
+        m_axis_tdata  : out   std_logic_vector(DATA_WIDTH - 1 downto 0);
         m_axis_tvalid : out   std_logic;
         m_axis_tready : in    std_logic;
 
@@ -44,14 +47,14 @@ end entity uart_rx;
 architecture rtl of uart_rx is
 
     type t_reg is record
-        tdata         : std_logic_vector(7 downto 0);
+        tdata         : std_logic_vector(DATA_WIDTH - 1 downto 0);
         tvalid        : std_logic;
         busy          : std_logic;
         overrun_error : std_logic;
         frame_error   : std_logic;
-        data          : std_logic_vector(7 downto 0);
+        data          : std_logic_vector(DATA_WIDTH - 1 downto 0);
         prescale      : unsigned(15 downto 0);
-        bit_cnt       : unsigned(3 downto 0);
+        bit_cnt       : natural range 0 to DATA_WIDTH + 2;
     end record t_reg;
 
     signal r       : t_reg;
@@ -74,18 +77,18 @@ begin
         if (r.prescale > 0) then
             r_tmp.prescale := r.prescale - 1;
         elsif (r.bit_cnt > 0) then
-            if (r.bit_cnt > 8+1) then
+            if (r.bit_cnt > DATA_WIDTH + 1) then
                 if (rxd_reg(1) = '0') then
                     r_tmp.bit_cnt  := r.bit_cnt - 1;
                     r_tmp.prescale := unsigned(prescale) - 1;
                 else
-                    r_tmp.bit_cnt  := (others => '0');
+                    r_tmp.bit_cnt  := 0;
                     r_tmp.prescale := (others => '0');
                 end if;
             elsif (r.bit_cnt > 1) then
                 r_tmp.bit_cnt  := r.bit_cnt - 1;
                 r_tmp.prescale := unsigned(prescale) - 1;
-                r_tmp.data     := rxd_reg(1) & r.data(7 downto 1);
+                r_tmp.data     := rxd_reg(1) & r.data(DATA_WIDTH - 1 downto 1);
             elsif (r.bit_cnt = 1) then
                 r_tmp.bit_cnt := r.bit_cnt - 1;
                 if (rxd_reg(1) = '1') then
@@ -100,7 +103,7 @@ begin
             r_tmp.busy := '0';
             if (rxd_reg(1) = '0') then
                 r_tmp.prescale := (unsigned(prescale) srl 1) - 1;
-                r_tmp.bit_cnt  := x"A";
+                r_tmp.bit_cnt  := DATA_WIDTH + 2;
                 r_tmp.data     := (others => '0');
                 r_tmp.busy     := '1';
             end if;
@@ -119,7 +122,7 @@ begin
             r.overrun_error <= '0';
             r.frame_error   <= '0';
             r.prescale      <= (others => '0');
-            r.bit_cnt       <= (others => '0');
+            r.bit_cnt       <= 0;
         elsif rising_edge(aclk) then
             rxd_reg <= rxd_reg(0) & rxd;
 
@@ -23,11 +23,14 @@ library ieee;
     use ieee.numeric_std.all;
 
 entity uart_tx is
+    generic (
+        DATA_WIDTH : positive := 8
+    );
     port (
         aclk    : in    std_logic;
         aresetn : in    std_logic;
 
-        s_axis_tdata  : in    std_logic_vector(7 downto 0);
+        s_axis_tdata  : in    std_logic_vector(DATA_WIDTH - 1 downto 0);
         s_axis_tvalid : in    std_logic;
         s_axis_tready : out   std_logic;
 
@@ -43,10 +46,10 @@ architecture rtl of uart_tx is
 
     type t_reg is record
         tready   : std_logic;
-        data     : std_logic_vector(9 downto 0);
+        data     : std_logic_vector(DATA_WIDTH + 1 downto 0);
         busy     : std_logic;
         prescale : unsigned(15 downto 0);
-        bit_cnt  : unsigned(3 downto 0);
+        bit_cnt  : natural range 0 to DATA_WIDTH + 1;
     end record t_reg;
 
     signal r      : t_reg;
@@ -71,7 +74,7 @@ begin
             if (s_axis_tvalid = '1') then
                 r_tmp.tready   := not r.tready;
                 r_tmp.prescale := unsigned(prescale) - 1;
-                r_tmp.bit_cnt  := x"9";
+                r_tmp.bit_cnt  := DATA_WIDTH + 1;
                 r_tmp.data     := "1" & s_axis_tdata & "0";
                 r_tmp.busy     := '1';
             end if;
@@ -79,7 +82,7 @@ begin
             if (r.bit_cnt > 0) then
                 r_tmp.bit_cnt  := r.bit_cnt - 1;
                 r_tmp.prescale := unsigned(prescale) - 1;
-                r_tmp.data     := "0" & r.data(9 downto 1);
+                r_tmp.data     := "0" & r.data(DATA_WIDTH + 1 downto 1);
             end if;
         end if;
 
@@ -94,7 +97,7 @@ begin
             r.data     <= (others => '1');
             r.busy     <= '0';
             r.prescale <= (others => '0');
-            r.bit_cnt  <= (others => '0');
+            r.bit_cnt  <= 0;
         elsif rising_edge(aclk) then
             r <= r_next;
         end if;
@@ -0,0 +1,177 @@
+-- Copyright (c) 2024 Marcin Zaremba
+--
+-- Permission is hereby granted, free of charge, to any person obtaining a copy
+-- of this software and associated documentation files (the "Software"), to deal
+-- in the Software without restriction, including without limitation the rights
+-- to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+-- copies of the Software, and to permit persons to whom the Software is
+-- furnished to do so, subject to the following conditions:
+--
+-- The above copyright notice and this permission notice shall be included in
+-- all copies or substantial portions of the Software.
+--
+-- THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+-- IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+-- FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+-- AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+-- LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+-- OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+-- THE SOFTWARE.
+
+-- axis_gmii with clocks and resets generated in VHDL (make HDL_CLOCKS=1).
+-- The ports are the ones of axis_gmii, with the clocks and resets brought out
+-- for the bench to await and rst_req to restart both resets.
+
+library ieee;
+    use ieee.std_logic_1164.all;
+
+entity axis_gmii_hdl_clk is
+    generic (
+        CLK_PERIOD_PS : positive := 8000
+    );
+    port (
+        rst_req : in    std_logic;
+
+        rx_clk : out   std_logic;
+        rx_rst : out   std_logic;
+
+        tx_clk : out   std_logic;
+        tx_rst : out   std_logic;
+
+        m_axis_tdata  : out   std_logic_vector(7 downto 0);
+        m_axis_tvalid : out   std_logic;
+        m_axis_tlast  : out   std_logic;
+        m_axis_tuser  : out   std_logic;
+
+        s_axis_tdata  : in    std_logic_vector(7 downto 0);
+        s_axis_tvalid : in    std_logic;
+        s_axis_tready : out   std_logic;
+        s_axis_tlast  : in    std_logic;
+
+        gmii_rxd   : in    std_logic_vector(7 downto 0);
+        gmii_rx_dv : in    std_logic;
+        gmii_rx_er : in    std_logic;
+
+        gmii_txd   : out   std_logic_vector(7 downto 0);
+        gmii_tx_en : out   std_logic;
+        gmii_tx_er : out   std_logic;
+
+        rx_start_packet    : out   std_logic;
+        rx_error_bad_frame : out   std_logic;
+        rx_error_bad_fcs   : out   std_logic
+    );
+end entity axis_gmii_hdl_clk;
+
+architecture sim of axis_gmii_hdl_clk is
+
+    component clk_rst_gen is
+        generic (
+            CLK_PERIOD_PS : positive;
+            RST_CYCLES    : positive
+        );
+        port (
+            rst_req : in    std_logic;
+
+            clk : out   std_logic;
+            rst : out   std_logic
+        );
+    end component;
+
+    component axis_gmii is
+        port (
+            rx_clk : in    std_logic;
+            rx_rst : in    std_logic;
+
+            tx_clk : in    std_logic;
+            tx_rst : in    std_logic;
+
+            m_axis_tdata  : out   std_logic_vector(7 downto 0);
+            m_axis_tvalid : out   std_logic;
+            m_axis_tlast  : out   std_logic;
+            m_axis_tuser  : out   std_logic;
+
+            s_axis_tdata  : in    std_logic_vector(7 downto 0);
+            s_axis_tvalid : in    std_logic;
+            s_axis_tready : out   std_logic;
+            s_axis_tlast  : in    std_logic;
+
+            gmii_rxd   : in    std_logic_vector(7 downto 0);
+            gmii_rx_dv : in    std_logic;
+            gmii_rx_er : in    std_logic;
+
+            gmii_txd   : out   std_logic_vector(7 downto 0);
+            gmii_tx_en : out   std_logic;
+            gmii_tx_er : out   std_logic;
+
+            rx_start_packet    : out   std_logic;
+            rx_error_bad_frame : out   std_logic;
+            rx_error_bad_fcs   : out   std_logic
+        );
+    end component;
+
+    signal rx_clk_i : std_logic;
+    signal rx_rst_i : std_logic;
+    signal tx_clk_i : std_logic;
+    signal tx_rst_i : std_logic;
+
+begin
+
+    rx_clk_rst_gen_i : component clk_rst_gen
+        generic map (
+            CLK_PERIOD_PS => CLK_PERIOD_PS,
+            RST_CYCLES    => 5
+        )
+        port map (
+            rst_req => rst_req,
+            clk     => rx_clk_i,
+            rst     => rx_rst_i
+        );
+
+    tx_clk_rst_gen_i : component clk_rst_gen
+        generic map (
+            CLK_PERIOD_PS => CLK_PERIOD_PS,
+            RST_CYCLES    => 5
+        )
+        port map (
+            rst_req => rst_req,
+            clk     => tx_clk_i,
+            rst     => tx_rst_i
+        );
+
+    axis_gmii_i : component axis_gmii
+        port map (
+            rx_clk => rx_clk_i,
+            rx_rst => rx_rst_i,
+
+            tx_clk => tx_clk_i,
+            tx_rst => tx_rst_i,
+
+            m_axis_tdata  => m_axis_tdata,
+            m_axis_tvalid => m_axis_tvalid,
+            m_axis_tlast  => m_axis_tlast,
+            m_axis_tuser  => m_axis_tuser,
+
+            s_axis_tdata  => s_axis_tdata,
+            s_axis_tvalid => s_axis_tvalid,
+            s_axis_tready => s_axis_tready,
+            s_axis_tlast  => s_axis_tlast,
+
+            gmii_rxd   => gmii_rxd,
+            gmii_rx_dv => gmii_rx_dv,
+            gmii_rx_er => gmii_rx_er,
+
+            gmii_txd   => gmii_txd,
+            gmii_tx_en => gmii_tx_en,
+            gmii_tx_er => gmii_tx_er,
+
+            rx_start_packet    => rx_start_packet,
+            rx_error_bad_frame => rx_error_bad_frame,
+            rx_error_bad_fcs   => rx_error_bad_fcs
+        );
+
+    rx_clk <= rx_clk_i;
+    rx_rst <= rx_rst_i;
+    tx_clk <= tx_clk_i;
+    tx_rst <= tx_rst_i;
+
+end architecture sim;
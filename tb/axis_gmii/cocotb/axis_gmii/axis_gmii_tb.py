@@ -24,33 +24,57 @@ THE SOFTWARE.
 
 import itertools
 import logging
+import os
 
 import cocotb
-from cocotb.clock import Clock
 from cocotb.triggers import RisingEdge
 from cocotb.regression import TestFactory
 
 from cocotbext.eth import GmiiFrame, GmiiSource, GmiiSink
 from cocotbext.axi import AxiStreamBus, AxiStreamSource, AxiStreamSink
 
+from cosim_bridge import CosimBridge
+from hdl_clocks import HDL_CLOCKS, start_clock, reset
+from latency import AxiStreamTimestamper, GmiiTimestamper, LatencyReport
+from trace_recorder import trace_endpoint
+from watchdog import Watchdog, frame_ns
+
 
 class TB:
     def __init__(self, dut):
         self.dut = dut
 
         self.log = logging.getLogger("cocotb.tb")
-        self.log.setLevel(logging.DEBUG)
+        self.log.setLevel(logging.INFO)
+
+        start_clock(dut.rx_clk, 8, units="ns")
+        start_clock(dut.tx_clk, 8, units="ns")
 
-        cocotb.start_soon(Clock(dut.rx_clk, 8, units="ns").start())
-        cocotb.start_soon(Clock(dut.tx_clk, 8, units="ns").start())
+        if HDL_CLOCKS:
+            dut.rst_req.setimmediatevalue(0)
 
         self.gmii_source = GmiiSource(dut.gmii_rxd, dut.gmii_rx_er, dut.gmii_rx_dv, dut.rx_clk, dut.rx_rst)
+        trace_endpoint(self.gmii_source, "axis_gmii.gmii_source")
         self.gmii_sink = GmiiSink(dut.gmii_txd, dut.gmii_tx_er, dut.gmii_tx_en, dut.tx_clk, dut.tx_rst)
+        trace_endpoint(self.gmii_sink, "axis_gmii.gmii_sink")
 
         self.axis_source = AxiStreamSource(AxiStreamBus.from_prefix(dut, "s_axis"), dut.tx_clk, dut.tx_rst)
+        trace_endpoint(self.axis_source, "axis_gmii.axis_source")
         self.axis_sink = AxiStreamSink(AxiStreamBus.from_prefix(dut, "m_axis"), dut.rx_clk, dut.rx_rst)
+        trace_endpoint(self.axis_sink, "axis_gmii.axis_sink")
+
+        self.rx_ts_in = GmiiTimestamper(dut.rx_clk, dut.gmii_rx_dv)
+        self.rx_ts_out = AxiStreamTimestamper(dut.rx_clk, dut.m_axis_tvalid, tlast=dut.m_axis_tlast)
+
+        self.tx_ts_in = AxiStreamTimestamper(dut.tx_clk, dut.s_axis_tvalid, dut.s_axis_tready, dut.s_axis_tlast)
+        self.tx_ts_out = GmiiTimestamper(dut.tx_clk, dut.gmii_tx_en)
 
     async def reset(self):
+        if HDL_CLOCKS:
+            # one request restarts both resets of the wrapper
+            await reset(self.dut.rx_clk, self.dut.rx_rst, self.dut.rst_req)
+            return
+
         self.dut.rx_rst.setimmediatevalue(1)
         self.dut.tx_rst.setimmediatevalue(1)
         for _ in range(5):
@@ -69,14 +93,20 @@ async def run_test_rx(dut, payload_lengths=None, payload_data=None):
 
     await tb.reset()
 
+    tb.rx_ts_in.start()
+    tb.rx_ts_out.start()
+
     test_frames = [payload_data(x) for x in payload_lengths()]
 
+    watchdog = Watchdog(tb.log).start()
+    watchdog.expect([len(x) for x in test_frames], sum(frame_ns(len(x), 8) for x in test_frames))
+
     for test_data in test_frames:
         test_frame = GmiiFrame.from_payload(test_data)
         await tb.gmii_source.send(test_frame)
 
     for test_data in test_frames:
-        rx_frame = await tb.axis_sink.recv()
+        rx_frame = await watchdog.recv(tb.axis_sink.recv())
 
         assert rx_frame.tdata == test_data
         assert rx_frame.tuser == 0
@@ -86,6 +116,11 @@ async def run_test_rx(dut, payload_lengths=None, payload_data=None):
     await RisingEdge(dut.rx_clk)
     await RisingEdge(dut.rx_clk)
 
+    latency = LatencyReport("axis_gmii_rx", 8, tb.log)
+    latency.add([len(x) for x in test_frames], tb.rx_ts_in.frames, tb.rx_ts_out.frames,
+        pattern=f"ifg={tb.gmii_source.ifg}")
+    latency.report()
+
 
 async def run_test_tx(dut, payload_lengths=None, payload_data=None):
 
@@ -93,13 +128,19 @@ async def run_test_tx(dut, payload_lengths=None, payload_data=None):
 
     await tb.reset()
 
+    tb.tx_ts_in.start()
+    tb.tx_ts_out.start()
+
     test_frames = [payload_data(x) for x in payload_lengths()]
 
+    watchdog = Watchdog(tb.log).start()
+    watchdog.expect([len(x) for x in test_frames], sum(frame_ns(len(x), 8) for x in test_frames))
+
     for test_data in test_frames:
         await tb.axis_source.send(test_data)
 
     for test_data in test_frames:
-        rx_frame = await tb.gmii_sink.recv()
+        rx_frame = await watchdog.recv(tb.gmii_sink.recv())
 
         assert rx_frame.get_payload() == test_data
         assert len(rx_frame.get_payload()) >= 60
@@ -111,6 +152,24 @@ async def run_test_tx(dut, payload_lengths=None, payload_data=None):
     await RisingEdge(dut.tx_clk)
     await RisingEdge(dut.tx_clk)
 
+    latency = LatencyReport("axis_gmii_tx", 8, tb.log)
+    latency.add([len(x) for x in test_frames], tb.tx_ts_in.frames, tb.tx_ts_out.frames, pattern="back-to-back")
+    latency.report()
+
+
+async def run_test_cosim(dut):
+
+    tb = TB(dut)
+
+    await tb.reset()
+
+    # GMII receive side driven by the socket client
+    bridge = CosimBridge(os.environ["COSIM_SOCKET"], tb.gmii_source, tb.axis_sink.recv, dut.rx_clk, log=tb.log)
+    await bridge.run()
+
+    await RisingEdge(dut.rx_clk)
+    await RisingEdge(dut.rx_clk)
+
 
 def size_list():
     return list(range(60, 128)) + [512, 1514] + [60]*10
@@ -128,3 +187,7 @@ if cocotb.SIM_NAME:
         factory.add_option("payload_lengths", [size_list])
         factory.add_option("payload_data", [incrementing_payload])
         factory.generate_tests()
+
+    if os.environ.get("COSIM_SOCKET"):
+        factory = TestFactory(run_test_cosim)
+        factory.generate_tests()
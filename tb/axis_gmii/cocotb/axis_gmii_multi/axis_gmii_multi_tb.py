@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+"""
+Copyright (c) 2024 Marcin Zaremba
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+
+import itertools
+import logging
+import random
+from collections import deque
+
+import cocotb
+from cocotb.clock import Clock
+from cocotb.triggers import Event, RisingEdge
+from cocotb.regression import TestFactory
+
+from cocotbext.eth import GmiiFrame
+
+from bench_results import record
+from watchdog import Watchdog, frame_ns
+
+PERIOD_NS = 8
+IFG = 12
+
+
+def read(signal):
+    val = signal.value
+    return val.integer if val.is_resolvable else 0
+
+
+class Port:
+    """Traffic and received frames of one port, both directions"""
+
+    def __init__(self, index, rx_payloads, tx_payloads):
+        self.index = index
+
+        # GMII receive stream, one entry per cycle, None is idle
+        self.rx_stream = deque()
+        for payload in rx_payloads:
+            self.rx_stream.extend(GmiiFrame.from_payload(payload).data)
+            self.rx_stream.extend([None]*IFG)
+        self.rx_expected = deque(rx_payloads)
+        self.rx_frame = bytearray()
+        self.rx_received = []
+        self.rx_bytes = 0
+
+        self.tx_queue = deque(tx_payloads)
+        self.tx_expected = deque(tx_payloads)
+        self.tx_data = None
+        self.tx_pos = 0
+        self.tx_frame = bytearray()
+        self.tx_received = []
+        self.tx_bytes = 0
+
+        self.first_cycle = None
+        self.last_cycle = None
+
+        self._next_tx()
+
+    @property
+    def done(self):
+        return len(self.rx_received) == len(self.rx_expected) and len(self.tx_received) == len(self.tx_expected)
+
+    def _next_tx(self):
+        self.tx_data = self.tx_queue.popleft() if self.tx_queue else None
+        self.tx_pos = 0
+
+    def _active(self, cycle):
+        if self.first_cycle is None:
+            self.first_cycle = cycle
+        self.last_cycle = cycle
+
+    def rx_beat(self, cycle, data, last, user):
+        self._active(cycle)
+        self.rx_frame.append(data)
+        if last:
+            self.rx_received.append((bytes(self.rx_frame), user))
+            self.rx_bytes += len(self.rx_frame)
+            self.rx_frame = bytearray()
+
+    def tx_accept(self):
+        self.tx_pos += 1
+        if self.tx_pos == len(self.tx_data):
+            self._next_tx()
+
+    def tx_beat(self):
+        # tdata, tlast of the beat to drive, None when idle
+        if self.tx_data is None:
+            return None
+        return self.tx_data[self.tx_pos], self.tx_pos == len(self.tx_data) - 1
+
+    def gmii_tx(self, cycle, en, data):
+        if en:
+            self._active(cycle)
+            self.tx_frame.append(data)
+        elif self.tx_frame:
+            frame = GmiiFrame(bytes(self.tx_frame))
+            self.tx_received.append(frame)
+            self.tx_bytes += len(frame.get_payload())
+            self.tx_frame = bytearray()
+
+    def rx_next(self):
+        return self.rx_stream.popleft() if self.rx_stream else None
+
+    def rate_mbps(self):
+        if self.first_cycle is None:
+            return 0.0
+        return (self.rx_bytes + self.tx_bytes)*8*1000 / ((self.last_cycle - self.first_cycle + 1)*PERIOD_NS)
+
+
+class TB:
+    def __init__(self, dut):
+        self.dut = dut
+
+        self.log = logging.getLogger("cocotb.tb")
+        self.log.setLevel(logging.INFO)
+
+        self.ports_num = len(dut.gmii_rx_dv)
+        self.ports = []
+        self.cycle = 0
+        self.done = Event()
+
+        cocotb.start_soon(Clock(dut.clk, PERIOD_NS, units="ns").start())
+
+        for name in ["gmii_rxd", "gmii_rx_dv", "gmii_rx_er", "s_axis_tdata", "s_axis_tvalid", "s_axis_tlast"]:
+            getattr(dut, name).setimmediatevalue(0)
+
+    async def reset(self):
+        self.dut.rst.setimmediatevalue(0)
+        self.dut.rst.value = 1
+        for _ in range(5):
+            await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 0
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+
+    def start(self, ports):
+        self.ports = ports
+        cocotb.start_soon(self._run())
+
+    async def _run(self):
+        # all ports are sampled and driven together, a handful of signal accesses per cycle for any PORTS
+        dut = self.dut
+        drive = {}
+
+        while True:
+            await RisingEdge(dut.clk)
+            self.cycle += 1
+
+            m_tvalid = read(dut.m_axis_tvalid)
+            if m_tvalid:
+                m_tdata = read(dut.m_axis_tdata)
+                m_tlast = read(dut.m_axis_tlast)
+                m_tuser = read(dut.m_axis_tuser)
+            s_tready = read(dut.s_axis_tready)
+            s_tvalid = drive.get("s_axis_tvalid", 0)
+            tx_en = read(dut.gmii_tx_en)
+            txd = read(dut.gmii_txd) if tx_en else 0
+
+            values = dict.fromkeys(["gmii_rxd", "gmii_rx_dv", "s_axis_tdata", "s_axis_tvalid", "s_axis_tlast"], 0)
+
+            for port in self.ports:
+                i = port.index
+                bit = 1 << i
+
+                if m_tvalid & bit:
+                    port.rx_beat(self.cycle, (m_tdata >> 8*i) & 0xff, m_tlast & bit, (m_tuser >> i) & 1)
+
+                if s_tvalid & s_tready & bit:
+                    port.tx_accept()
+
+                port.gmii_tx(self.cycle, tx_en & bit, (txd >> 8*i) & 0xff)
+
+                rxd = port.rx_next()
+                if rxd is not None:
+                    values["gmii_rxd"] |= rxd << 8*i
+                    values["gmii_rx_dv"] |= bit
+
+                beat = port.tx_beat()
+                if beat is not None:
+                    values["s_axis_tdata"] |= beat[0] << 8*i
+                    values["s_axis_tvalid"] |= bit
+                    if beat[1]:
+                        values["s_axis_tlast"] |= bit
+
+            for name, val in values.items():
+                if drive.get(name) != val:
+                    getattr(dut, name).value = val
+                    drive[name] = val
+
+            if all(port.done for port in self.ports):
+                self.done.set()
+
+    def report(self, name):
+        for port in self.ports:
+            self.log.info("%s port %d: %d rx frames, %d tx frames, %.1f Mbps", name, port.index,
+                len(port.rx_received), len(port.tx_received), port.rate_mbps())
+
+        first = min(port.first_cycle for port in self.ports)
+        last = max(port.last_cycle for port in self.ports)
+        cycles = last - first + 1
+        total = sum(port.rx_bytes + port.tx_bytes for port in self.ports)
+        rate = total*8*1000 / (cycles*PERIOD_NS)
+
+        self.log.info("%s aggregate: %d ports, %d bytes in %d cycles, %.1f Mbps", name, len(self.ports), total,
+            cycles, rate)
+        return cycles, rate
+
+
+async def run_test(dut, payload_lengths=None, payload_data=None):
+
+    tb = TB(dut)
+
+    await tb.reset()
+
+    ports = []
+    for i in range(tb.ports_num):
+        rx_payloads = [payload_data(x, i) for x in payload_lengths(i)]
+        tx_payloads = [payload_data(x, i + tb.ports_num) for x in payload_lengths(i + tb.ports_num)]
+        ports.append(Port(i, rx_payloads, tx_payloads))
+
+    # ports run in parallel, the budget is the busiest port and direction
+    watchdog = Watchdog(tb.log).start()
+    watchdog.extend(max(sum(frame_ns(len(x), PERIOD_NS, ifg=IFG) for x in payloads)
+                        for port in ports for payloads in (port.rx_expected, port.tx_expected)))
+    watchdog.watch(lambda: [f"port {port.index}: {len(port.rx_expected) - len(port.rx_received)} rx, "
+                            f"{len(port.tx_expected) - len(port.tx_received)} tx frames" for port in ports
+                            if not port.done])
+
+    tb.start(ports)
+
+    await tb.done.wait()
+
+    for port in ports:
+        for (rx_data, rx_user), test_data in zip(port.rx_received, port.rx_expected):
+            assert rx_data == test_data
+            assert rx_user == 0
+
+        for rx_frame, test_data in zip(port.tx_received, port.tx_expected):
+            assert rx_frame.get_payload() == test_data
+            assert rx_frame.check_fcs()
+
+    await RisingEdge(dut.clk)
+    await RisingEdge(dut.clk)
+
+    cycles, rate = tb.report("axis_gmii_multi")
+    record(f"ports={tb.ports_num}, {payload_lengths.__name__}", ports=tb.ports_num,
+        frames=sum(len(port.rx_received) + len(port.tx_received) for port in ports),
+        cycles=cycles, throughput_mbps=rate)
+
+
+def mixed_size_list(stream):
+    # independent traffic, every port and direction has its own sizes
+    rng = random.Random(stream)
+    return [rng.choice([60, 64, 128, 256, 512, 1024, 1514]) for _ in range(16)]
+
+
+def min_size_list(stream):
+    return [60]*64
+
+
+def incrementing_payload(length, stream):
+    return bytes(itertools.islice(itertools.cycle(range(256)), stream, stream + length))
+
+
+if cocotb.SIM_NAME:
+
+    factory = TestFactory(run_test)
+    factory.add_option("payload_lengths", [mixed_size_list, min_size_list])
+    factory.add_option("payload_data", [incrementing_payload])
+    factory.generate_tests()
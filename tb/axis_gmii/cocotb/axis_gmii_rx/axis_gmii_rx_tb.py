@@ -33,18 +33,37 @@ from cocotb.regression import TestFactory
 from cocotbext.eth import GmiiFrame, GmiiSource
 from cocotbext.axi import AxiStreamBus, AxiStreamSink
 
+from bench_results import record
+from fault_inject import FaultInjector, RecoveryReport, env_rates, size_cycle
+from gmii_speed import LinkSpeed, bench_speeds
+from stats import PulseCounter, RxOutputMonitor
+from throughput import ThroughputMonitor
+from trace_recorder import trace_endpoint
+from watchdog import Watchdog, frame_ns
+
 
 class TB:
-    def __init__(self, dut):
+    def __init__(self, dut, speed=1000):
         self.dut = dut
 
         self.log = logging.getLogger("cocotb.tb")
-        self.log.setLevel(logging.DEBUG)
+        self.log.setLevel(logging.INFO)
 
         cocotb.start_soon(Clock(dut.clk, 8, units="ns").start())
 
-        self.source = GmiiSource(dut.gmii_rxd, dut.gmii_rx_er, dut.gmii_rx_dv, dut.clk, dut.rst)
+        self.speed = LinkSpeed(speed).start(dut.clk, dut.clk_enable, dut.mii_select)
+
+        self.source = GmiiSource(dut.gmii_rxd, dut.gmii_rx_er, dut.gmii_rx_dv, dut.clk, dut.rst,
+                                 enable=dut.clk_enable, mii_select=dut.mii_select)
+        trace_endpoint(self.source, "axis_gmii_rx.source")
         self.sink = AxiStreamSink(AxiStreamBus.from_prefix(dut, "m_axis"), dut.clk, dut.rst)
+        trace_endpoint(self.sink, "axis_gmii_rx.sink")
+
+        self.output = ThroughputMonitor(dut.clk, dut.m_axis_tvalid, tlast=dut.m_axis_tlast)
+
+        self.start_packet = PulseCounter(dut.clk, dut.start_packet)
+        self.error_bad_frame = PulseCounter(dut.clk, dut.error_bad_frame)
+        self.error_bad_fcs = PulseCounter(dut.clk, dut.error_bad_fcs)
 
     async def reset(self):
         self.dut.rst.value = 1
@@ -55,16 +74,25 @@ class TB:
         await RisingEdge(self.dut.clk)
 
 
-async def run_test(dut, payload_lengths=None, payload_data=None, bad_fcs=False, ifg=12):
+async def run_test(dut, payload_lengths=None, payload_data=None, bad_fcs=False, ifg=12, speed=1000):
 
-    tb = TB(dut)
+    tb = TB(dut, speed)
 
     tb.source.ifg = ifg
 
     await tb.reset()
 
+    tb.start_packet.start()
+    tb.error_bad_frame.start()
+    tb.error_bad_fcs.start()
+    tb.output.start()
+
     test_frames = [payload_data(x) for x in payload_lengths()]
 
+    byte_ns = 8*tb.speed.cycles_per_byte
+    watchdog = Watchdog(tb.log).start()
+    watchdog.expect([len(x) for x in test_frames], sum(frame_ns(len(x), byte_ns, ifg=ifg) for x in test_frames))
+
     for test_data in test_frames:
         test_frame = GmiiFrame.from_payload(test_data)
         if bad_fcs:
@@ -72,7 +100,7 @@ async def run_test(dut, payload_lengths=None, payload_data=None, bad_fcs=False,
         await tb.source.send(test_frame)
 
     for test_data in test_frames:
-        rx_frame = await tb.sink.recv()
+        rx_frame = await watchdog.recv(tb.sink.recv())
 
         assert rx_frame.tdata == test_data
         if bad_fcs:
@@ -85,6 +113,56 @@ async def run_test(dut, payload_lengths=None, payload_data=None, bad_fcs=False,
     await RisingEdge(dut.clk)
     await RisingEdge(dut.clk)
 
+    assert tb.start_packet.count == len(test_frames)
+    assert tb.error_bad_frame.count == (len(test_frames) if bad_fcs else 0)
+    assert tb.error_bad_fcs.count == (len(test_frames) if bad_fcs else 0)
+
+    tb.output.report(f"axis_gmii_rx output [{tb.speed}]", 8, tb.log)
+    line_rate = tb.speed.line_rate_mbps(tb.output.rate_mbps(8))
+    tb.log.info("axis_gmii_rx [%s]: %.1f Mbit/s at line rate", tb.speed, line_rate)
+
+    record(str(tb.speed), frames=tb.output.frames, cycles=tb.output.active_cycles, throughput_mbps=line_rate)
+
+
+async def run_test_faults(dut, rates=None):
+
+    tb = TB(dut)
+
+    await tb.reset()
+
+    # continuous traffic with injected faults straight onto the GMII inputs
+    cycles, sent = FaultInjector(rates, seed=1).gmii(size_cycle(150))
+
+    monitor = RxOutputMonitor(dut).start()
+
+    for d, dv, er in cycles:
+        dut.gmii_rxd.value = d
+        dut.gmii_rx_dv.value = dv
+        dut.gmii_rx_er.value = er
+        await RisingEdge(dut.clk)
+
+    for _ in range(8):
+        await RisingEdge(dut.clk)
+
+    received = monitor.builder
+
+    tb.log.info("%d frames, %d with tuser, start_packet %s, bad_frame %d, bad_fcs %d", len(received.frames),
+        sum(f.tuser for f in received.frames), dict(received.start_packet), received.bad_frame, received.bad_fcs)
+
+    recovery = RecoveryReport("axis_gmii_rx", 8, tb.log)
+    recovery.add(sent, received.frames)
+    recovery.report()
+
+    # a fault may cost frames, but must never pass as a good one
+    assert recovery.undetected == 0
+    assert recovery.lost <= sum(1 for s in sent if s.fault == "no_term")
+
+    record(rates, lost_frames=recovery.lost, recovery_cycles=recovery.worst_case(),
+        throughput_mbps=recovery.goodput_mbps)
+
+    await RisingEdge(dut.clk)
+    await RisingEdge(dut.clk)
+
 
 def size_list():
     return list(range(60, 128)) + [512, 1514] + [60]*10
@@ -101,4 +179,9 @@ if cocotb.SIM_NAME:
     factory.add_option("payload_data", [incrementing_payload])
     factory.add_option("bad_fcs", [True, False])
     factory.add_option("ifg", [12, 0])
+    factory.add_option("speed", bench_speeds())
+    factory.generate_tests()
+
+    factory = TestFactory(run_test_faults)
+    factory.add_option("rates", env_rates())
     factory.generate_tests()
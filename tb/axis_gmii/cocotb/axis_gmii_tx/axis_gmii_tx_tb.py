@@ -33,18 +33,31 @@ from cocotb.regression import TestFactory
 from cocotbext.eth import GmiiSink
 from cocotbext.axi import AxiStreamBus, AxiStreamSource
 
+from bench_results import record
+from gmii_speed import LinkSpeed, bench_speeds
+from throughput import ThroughputMonitor
+from trace_recorder import trace_endpoint
+from watchdog import Watchdog, frame_ns
+
 
 class TB:
-    def __init__(self, dut):
+    def __init__(self, dut, speed=1000):
         self.dut = dut
 
         self.log = logging.getLogger("cocotb.tb")
-        self.log.setLevel(logging.DEBUG)
+        self.log.setLevel(logging.INFO)
 
         cocotb.start_soon(Clock(dut.clk, 8, units="ns").start())
 
+        self.speed = LinkSpeed(speed).start(dut.clk, dut.clk_enable, dut.mii_select)
+
         self.source = AxiStreamSource(AxiStreamBus.from_prefix(dut, "s_axis"), dut.clk, dut.rst)
-        self.sink = GmiiSink(dut.gmii_txd, dut.gmii_tx_er, dut.gmii_tx_en, dut.clk, dut.rst)
+        trace_endpoint(self.source, "axis_gmii_tx.source")
+        self.sink = GmiiSink(dut.gmii_txd, dut.gmii_tx_er, dut.gmii_tx_en, dut.clk, dut.rst,
+                             enable=dut.clk_enable, mii_select=dut.mii_select)
+        trace_endpoint(self.sink, "axis_gmii_tx.sink")
+
+        self.input = ThroughputMonitor(dut.clk, dut.s_axis_tvalid, dut.s_axis_tready, dut.s_axis_tlast)
 
     async def reset(self):
         self.dut.rst.value = 1
@@ -55,19 +68,25 @@ class TB:
         await RisingEdge(self.dut.clk)
 
 
-async def run_test(dut, payload_lengths=None, payload_data=None):
+async def run_test(dut, payload_lengths=None, payload_data=None, speed=1000):
 
-    tb = TB(dut)
+    tb = TB(dut, speed)
 
     await tb.reset()
 
+    tb.input.start()
+
     test_frames = [payload_data(x) for x in payload_lengths()]
 
+    byte_ns = 8*tb.speed.cycles_per_byte
+    watchdog = Watchdog(tb.log).start()
+    watchdog.expect([len(x) for x in test_frames], sum(frame_ns(len(x), byte_ns) for x in test_frames))
+
     for test_data in test_frames:
         await tb.source.send(test_data)
 
     for test_data in test_frames:
-        rx_frame = await tb.sink.recv()
+        rx_frame = await watchdog.recv(tb.sink.recv())
 
         if len(test_data) < 60:
             assert rx_frame.get_payload()[0:len(test_data)] == test_data
@@ -81,6 +100,12 @@ async def run_test(dut, payload_lengths=None, payload_data=None):
 
     assert tb.sink.empty()
 
+    tb.input.report(f"axis_gmii_tx input [{tb.speed}]", 8, tb.log)
+    line_rate = tb.speed.line_rate_mbps(tb.input.rate_mbps(8))
+    tb.log.info("axis_gmii_tx [%s]: %.1f Mbit/s at line rate", tb.speed, line_rate)
+
+    record(str(tb.speed), frames=tb.input.frames, cycles=tb.input.active_cycles, throughput_mbps=line_rate)
+
     await RisingEdge(dut.clk)
     await RisingEdge(dut.clk)
 
@@ -98,4 +123,5 @@ if cocotb.SIM_NAME:
     factory = TestFactory(run_test)
     factory.add_option("payload_lengths", [size_list])
     factory.add_option("payload_data", [incrementing_payload])
+    factory.add_option("speed", bench_speeds())
     factory.generate_tests()
@@ -0,0 +1,151 @@
+-- Copyright (c) 2024 Marcin Zaremba
+--
+-- Permission is hereby granted, free of charge, to any person obtaining a copy
+-- of this software and associated documentation files (the "Software"), to deal
+-- in the Software without restriction, including without limitation the rights
+-- to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+-- copies of the Software, and to permit persons to whom the Software is
+-- furnished to do so, subject to the following conditions:
+--
+-- The above copyright notice and this permission notice shall be included in
+-- all copies or substantial portions of the Software.
+--
+-- THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+-- IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+-- FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+-- AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+-- LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+-- OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+-- THE SOFTWARE.
+
+-- axis_xgmii_rx_64 with clock and reset generated in VHDL (make HDL_CLOCKS=1).
+-- The ports are the ones of axis_xgmii_rx_64, with the clock and reset
+-- brought out for the bench to await and rst_req to restart the reset.
+
+library ieee;
+    use ieee.std_logic_1164.all;
+
+entity axis_xgmii_rx_64_hdl_clk is
+    generic (
+        PTP_TS_ENABLE : boolean  := false;
+        CLK_PERIOD_PS : positive := 6400
+    );
+    port (
+        rst_req : in    std_logic;
+
+        clk : out   std_logic;
+        rst : out   std_logic;
+
+        xgmii_rxd : in    std_logic_vector(63 downto 0);
+        xgmii_rxc : in    std_logic_vector(7 downto 0);
+
+        m_axis_tdata  : out   std_logic_vector(63 downto 0);
+        m_axis_tkeep  : out   std_logic_vector(7 downto 0);
+        m_axis_tvalid : out   std_logic;
+        m_axis_tlast  : out   std_logic;
+        m_axis_tuser  : out   std_logic_vector(0 downto 0);
+
+        cfg_rx_enable : in    std_logic;
+
+        ptp_ts           : in    std_logic_vector(95 downto 0);
+        m_axis_ts_tdata  : out   std_logic_vector(95 downto 0);
+        m_axis_ts_tvalid : out   std_logic;
+
+        start_packet    : out   std_logic_vector(1 downto 0);
+        error_bad_frame : out   std_logic;
+        error_bad_fcs   : out   std_logic
+    );
+end entity axis_xgmii_rx_64_hdl_clk;
+
+architecture sim of axis_xgmii_rx_64_hdl_clk is
+
+    component clk_rst_gen is
+        generic (
+            CLK_PERIOD_PS : positive;
+            RST_CYCLES    : positive
+        );
+        port (
+            rst_req : in    std_logic;
+
+            clk : out   std_logic;
+            rst : out   std_logic
+        );
+    end component;
+
+    component axis_xgmii_rx_64 is
+        generic (
+            PTP_TS_ENABLE : boolean
+        );
+        port (
+            clk : in    std_logic;
+            rst : in    std_logic;
+
+            xgmii_rxd : in    std_logic_vector(63 downto 0);
+            xgmii_rxc : in    std_logic_vector(7 downto 0);
+
+            m_axis_tdata  : out   std_logic_vector(63 downto 0);
+            m_axis_tkeep  : out   std_logic_vector(7 downto 0);
+            m_axis_tvalid : out   std_logic;
+            m_axis_tlast  : out   std_logic;
+            m_axis_tuser  : out   std_logic_vector(0 downto 0);
+
+            cfg_rx_enable : in    std_logic;
+
+            ptp_ts           : in    std_logic_vector(95 downto 0);
+            m_axis_ts_tdata  : out   std_logic_vector(95 downto 0);
+            m_axis_ts_tvalid : out   std_logic;
+
+            start_packet    : out   std_logic_vector(1 downto 0);
+            error_bad_frame : out   std_logic;
+            error_bad_fcs   : out   std_logic
+        );
+    end component;
+
+    signal clk_i : std_logic;
+    signal rst_i : std_logic;
+
+begin
+
+    clk_rst_gen_i : component clk_rst_gen
+        generic map (
+            CLK_PERIOD_PS => CLK_PERIOD_PS,
+            RST_CYCLES    => 5
+        )
+        port map (
+            rst_req => rst_req,
+            clk     => clk_i,
+            rst     => rst_i
+        );
+
+    axis_xgmii_rx_64_i : component axis_xgmii_rx_64
+        generic map (
+            PTP_TS_ENABLE => PTP_TS_ENABLE
+        )
+        port map (
+            clk => clk_i,
+            rst => rst_i,
+
+            xgmii_rxd => xgmii_rxd,
+            xgmii_rxc => xgmii_rxc,
+
+            m_axis_tdata  => m_axis_tdata,
+            m_axis_tkeep  => m_axis_tkeep,
+            m_axis_tvalid => m_axis_tvalid,
+            m_axis_tlast  => m_axis_tlast,
+            m_axis_tuser  => m_axis_tuser,
+
+            cfg_rx_enable => cfg_rx_enable,
+
+            ptp_ts           => ptp_ts,
+            m_axis_ts_tdata  => m_axis_ts_tdata,
+            m_axis_ts_tvalid => m_axis_ts_tvalid,
+
+            start_packet    => start_packet,
+            error_bad_frame => error_bad_frame,
+            error_bad_fcs   => error_bad_fcs
+        );
+
+    clk <= clk_i;
+    rst <= rst_i;
+
+end architecture sim;
@@ -24,37 +24,62 @@ THE SOFTWARE.
 
 import itertools
 import logging
+import os
+import random
 
 import cocotb
-from cocotb.clock import Clock
 from cocotb.triggers import RisingEdge
 from cocotb.regression import TestFactory
 
-from cocotbext.eth import XgmiiFrame, XgmiiSource
+from cocotbext.eth import XgmiiFrame, XgmiiSource, PtpClockSimTime
 from cocotbext.axi import AxiStreamBus, AxiStreamSink
 
+from cosim_bridge import CosimBridge
+from bench_results import record
+from compact_frame import CompactCollector
+from fault_inject import FaultInjector, RecoveryReport, env_rates, size_cycle
+from checker_pool import AxiStreamCapture, CheckerPool
+from hdl_clocks import HDL_CLOCKS, start_clock, reset
+from latency import AxiStreamTimestamper, XgmiiTimestamper, LatencyReport
+from stats import PulseCounter, RxOutputMonitor
+from ptp_ts import PtpTsMonitor, check_ts
+from trace_recorder import trace_endpoint
+from watchdog import Watchdog, frame_ns
+from xgmii_model import XgmiiRx64Model, encode, random_stream, with_fcs
+
 class TB:
-    def __init__(self, dut):
+    def __init__(self, dut, capture=False):
         self.dut = dut
 
         self.log = logging.getLogger("cocotb.tb")
-        self.log.setLevel(logging.DEBUG)
+        self.log.setLevel(logging.INFO)
+
+        start_clock(dut.clk, 6.4, units="ns")
 
-        cocotb.start_soon(Clock(dut.clk, 6.4, units="ns").start())
+        if HDL_CLOCKS:
+            dut.rst_req.setimmediatevalue(0)
 
         self.source = XgmiiSource(dut.xgmii_rxd, dut.xgmii_rxc, dut.clk, dut.rst)
-        self.sink = AxiStreamSink(AxiStreamBus.from_prefix(dut, "m_axis"), dut.clk, dut.rst)
+        trace_endpoint(self.source, "axis_xgmii_rx_64.source")
+        if not capture:
+            self.sink = AxiStreamSink(AxiStreamBus.from_prefix(dut, "m_axis"), dut.clk, dut.rst)
+            trace_endpoint(self.sink, "axis_xgmii_rx_64.sink")
+            self.rx = CompactCollector(self.sink)
+
+        self.start_packet = PulseCounter(dut.clk, dut.start_packet)
+        self.error_bad_frame = PulseCounter(dut.clk, dut.error_bad_frame)
+        self.error_bad_fcs = PulseCounter(dut.clk, dut.error_bad_fcs)
+
+        self.ts_in = XgmiiTimestamper(dut.clk, dut.xgmii_rxd, dut.xgmii_rxc)
+        self.ts_out = AxiStreamTimestamper(dut.clk, dut.m_axis_tvalid, tlast=dut.m_axis_tlast)
+
+        self.ptp_clock = PtpClockSimTime(ts_tod=dut.ptp_ts, clock=dut.clk)
+        self.ts_mon = PtpTsMonitor(dut.clk, dut.m_axis_ts_tdata, dut.m_axis_ts_tvalid)
 
         dut.cfg_rx_enable.setimmediatevalue(0)
 
     async def reset(self):
-        self.dut.rst.setimmediatevalue(0)
-        self.dut.rst.value = 1
-        for _ in range(5):
-            await RisingEdge(self.dut.clk)
-        self.dut.rst.value = 0
-        await RisingEdge(self.dut.clk)
-        await RisingEdge(self.dut.clk)
+        await reset(self.dut.clk, self.dut.rst, self.dut.rst_req if HDL_CLOCKS else None)
 
 
 async def run_test(dut, payload_lengths=None, payload_data=None, bad_fcs=False, ifg=12):
@@ -66,7 +91,20 @@ async def run_test(dut, payload_lengths=None, payload_data=None, bad_fcs=False,
 
     await tb.reset()
 
-    test_frames = [payload_data(x) for x in payload_lengths()]
+    tb.start_packet.start()
+    tb.error_bad_frame.start()
+    tb.error_bad_fcs.start()
+
+    tb.ts_in.start()
+    tb.ts_out.start()
+
+    # received frames leave the sink queue right away, without per-byte tuser lists
+    tb.rx.start()
+
+    test_frames = [bytes(payload_data(x)) for x in payload_lengths()]
+
+    watchdog = Watchdog(tb.log).start()
+    watchdog.expect([len(x) for x in test_frames], sum(frame_ns(len(x), 6.4, 8, ifg) for x in test_frames))
 
     for test_data in test_frames:
         test_frame = XgmiiFrame.from_payload(test_data)
@@ -75,28 +113,264 @@ async def run_test(dut, payload_lengths=None, payload_data=None, bad_fcs=False,
         await tb.source.send(test_frame)
 
     for test_data in test_frames:
-        rx_frame = await tb.sink.recv()
+        rx_frame = await watchdog.recv(tb.rx.recv())
 
-        assert rx_frame.tdata == test_data
+        assert rx_frame.data == test_data
         if bad_fcs:
-            assert rx_frame.tuser[-1] == 1
+            assert rx_frame.tuser_last == 1
         else:
-            assert rx_frame.tuser == 0   
+            assert rx_frame.tuser == 0
+
+    assert tb.rx.empty()
+
+    await RisingEdge(dut.clk)
+    await RisingEdge(dut.clk)
+
+    assert tb.start_packet.count == len(test_frames)
+    assert tb.error_bad_frame.count == (len(test_frames) if bad_fcs else 0)
+    assert tb.error_bad_fcs.count == (len(test_frames) if bad_fcs else 0)
+
+    latency = LatencyReport("axis_xgmii_rx_64", 6.4, tb.log)
+    latency.add([len(x) for x in test_frames], tb.ts_in.frames, tb.ts_out.frames,
+        pattern=f"ifg={ifg}, bad_fcs={bad_fcs}")
+    latency.report()
+
+    cycles = tb.ts_out.frames[-1].last_cycle - tb.ts_in.frames[0].first_cycle + 1
+    record(f"ifg={ifg}, bad_fcs={bad_fcs}", frames=len(test_frames), cycles=cycles,
+        throughput_mbps=sum(len(x) for x in test_frames)*8*1000 / (cycles*6.4))
+
+
+async def run_test_ptp(dut, payload_lengths=None, payload_data=None, ifg=12):
+
+    tb = TB(dut)
+
+    tb.source.ifg = ifg
+    tb.dut.cfg_rx_enable.value = 1
+
+    await tb.reset()
+
+    tb.start_packet.start()
+    tb.ts_mon.start()
+
+    # the source sends copies, SFD times are taken from the frames it actually sent
+    sent_frames = []
+    test_frames = [XgmiiFrame.from_payload(payload_data(x), tx_complete=sent_frames.append)
+        for x in payload_lengths()]
+
+    watchdog = Watchdog(tb.log).start()
+    watchdog.expect([len(x.get_payload()) for x in test_frames],
+                    sum(frame_ns(len(x.get_payload()), 6.4, 8, ifg) for x in test_frames))
+
+    for test_frame in test_frames:
+        await tb.source.send(test_frame)
+
+    for test_frame in test_frames:
+        rx_frame = await watchdog.recv(tb.sink.recv())
+
+        assert rx_frame.tdata == test_frame.get_payload()
+        assert rx_frame.tuser == 0
 
     assert tb.sink.empty()
 
     await RisingEdge(dut.clk)
     await RisingEdge(dut.clk)
 
+    assert tb.start_packet.count == len(tb.ts_mon.timestamps)
+
+    # SFD word timestamped as it is sampled, half a word later for lane 4 starts
+    check_ts(tb.ts_mon.timestamps, sent_frames, 6.4, 0, tb.log)
+
+
+def check_frame(index, data, tuser, expected):
+    payload, bad_fcs = expected[index]
+    if data != payload:
+        return f"payload mismatch, {len(data)} bytes received, {len(payload)} expected"
+    if tuser != bad_fcs:
+        return f"tuser {tuser}, expected {int(bad_fcs)}"
+    return None
+
+
+async def run_test_offload(dut, payload_lengths=None, payload_data=None, bad_fcs=False, workers=2):
+
+    tb = TB(dut, capture=True)
+
+    tb.dut.cfg_rx_enable.value = 1
+
+    await tb.reset()
+
+    test_frames = [payload_data(x) for x in payload_lengths()]
+
+    # frames are compared in checker processes while the simulation keeps running
+    pool = CheckerPool(check_frame, [(bytes(x), bad_fcs) for x in test_frames], workers=workers, log=tb.log)
+    pool.start()
+
+    capture = AxiStreamCapture(pool, dut.clk, dut.m_axis_tdata, dut.m_axis_tvalid, tlast=dut.m_axis_tlast,
+                               tkeep=dut.m_axis_tkeep, tuser=dut.m_axis_tuser)
+    capture.start()
+
+    for test_data in test_frames:
+        test_frame = XgmiiFrame.from_payload(test_data)
+        if bad_fcs:
+            test_frame.data[-1] = 0
+        await tb.source.send(test_frame)
+
+    watchdog = Watchdog(tb.log).start()
+    watchdog.extend(sum(frame_ns(len(x), 6.4, 8) for x in test_frames))
+    watchdog.watch(lambda: [f"{len(test_frames) - pool.frames} frames not captured"])
+
+    await tb.source.wait()
+
+    while pool.frames < len(test_frames):
+        await RisingEdge(dut.clk)
+
+    capture.stop()
+
+    assert not pool.close()
+    assert pool.checked == len(test_frames)
+
+    await RisingEdge(dut.clk)
+    await RisingEdge(dut.clk)
+
+
+async def run_test_model(dut, stream_gen=None):
+
+    tb = TB(dut)
+
+    tb.dut.cfg_rx_enable.value = 1
+
+    await tb.reset()
+
+    # XGMII words straight onto the inputs, every output compared with the reference model
+    stream, payloads = stream_gen(XgmiiRx64Model.lanes)
+    expected = XgmiiRx64Model().run(stream)
+
+    # the frames of a well formed stream come out unchanged whatever the gaps
+    if payloads is not None:
+        assert [(f.data, f.tuser) for f in expected.frames] == [(bytes(x), 0) for x in payloads]
+
+    monitor = RxOutputMonitor(dut).start()
+
+    for d, c in stream.words():
+        dut.xgmii_rxd.value = d
+        dut.xgmii_rxc.value = c
+        await RisingEdge(dut.clk)
+
+    for _ in range(8):
+        await RisingEdge(dut.clk)
+
+    received = monitor.builder
+
+    tb.log.info("%d frames, %d with tuser, start_packet %s, bad_frame %d, bad_fcs %d", len(received.frames),
+        sum(f.tuser for f in received.frames), dict(received.start_packet), received.bad_frame, received.bad_fcs)
+
+    assert received.frames, "no frames received"
+    assert len(received.frames) == len(expected.frames)
+
+    base_rx = received.frames[0].first_cycle
+    base_exp = expected.frames[0].first_cycle
+    for rx_frame, exp_frame in zip(received.frames, expected.frames):
+        assert rx_frame.key(base_rx) == exp_frame.key(base_exp), f"{rx_frame} != {exp_frame}"
+
+    assert received.start_packet == expected.start_packet
+    assert received.bad_frame == expected.bad_frame
+    assert received.bad_fcs == expected.bad_fcs
+
+    await RisingEdge(dut.clk)
+    await RisingEdge(dut.clk)
+
+
+async def run_test_faults(dut, rates=None):
+
+    tb = TB(dut)
+
+    tb.dut.cfg_rx_enable.value = 1
+
+    await tb.reset()
+
+    # continuous traffic with injected faults, every output compared with the reference model
+    stream, sent = FaultInjector(rates, seed=1).xgmii(size_cycle(300), XgmiiRx64Model.lanes)
+    expected = XgmiiRx64Model().run(stream)
+
+    monitor = RxOutputMonitor(dut).start()
+
+    for d, c in stream.words():
+        dut.xgmii_rxd.value = d
+        dut.xgmii_rxc.value = c
+        await RisingEdge(dut.clk)
+
+    for _ in range(8):
+        await RisingEdge(dut.clk)
+
+    received = monitor.builder
+
+    assert received.frames, "no frames received"
+    assert len(received.frames) == len(expected.frames)
+
+    base_rx = received.frames[0].first_cycle
+    base_exp = expected.frames[0].first_cycle
+    for rx_frame, exp_frame in zip(received.frames, expected.frames):
+        assert rx_frame.key(base_rx) == exp_frame.key(base_exp), f"{rx_frame} != {exp_frame}"
+
+    recovery = RecoveryReport("axis_xgmii_rx_64", 6.4, tb.log)
+    recovery.add(sent, received.frames)
+    recovery.report()
+
+    assert recovery.undetected == 0
+
+    record(rates, lost_frames=recovery.lost, recovery_cycles=recovery.worst_case(),
+        throughput_mbps=recovery.goodput_mbps)
+
+    await RisingEdge(dut.clk)
+    await RisingEdge(dut.clk)
+
+
+async def run_test_cosim(dut):
+
+    tb = TB(dut)
+
+    tb.dut.cfg_rx_enable.value = 1
+
+    await tb.reset()
+
+    bridge = CosimBridge(os.environ["COSIM_SOCKET"], tb.source, tb.sink.recv, dut.clk, log=tb.log)
+    stats = await bridge.run()
+
+    record("cosim", frames=stats["frames_in"])
+
+    await RisingEdge(dut.clk)
+    await RisingEdge(dut.clk)
+
 
 def size_list():
     return list(range(60, 128)) + [512, 1514, 9214] + [60]*10
 
 
+def min_size_list():
+    return [60]*64
+
+
+def jumbo_size_list():
+    return [9214]*64
+
+
 def incrementing_payload(length):
     return bytearray(itertools.islice(itertools.cycle(range(256)), length))
 
 
+def ifg_12_stream(lanes):
+    payloads = [incrementing_payload(x) for x in size_list()]
+    return encode([with_fcs(x) for x in payloads], lanes, ifg=12), payloads
+
+
+def ifg_5_stream(lanes):
+    payloads = [incrementing_payload(x) for x in size_list()]
+    return encode([with_fcs(x) for x in payloads], lanes, ifg=5), payloads
+
+
+def corner_stream(lanes):
+    return random_stream(random.Random(1), lanes, frames=64)[0], None
+
+
 if cocotb.SIM_NAME:
 
     factory = TestFactory(run_test)
@@ -105,3 +379,28 @@ if cocotb.SIM_NAME:
     factory.add_option("bad_fcs", [True, False])
     factory.add_option("ifg", [12, 0])
     factory.generate_tests()
+
+    factory = TestFactory(run_test_ptp)
+    factory.add_option("payload_lengths", [size_list, min_size_list])
+    factory.add_option("payload_data", [incrementing_payload])
+    factory.add_option("ifg", [12, 0])
+    factory.generate_tests()
+
+    factory = TestFactory(run_test_offload)
+    factory.add_option("payload_lengths", [size_list, jumbo_size_list])
+    factory.add_option("payload_data", [incrementing_payload])
+    factory.add_option("bad_fcs", [False, True])
+    factory.add_option("workers", [2])
+    factory.generate_tests()
+
+    factory = TestFactory(run_test_model)
+    factory.add_option("stream_gen", [ifg_12_stream, ifg_5_stream, corner_stream])
+    factory.generate_tests()
+
+    factory = TestFactory(run_test_faults)
+    factory.add_option("rates", env_rates())
+    factory.generate_tests()
+
+    if os.environ.get("COSIM_SOCKET"):
+        factory = TestFactory(run_test_cosim)
+        factory.generate_tests()
@@ -24,26 +24,37 @@ THE SOFTWARE.
 
 import itertools
 import logging
+import os
 
 import cocotb
-from cocotb.clock import Clock
 from cocotb.triggers import RisingEdge
 from cocotb.regression import TestFactory
 
 from cocotbext.eth import XgmiiSink, PtpClockSimTime
 from cocotbext.axi import AxiStreamBus, AxiStreamSource, AxiStreamFrame
 
+from cosim_bridge import CosimBridge
+from ptp_ts import PtpTsMonitor, check_ts
+from quiescence import Quiescence
+from trace_recorder import trace_endpoint
+from watchdog import Watchdog, frame_ns
+
 class TB:
     def __init__(self, dut):
         self.dut = dut
 
         self.log = logging.getLogger("cocotb.tb")
-        self.log.setLevel(logging.DEBUG)
+        self.log.setLevel(logging.INFO)
 
-        cocotb.start_soon(Clock(dut.clk, 3.2, units="ns").start())
+        self.idle = Quiescence(dut.clk, 3.2).start()
 
         self.source = AxiStreamSource(AxiStreamBus.from_prefix(dut, "s_axis"), dut.clk, dut.rst)
+        trace_endpoint(self.source, "axis_xgmii_tx_32.source")
         self.sink = XgmiiSink(dut.xgmii_txd, dut.xgmii_txc, dut.clk, dut.rst)
+        trace_endpoint(self.sink, "axis_xgmii_tx_32.sink")
+
+        self.ptp_clock = PtpClockSimTime(ts_tod=dut.ptp_ts, clock=dut.clk)
+        self.ts_mon = PtpTsMonitor(dut.clk, dut.m_axis_ts_tdata, dut.m_axis_ts_tvalid)
 
         dut.cfg_ifg.setimmediatevalue(0)
         dut.cfg_tx_enable.setimmediatevalue(0)
@@ -71,11 +82,14 @@ async def run_test(dut, payload_lengths=None, payload_data=None, ifg=12):
 
     test_frames = [payload_data(x) for x in payload_lengths()]
 
+    watchdog = Watchdog(tb.log).start()
+    watchdog.expect([len(x) for x in test_frames], sum(frame_ns(len(x), 3.2, 4, ifg) for x in test_frames))
+
     for test_data in test_frames:
         await tb.source.send(AxiStreamFrame(test_data, tuser=0))
 
     for test_data in test_frames:
-        rx_frame = await tb.sink.recv()
+        rx_frame = await watchdog.recv(tb.sink.recv())
 
         assert rx_frame.get_payload() == test_data
         assert rx_frame.check_fcs()
@@ -98,19 +112,22 @@ async def run_test_alignment(dut, payload_data=None, ifg=12):
 
     await tb.reset()
 
+    watchdog = Watchdog(tb.log).start()
+
     for length in range(60, 92):
 
-        for k in range(10):
-            await RisingEdge(dut.clk)
+        await tb.idle.skip(10)
 
         test_frames = [payload_data(length) for k in range(10)]
         start_lane = []
 
+        watchdog.expect([length]*10, 10*3.2 + 10*frame_ns(length, 3.2, 4, ifg))
+
         for test_data in test_frames:
             await tb.source.send(AxiStreamFrame(test_data, tuser=0))
 
         for test_data in test_frames:
-            rx_frame = await tb.sink.recv()
+            rx_frame = await watchdog.recv(tb.sink.recv())
 
             assert rx_frame.get_payload() == test_data
             assert rx_frame.check_fcs()
@@ -118,8 +135,8 @@ async def run_test_alignment(dut, payload_data=None, ifg=12):
 
             start_lane.append(rx_frame.start_lane)
 
-        tb.log.info("length: %d", length)
-        tb.log.info("start_lane: %s", start_lane)
+        tb.log.debug("length: %d", length)
+        tb.log.debug("start_lane: %s", start_lane)
 
         start_lane_ref = []
 
@@ -141,7 +158,7 @@ async def run_test_alignment(dut, payload_data=None, ifg=12):
             lane = (lane - offset) % byte_width
             deficit_idle_count = (deficit_idle_count + offset) % 4
 
-        tb.log.info("start_lane_ref: %s", start_lane_ref)
+        tb.log.debug("start_lane_ref: %s", start_lane_ref)
 
         assert start_lane_ref == start_lane
 
@@ -149,6 +166,8 @@ async def run_test_alignment(dut, payload_data=None, ifg=12):
 
     assert tb.sink.empty()
 
+    tb.idle.report(tb.log)
+
     await RisingEdge(dut.clk)
     await RisingEdge(dut.clk)
 
@@ -164,11 +183,14 @@ async def run_test_padding(dut, payload_data=None, ifg=12):
 
     test_frames = [payload_data(x) for x in [32,56,57,58,59,60,62,63,65]]
 
+    watchdog = Watchdog(tb.log).start()
+    watchdog.expect([len(x) for x in test_frames], sum(frame_ns(len(x), 3.2, 4, ifg) for x in test_frames))
+
     for test_data in test_frames:
         await tb.source.send(AxiStreamFrame(test_data, tuser=0))
 
     for test_data in test_frames:
-        rx_frame = await tb.sink.recv()
+        rx_frame = await watchdog.recv(tb.sink.recv())
 
         if len(test_data) < 60:
             assert rx_frame.get_payload()[0:len(test_data)] == test_data
@@ -197,6 +219,9 @@ async def run_test_underrun(dut, ifg=12):
 
     test_data = bytes(x for x in range(60))
 
+    watchdog = Watchdog(tb.log).start()
+    watchdog.expect([60]*3, 36*3.2 + 3*frame_ns(60, 3.2, 4, ifg))
+
     for k in range(3):
         test_frame = AxiStreamFrame(test_data)
         await tb.source.send(test_frame)
@@ -212,7 +237,7 @@ async def run_test_underrun(dut, ifg=12):
     tb.source.pause = False
 
     for k in range(3):
-        rx_frame = await tb.sink.recv()
+        rx_frame = await watchdog.recv(tb.sink.recv())
 
         if k == 1:
             assert rx_frame.data[-1] == 0xFE
@@ -239,6 +264,9 @@ async def run_test_error(dut, ifg=12):
 
     test_data = bytes(x for x in range(60))
 
+    watchdog = Watchdog(tb.log).start()
+    watchdog.expect([60]*3, 36*3.2 + 3*frame_ns(60, 3.2, 4, ifg))
+
     for k in range(3):
         test_frame = AxiStreamFrame(test_data)
         if k == 1:
@@ -246,7 +274,7 @@ async def run_test_error(dut, ifg=12):
         await tb.source.send(test_frame)
 
     for k in range(3):
-        rx_frame = await tb.sink.recv()
+        rx_frame = await watchdog.recv(tb.sink.recv())
 
         if k == 1:
             assert rx_frame.data[-1] == 0xFE
@@ -262,10 +290,70 @@ async def run_test_error(dut, ifg=12):
     await RisingEdge(dut.clk)
 
 
+async def run_test_ptp(dut, payload_lengths=None, payload_data=None, ifg=12):
+
+    tb = TB(dut)
+
+    tb.dut.cfg_ifg.value = ifg
+    tb.dut.cfg_tx_enable.value = 1
+
+    await tb.reset()
+
+    tb.ts_mon.start()
+
+    test_frames = [payload_data(x) for x in payload_lengths()]
+
+    watchdog = Watchdog(tb.log).start()
+    watchdog.expect([len(x) for x in test_frames], sum(frame_ns(len(x), 3.2, 4, ifg) for x in test_frames))
+
+    # queue everything up front, frames leave back-to-back at line rate
+    for test_data in test_frames:
+        await tb.source.send(AxiStreamFrame(test_data, tuser=0))
+
+    rx_frames = []
+
+    for test_data in test_frames:
+        rx_frame = await watchdog.recv(tb.sink.recv())
+
+        assert rx_frame.get_payload() == test_data
+        assert rx_frame.check_fcs()
+
+        rx_frames.append(rx_frame)
+
+    assert tb.sink.empty()
+
+    await RisingEdge(dut.clk)
+    await RisingEdge(dut.clk)
+
+    # timestamp taken as the SFD word is registered out, two cycles before the sink samples the next word
+    check_ts(tb.ts_mon.timestamps, rx_frames, 3.2, -2*3.2, tb.log)
+
+
+async def run_test_cosim(dut):
+
+    tb = TB(dut)
+
+    tb.dut.cfg_ifg.value = 12
+    tb.dut.cfg_tx_enable.value = 1
+
+    await tb.reset()
+
+    # AXI stream payloads from the socket client, XGMII frames back
+    bridge = CosimBridge(os.environ["COSIM_SOCKET"], tb.source, tb.sink.recv, dut.clk, log=tb.log)
+    await bridge.run()
+
+    await RisingEdge(dut.clk)
+    await RisingEdge(dut.clk)
+
+
 def size_list():
     return list(range(60, 128)) + [512, 1514, 9214] + [60]*10
 
 
+def min_size_list():
+    return [60]*64
+
+
 def incrementing_payload(length):
     return bytearray(itertools.islice(itertools.cycle(range(256)), length))
 
@@ -278,6 +366,12 @@ if cocotb.SIM_NAME:
     factory.add_option("ifg", [12])
     factory.generate_tests()
 
+    factory = TestFactory(run_test_ptp)
+    factory.add_option("payload_lengths", [size_list, min_size_list])
+    factory.add_option("payload_data", [incrementing_payload])
+    factory.add_option("ifg", [12])
+    factory.generate_tests()
+
     for test in [run_test_alignment, run_test_padding]:
         factory = TestFactory(test)
         factory.add_option("payload_data", [incrementing_payload])
@@ -288,3 +382,7 @@ if cocotb.SIM_NAME:
         factory = TestFactory(test)
         factory.add_option("ifg", [12])
         factory.generate_tests()
+
+    if os.environ.get("COSIM_SOCKET"):
+        factory = TestFactory(run_test_cosim)
+        factory.generate_tests()
@@ -0,0 +1,387 @@
+#!/usr/bin/env python
+"""
+Copyright (c) 2024 Marcin Zaremba
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+# Benchmark results database
+#
+# Benches call record() from inside a test to store bench metrics (frames,
+# cycles, throughput, ...) in bench_metrics.jsonl next to results.xml.
+# "make results" in a bench directory then ingests both files into a SQLite
+# database, one run per bench and commit:
+#
+#     bench_results.py ingest --bench axis_xgmii_rx_64_tb --results results.xml --metrics bench_metrics.jsonl
+#     bench_results.py runs
+#     bench_results.py history --bench axis_xgmii_rx_64_tb --metric wall_time_s
+#     bench_results.py compare --baseline master --threshold wall_time_s=10
+#     bench_results.py rate results_py_clocks.xml results_hdl_clocks.xml
+#     bench_results.py scaling 1=results_ports_1.xml 4=results_ports_4.xml
+#
+# compare exits with status 1 when a metric regressed by more than its threshold.
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import xml.etree.ElementTree as ET
+
+DEFAULT_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "bench_results.db")
+DEFAULT_METRICS_FILE = "bench_metrics.jsonl"
+
+# metric: (better direction, default regression threshold in percent)
+METRICS = {
+    "wall_time_s": ("lower", 20.0),
+    "sim_time_ns": ("lower", None),
+    "sim_ns_per_s": ("higher", 20.0),
+    "frames_per_s": ("higher", 20.0),
+    "cycles": ("lower", 0.0),
+    "throughput_mbps": ("higher", 0.0),
+    "lost_beats": ("lower", 0.0),
+    "bubbles": ("lower", 0.0),
+    "lost_frames": ("lower", 0.0),
+    "recovery_cycles": ("lower", 0.0),
+}
+
+SCHEMA = """
+create table if not exists runs (
+    id integer primary key,
+    created text not null,
+    commit_id text,
+    dirty integer,
+    bench text not null,
+    simulator text,
+    host text
+);
+create table if not exists results (
+    run_id integer not null references runs(id),
+    test text not null,
+    variant text not null default '',
+    status text not null,
+    metric text not null,
+    value real not null
+);
+create index if not exists results_run on results(run_id);
+"""
+
+_metrics_started = False
+
+
+def record(variant=None, **metrics):
+    """Store bench metrics of the running test, to be ingested with its results.xml entry"""
+
+    global _metrics_started
+
+    import cocotb
+
+    test = getattr(getattr(cocotb, "regression_manager", None), "_test", None)
+    entry = {
+        "test": test.__qualname__ if test is not None else None,
+        "variant": variant or "",
+        "metrics": metrics,
+    }
+
+    # one simulator process is one regression, start from an empty file
+    path = os.environ.get("BENCH_METRICS_FILE", DEFAULT_METRICS_FILE)
+    with open(path, "a" if _metrics_started else "w") as f:
+        f.write(json.dumps(entry) + "\n")
+
+    _metrics_started = True
+
+
+def git_commit(path="."):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=path, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=path,
+                               capture_output=True, text=True, check=True).stdout.strip() != ""
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+    return commit, dirty
+
+
+def resolve_commit(ref, path="."):
+    try:
+        return subprocess.run(["git", "rev-parse", ref], cwd=path, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        # not a git ref, match commit id prefixes in the database
+        return ref
+
+
+def connect(path):
+    db = sqlite3.connect(path)
+    db.executescript(SCHEMA)
+    return db
+
+
+def parse_results_xml(path):
+    results = {}
+    for tc in ET.parse(path).iter("testcase"):
+        status = "pass"
+        if tc.find("failure") is not None or tc.find("error") is not None:
+            status = "fail"
+        elif tc.find("skipped") is not None:
+            status = "skip"
+
+        metrics = {}
+        for name, attr in (("wall_time_s", "time"), ("sim_time_ns", "sim_time_ns"), ("sim_ns_per_s", "ratio_time")):
+            if tc.get(attr) is not None:
+                metrics[name] = float(tc.get(attr))
+
+        results[tc.get("name")] = {"status": status, "variant": "", "metrics": metrics}
+    return results
+
+
+def parse_metrics(path):
+    metrics = {}
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                metrics.setdefault(entry["test"], []).append(entry)
+    return metrics
+
+
+def ingest(db, bench, results_xml, metrics_file=None, simulator=None, commit=None, dirty=None):
+    results = parse_results_xml(results_xml)
+
+    if metrics_file and os.path.exists(metrics_file):
+        for test, entries in parse_metrics(metrics_file).items():
+            if test not in results:
+                continue
+            res = results[test]
+            for entry in entries:
+                res["variant"] = entry["variant"] or res["variant"]
+                res["metrics"].update(entry["metrics"])
+
+    for res in results.values():
+        m = res["metrics"]
+        if "frames" in m and m.get("wall_time_s"):
+            m["frames_per_s"] = m["frames"] / m["wall_time_s"]
+
+    if commit is None:
+        commit, dirty = git_commit(os.path.dirname(os.path.abspath(results_xml)))
+
+    cur = db.execute("insert into runs (created, commit_id, dirty, bench, simulator, host) values (?, ?, ?, ?, ?, ?)",
+                     (datetime.datetime.now().isoformat(timespec="seconds"), commit, int(bool(dirty)), bench,
+                      simulator, platform.node()))
+    run_id = cur.lastrowid
+
+    for test, res in results.items():
+        for metric, value in res["metrics"].items():
+            db.execute("insert into results (run_id, test, variant, status, metric, value) values (?, ?, ?, ?, ?, ?)",
+                       (run_id, test, res["variant"], res["status"], metric, value))
+
+    db.commit()
+    return run_id
+
+
+def latest_values(db, commit, bench=None):
+    # newest run per bench for the commit (id prefix), keyed by bench, test, metric
+    query = ("select r.bench, x.test, x.variant, x.metric, x.value, x.status from results x "
+             "join runs r on r.id = x.run_id where r.id in ("
+             "select max(id) from runs where commit_id like ? group by bench)")
+    args = [commit + "%"]
+    if bench:
+        query += " and r.bench = ?"
+        args.append(bench)
+
+    values = {}
+    for b, test, variant, metric, value, status in db.execute(query, args):
+        values[(b, test, metric)] = (value, variant, status)
+    return values
+
+
+def compare(db, baseline, candidate, thresholds, bench=None, out=sys.stdout):
+    base = latest_values(db, baseline, bench)
+    cand = latest_values(db, candidate, bench)
+
+    regressions = set()
+
+    for key in sorted(cand):
+        if key not in base:
+            continue
+
+        b, test, metric = key
+        base_val, _, _ = base[key]
+        cand_val, variant, status = cand[key]
+
+        direction, _ = METRICS.get(metric, ("lower", None))
+        threshold = thresholds.get(metric)
+
+        if base_val == 0:
+            change = 0.0 if cand_val == 0 else float("inf")
+        else:
+            change = (cand_val - base_val) / abs(base_val) * 100
+        worse = change if direction == "lower" else -change
+
+        flag = ""
+        if status == "fail":
+            flag = "FAIL"
+            regressions.add((b, test, "status"))
+        elif threshold is not None and worse > threshold:
+            flag = "REGRESSION"
+            regressions.add(key)
+
+        name = f"{b} {test}" + (f" [{variant}]" if variant else "")
+        print(f"{name:60} {metric:16} {base_val:14.4g} {cand_val:14.4g} {change:+8.2f}% {flag}", file=out)
+
+    return sorted(regressions)
+
+
+def sim_rate(baseline_xml, results_xml, out=sys.stdout):
+    """Simulated ns per wall second of two results.xml files of the same bench, per test and overall"""
+
+    base = parse_results_xml(baseline_xml)
+    cand = parse_results_xml(results_xml)
+
+    totals = [[0.0, 0.0], [0.0, 0.0]]
+    for test in base:
+        if test not in cand:
+            continue
+        rates = []
+        for total, res in zip(totals, (base[test], cand[test])):
+            m = res["metrics"]
+            total[0] += m.get("sim_time_ns", 0.0)
+            total[1] += m.get("wall_time_s", 0.0)
+            rates.append(m.get("sim_ns_per_s", 0.0))
+        print(f"{test:60} {rates[0]:14.4g} {rates[1]:14.4g} {rates[1] / rates[0] if rates[0] else 0.0:8.2f}x", file=out)
+
+    overall = [sim / wall if wall else 0.0 for sim, wall in totals]
+    print(f"{'total':60} {overall[0]:14.4g} {overall[1]:14.4g} "
+          f"{overall[1] / overall[0] if overall[0] else 0.0:8.2f}x", file=out)
+    return overall
+
+
+def wall_scaling(results, out=sys.stdout):
+    """Wall time of one simulation with N instances against N simulations with one, from {N: results.xml}"""
+
+    totals = {}
+    for n, path in sorted(results.items()):
+        metrics = [res["metrics"] for res in parse_results_xml(path).values()]
+        totals[n] = (sum(m.get("wall_time_s", 0.0) for m in metrics), sum(m.get("sim_time_ns", 0.0) for m in metrics))
+
+    base_n = min(totals)
+    base_wall = totals[base_n][0] / base_n
+
+    print(f"{'N':>4} {'wall s':>10} {'N separate':>10} {'ratio':>8} {'sim ns/s':>12}", file=out)
+    for n, (wall, sim) in totals.items():
+        separate = base_wall*n
+        print(f"{n:4} {wall:10.2f} {separate:10.2f} {wall / separate if separate else 0.0:8.2f} "
+              f"{sim / wall if wall else 0.0:12.4g}", file=out)
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark results database")
+    parser.add_argument("--db", default=os.environ.get("BENCH_RESULTS_DB", DEFAULT_DB), help="database file")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("ingest", help="store a results.xml and bench metrics as a new run")
+    p.add_argument("--bench", required=True)
+    p.add_argument("--results", default="results.xml")
+    p.add_argument("--metrics", default=os.environ.get("BENCH_METRICS_FILE", DEFAULT_METRICS_FILE))
+    p.add_argument("--simulator")
+    p.add_argument("--commit", help="commit id, default is HEAD of the results directory")
+
+    p = sub.add_parser("runs", help="list runs")
+    p.add_argument("--bench")
+    p.add_argument("-n", type=int, default=20)
+
+    p = sub.add_parser("history", help="metric values over the runs")
+    p.add_argument("--bench", required=True)
+    p.add_argument("--metric", required=True)
+    p.add_argument("--test")
+
+    p = sub.add_parser("compare", help="compare against a baseline commit, exit status 1 on regressions")
+    p.add_argument("--baseline", required=True, help="git ref or commit id prefix")
+    p.add_argument("--candidate", default="HEAD", help="git ref or commit id prefix, default HEAD")
+    p.add_argument("--bench")
+    p.add_argument("--threshold", action="append", default=[], metavar="METRIC=PERCENT",
+                   help="allowed regression in percent, overrides the defaults")
+
+    p = sub.add_parser("rate", help="simulated ns per wall second of two results.xml files, no database")
+    p.add_argument("baseline")
+    p.add_argument("results")
+
+    p = sub.add_parser("scaling", help="wall time against the number of instances per simulation, no database")
+    p.add_argument("results", nargs="+", metavar="N=RESULTS_XML")
+
+    args = parser.parse_args(argv)
+
+    if args.cmd == "rate":
+        sim_rate(args.baseline, args.results)
+        return 0
+
+    if args.cmd == "scaling":
+        wall_scaling({int(n): path for n, _, path in (item.partition("=") for item in args.results)})
+        return 0
+
+    db = connect(args.db)
+
+    if args.cmd == "ingest":
+        run_id = ingest(db, args.bench, args.results, args.metrics, args.simulator, args.commit)
+        if os.path.exists(args.metrics):
+            os.remove(args.metrics)
+        print(f"run {run_id}: {args.bench} from {args.results}")
+
+    elif args.cmd == "runs":
+        query = "select id, created, commit_id, dirty, bench, simulator from runs"
+        query_args = []
+        if args.bench:
+            query += " where bench = ?"
+            query_args.append(args.bench)
+        query += " order by id desc limit ?"
+        query_args.append(args.n)
+        for run_id, created, commit, dirty, bench, sim in db.execute(query, query_args):
+            print(f"{run_id:5} {created} {(commit or '-')[:12]}{'+' if dirty else ' '} {bench} {sim or ''}")
+
+    elif args.cmd == "history":
+        query = ("select r.id, r.commit_id, x.test, x.variant, x.value from results x join runs r on r.id = x.run_id "
+                 "where r.bench = ? and x.metric = ?")
+        query_args = [args.bench, args.metric]
+        if args.test:
+            query += " and x.test = ?"
+            query_args.append(args.test)
+        for run_id, commit, test, variant, value in db.execute(query + " order by x.test, r.id", query_args):
+            print(f"{run_id:5} {(commit or '-')[:12]} {test} {variant} {value:.6g}")
+
+    elif args.cmd == "compare":
+        thresholds = {name: threshold for name, (_, threshold) in METRICS.items()}
+        for item in args.threshold:
+            name, _, val = item.partition("=")
+            thresholds[name] = float(val)
+
+        regressions = compare(db, resolve_commit(args.baseline), resolve_commit(args.candidate), thresholds,
+                              args.bench)
+        if regressions:
+            print(f"{len(regressions)} regressions")
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
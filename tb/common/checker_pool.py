@@ -0,0 +1,314 @@
+#!/usr/bin/env python
+"""
+Copyright (c) 2024 Marcin Zaremba
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+
+import logging
+import multiprocessing
+import os
+import queue
+import struct
+import sys
+import time
+from multiprocessing import shared_memory
+
+import cocotb
+from cocotb.triggers import RisingEdge, Timer
+
+from latency import is_high
+
+# ring record: type, payload length
+REC_HDR = struct.Struct("<BI")
+REC_BEAT = 0
+REC_END = 1
+REC_STOP = 2
+
+BEAT_HDR = struct.Struct("<Q")      # tkeep, followed by tdata bytes
+END_REC = struct.Struct("<QB")      # frame index, tuser
+
+RING_HDR = struct.Struct("<QQ")     # head (producer), tail (consumer)
+
+
+class Ring:
+    """Single producer, single consumer byte ring in shared memory"""
+
+    def __init__(self, size=1 << 22, name=None):
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=RING_HDR.size + size)
+            RING_HDR.pack_into(self.shm.buf, 0, 0, 0)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self.size = size
+        self.data = self.shm.buf[RING_HDR.size:RING_HDR.size + size]
+
+    def close(self, unlink=False):
+        self.data.release()
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+    def _pos(self):
+        return RING_HDR.unpack_from(self.shm.buf, 0)
+
+    def _copy_in(self, pos, buf):
+        pos %= self.size
+        n = min(len(buf), self.size - pos)
+        self.data[pos:pos + n] = buf[:n]
+        if n < len(buf):
+            self.data[0:len(buf) - n] = buf[n:]
+
+    def _copy_out(self, pos, length):
+        pos %= self.size
+        n = min(length, self.size - pos)
+        if n == length:
+            return bytes(self.data[pos:pos + n])
+        return bytes(self.data[pos:pos + n]) + bytes(self.data[0:length - n])
+
+    def write(self, rec_type, payload=b""):
+        rec = REC_HDR.pack(rec_type, len(payload)) + payload
+        assert len(rec) <= self.size, "record larger than ring"
+
+        head, tail = self._pos()
+        while head + len(rec) - tail > self.size:
+            # checkers fell a whole ring behind, let them catch up
+            time.sleep(0.0001)
+            head, tail = self._pos()
+
+        self._copy_in(head, rec)
+        # publish after the data is in place
+        struct.pack_into("<Q", self.shm.buf, 0, head + len(rec))
+
+    def read(self):
+        head, tail = self._pos()
+        records = []
+        while tail < head:
+            rec_type, length = REC_HDR.unpack(self._copy_out(tail, REC_HDR.size))
+            records.append((rec_type, self._copy_out(tail + REC_HDR.size, length)))
+            tail += REC_HDR.size + length
+        struct.pack_into("<Q", self.shm.buf, 8, tail)
+        return records
+
+
+def _keep_bytes(tkeep, tdata):
+    if tkeep == (1 << len(tdata)) - 1:
+        return tdata
+    return bytes(b for k, b in enumerate(tdata) if tkeep & (1 << k))
+
+
+def _worker(ring_name, ring_size, results, check, context):
+    ring = Ring(ring_size, name=ring_name)
+    frame = bytearray()
+    checked = 0
+
+    try:
+        while True:
+            records = ring.read()
+            if not records:
+                time.sleep(0.0005)
+                continue
+
+            for rec_type, payload in records:
+                if rec_type == REC_BEAT:
+                    tkeep, = BEAT_HDR.unpack_from(payload)
+                    frame += _keep_bytes(tkeep, payload[BEAT_HDR.size:])
+                elif rec_type == REC_END:
+                    index, tuser = END_REC.unpack(payload)
+                    try:
+                        error = check(index, bytes(frame), tuser, context)
+                    except Exception as e:
+                        error = f"checker raised {e!r}"
+                    if error:
+                        results.put(("error", index, error))
+                    checked += 1
+                    frame.clear()
+                else:
+                    results.put(("done", checked, None))
+                    return
+    finally:
+        ring.close()
+
+
+class CheckerPool:
+    """Verifies captured frames in worker processes while the simulation runs
+
+    check(index, data, tuser, context) is called in a worker for every frame
+    and returns an error string or None. It has to be a module level function
+    (benches guard their test factories with cocotb.SIM_NAME, so importing
+    the bench module from a worker is safe) and context is pickled once per
+    worker. Frames are dealt round-robin to the workers, each through its own
+    shared memory ring.
+    """
+
+    def __init__(self, check, context=None, workers=2, ring_size=1 << 22, log=None):
+        self.check = check
+        self.context = context
+        self.workers = workers
+        self.ring_size = ring_size
+        self.log = log or logging.getLogger("cocotb.tb")
+
+        self.frames = 0
+        self.checked = 0
+        self.errors = []
+
+        self._rings = []
+        self._procs = []
+        self._results = None
+        self._ring = None
+        self._monitor = None
+
+    def start(self):
+        ctx = multiprocessing.get_context("spawn")
+        # inside the simulator sys.executable is not necessarily python
+        ctx.set_executable(os.environ.get("PYGPI_PYTHON_BIN") or sys.executable)
+
+        self._results = ctx.Queue()
+
+        for _ in range(self.workers):
+            ring = Ring(self.ring_size)
+            proc = ctx.Process(target=_worker, args=(ring.name, self.ring_size, self._results, self.check,
+                                                     self.context), daemon=True)
+            proc.start()
+            self._rings.append(ring)
+            self._procs.append(proc)
+
+        self._monitor = cocotb.start_soon(self._poll())
+        return self
+
+    def beat(self, tdata, tkeep=None):
+        if self._ring is None:
+            self._ring = self._rings[self.frames % self.workers]
+        if tkeep is None:
+            tkeep = (1 << len(tdata)) - 1
+        self._ring.write(REC_BEAT, BEAT_HDR.pack(tkeep) + tdata)
+
+    def end(self, tuser=0):
+        if self._ring is None:
+            self._ring = self._rings[self.frames % self.workers]
+        self._ring.write(REC_END, END_REC.pack(self.frames, tuser))
+        self._ring = None
+        self.frames += 1
+
+    def submit(self, data, tuser=0):
+        self.beat(bytes(data))
+        self.end(tuser)
+
+    def _collect(self, block=False, timeout=None):
+        done = 0
+        while True:
+            try:
+                kind, a, b = self._results.get(block=block, timeout=timeout)
+            except queue.Empty:
+                return done
+            if kind == "error":
+                self.log.error("checker: frame %d: %s", a, b)
+                self.errors.append((a, b))
+            else:
+                self.checked += a
+                done += 1
+                if block:
+                    return done
+
+    async def _poll(self, interval_ns=10000):
+        # mismatches are reported while the simulation is still running
+        while True:
+            await Timer(interval_ns, 'ns')
+            self._collect()
+
+    def close(self, timeout=60):
+        """Waits for all frames to be checked, returns the list of (frame index, error)"""
+
+        if self._monitor is not None:
+            self._monitor.kill()
+            self._monitor = None
+
+        for ring in self._rings:
+            ring.write(REC_STOP)
+
+        done = 0
+        deadline = time.monotonic() + timeout
+        while done < self.workers:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done += self._collect(block=True, timeout=remaining)
+
+        for proc in self._procs:
+            proc.join(timeout=1)
+            if proc.is_alive():
+                proc.terminate()
+
+        for ring in self._rings:
+            ring.close(unlink=True)
+
+        self._rings.clear()
+        self._procs.clear()
+
+        assert done == self.workers, "checker workers did not finish"
+
+        self.log.info("checker pool: %d frames captured, %d checked by %d workers, %d errors", self.frames,
+                      self.checked, self.workers, len(self.errors))
+
+        return self.errors
+
+
+class AxiStreamCapture:
+    """Passes every transfer of an AXI stream to a CheckerPool as raw beats"""
+
+    def __init__(self, pool, clock, tdata, tvalid, tready=None, tlast=None, tkeep=None, tuser=None):
+        self.pool = pool
+        self.clock = clock
+        self.tdata = tdata
+        self.tvalid = tvalid
+        self.tready = tready
+        self.tlast = tlast
+        self.tkeep = tkeep
+        self.tuser = tuser
+        self.byte_width = len(tdata) // 8
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = cocotb.start_soon(self._run())
+        return self
+
+    def stop(self):
+        if self._task is not None:
+            self._task.kill()
+            self._task = None
+
+    async def _run(self):
+        pool = self.pool
+        width = self.byte_width
+        clock_edge = RisingEdge(self.clock)
+
+        while True:
+            await clock_edge
+
+            if not is_high(self.tvalid) or (self.tready is not None and not is_high(self.tready)):
+                continue
+
+            tkeep = self.tkeep.value.integer if self.tkeep is not None else None
+            pool.beat(self.tdata.value.integer.to_bytes(width, 'little'), tkeep)
+
+            if self.tlast is None or is_high(self.tlast):
+                pool.end(self.tuser.value.integer if self.tuser is not None else 0)
@@ -0,0 +1,79 @@
+-- Copyright (c) 2024 Marcin Zaremba
+--
+-- Permission is hereby granted, free of charge, to any person obtaining a copy
+-- of this software and associated documentation files (the "Software"), to deal
+-- in the Software without restriction, including without limitation the rights
+-- to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+-- copies of the Software, and to permit persons to whom the Software is
+-- furnished to do so, subject to the following conditions:
+--
+-- The above copyright notice and this permission notice shall be included in
+-- all copies or substantial portions of the Software.
+--
+-- THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+-- IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+-- FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+-- AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+-- LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+-- OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+-- THE SOFTWARE.
+
+-- Simulation clock and reset generator
+
+-- Generates a free running clock and a synchronous, active-high reset inside
+-- the simulator, so benches do not toggle clocks from Python. Reset is
+-- asserted from time zero and again for RST_CYCLES clock cycles after every
+-- cycle with rst_req = '1'.
+
+library ieee;
+    use ieee.std_logic_1164.all;
+
+entity clk_rst_gen is
+    generic (
+        CLK_PERIOD_PS : positive := 8000;
+        RST_CYCLES    : positive := 5
+    );
+    port (
+        rst_req : in    std_logic;
+
+        clk : out   std_logic;
+        rst : out   std_logic
+    );
+end entity clk_rst_gen;
+
+architecture sim of clk_rst_gen is
+
+    constant HALF_PERIOD : time := (CLK_PERIOD_PS / 2) * 1 ps;
+
+    signal clk_i   : std_logic;
+    signal rst_cnt : natural range 0 to RST_CYCLES;
+
+begin
+
+    CLK_PROC : process is
+    begin
+        clk_i <= '0';
+        wait for HALF_PERIOD;
+        clk_i <= '1';
+        wait for HALF_PERIOD;
+
+    end process CLK_PROC;
+
+    -- rst_cnt starts from zero, reset is asserted until it reaches RST_CYCLES
+    RST_PROC : process (clk_i) is
+    begin
+        if rising_edge(clk_i) then
+            if (rst_req = '1') then
+                rst_cnt <= 0;
+            elsif (rst_cnt /= RST_CYCLES) then
+                rst_cnt <= rst_cnt + 1;
+            end if;
+        end if;
+
+    end process RST_PROC;
+
+    clk <= clk_i;
+    rst <= '1' when rst_cnt /= RST_CYCLES else
+           '0';
+
+end architecture sim;
@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+"""
+Copyright (c) 2024 Marcin Zaremba
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+
+import gc
+import sys
+import time
+import tracemalloc
+from collections import deque
+
+import cocotb
+from cocotb.triggers import Event
+
+from cocotbext.axi import AxiStreamFrame
+
+
+def _pack(values, width):
+    # per-byte sideband values packed into one integer, width bits per byte
+    packed = 0
+    for k, v in enumerate(values):
+        if v:
+            packed |= v << (k*width)
+    return packed
+
+
+def _unpack(packed, width, n):
+    mask = (1 << width) - 1
+    return [(packed >> (k*width)) & mask for k in range(n)]
+
+
+class CompactFrame:
+    """Immutable frame for scoreboards: bytes payload, bit-packed tkeep and tuser
+
+    tkeep is None when all bytes are kept, tuser is an int with tuser_width
+    bits per byte (bit k*tuser_width for byte k), 0 when there is no tuser.
+    A scalar tuser applies to the frame and is stored on the last byte.
+    """
+
+    __slots__ = ("data", "tkeep", "tuser", "tuser_width")
+
+    def __init__(self, data=b"", tkeep=None, tuser=0, tuser_width=1):
+        self.data = bytes(data)
+        self.tkeep = tkeep
+        self.tuser = tuser
+        self.tuser_width = tuser_width
+
+    @classmethod
+    def from_payload(cls, data, tuser_last=0, tuser_width=1):
+        return cls(data, tuser=tuser_last << ((len(data)-1)*tuser_width) if data else 0, tuser_width=tuser_width)
+
+    @classmethod
+    def from_axis(cls, frame, tuser_width=1):
+        data = bytes(frame.tdata)
+        n = len(data)
+
+        tkeep = None
+        if frame.tkeep is not None and not all(frame.tkeep):
+            tkeep = _pack(frame.tkeep, 1)
+
+        tuser = frame.tuser
+        if tuser is None:
+            tuser = 0
+        elif isinstance(tuser, (int, bool)):
+            # a frame level flag, kept on the last byte as from_payload() does
+            tuser = int(tuser) << ((n-1)*tuser_width) if n else 0
+        else:
+            tuser = _pack(tuser, tuser_width)
+
+        return cls(data, tkeep, tuser, tuser_width)
+
+    def to_axis(self):
+        n = len(self.data)
+        tkeep = _unpack(self.tkeep, 1, n) if self.tkeep is not None else None
+        tuser = _unpack(self.tuser, self.tuser_width, n) if self.tuser else 0
+        return AxiStreamFrame(bytearray(self.data), tkeep=tkeep, tuser=tuser)
+
+    @property
+    def view(self):
+        return memoryview(self.data)
+
+    @property
+    def tuser_last(self):
+        if not self.data:
+            return 0
+        return (self.tuser >> ((len(self.data)-1)*self.tuser_width)) & ((1 << self.tuser_width) - 1)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __eq__(self, other):
+        if isinstance(other, CompactFrame):
+            return (self.data == other.data and self.tkeep == other.tkeep and self.tuser == other.tuser
+                    and self.tuser_width == other.tuser_width)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((self.data, self.tkeep, self.tuser))
+
+    def __repr__(self):
+        return (f"{type(self).__name__}(data={self.data[:16]!r}{'...' if len(self.data) > 16 else ''}, "
+                f"len={len(self.data)}, tkeep={self.tkeep!r}, tuser={self.tuser:#x})")
+
+
+class CompactCollector:
+    """Moves frames out of a cocotbext-axi sink as soon as they arrive, kept as CompactFrame"""
+
+    def __init__(self, sink, tuser_width=1):
+        self.sink = sink
+        self.tuser_width = tuser_width
+        self.queue = deque()
+        self._event = Event()
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = cocotb.start_soon(self._run())
+        return self
+
+    def empty(self):
+        return not self.queue and self.sink.empty()
+
+    async def recv(self):
+        while not self.queue:
+            self._event.clear()
+            await self._event.wait()
+        return self.queue.popleft()
+
+    async def _run(self):
+        while True:
+            frame = await self.sink.recv()
+            self.queue.append(CompactFrame.from_axis(frame, self.tuser_width))
+            self._event.set()
+
+
+def _measure(make, count):
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    frames = [make(k) for k in range(count)]
+    used = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+
+    t = time.perf_counter()
+    gc.collect()
+    gc_time = time.perf_counter() - t
+
+    del frames
+    return used / count, gc_time
+
+
+def benchmark(length=9214, count=256, out=sys.stdout):
+    """Memory per in-flight frame as a sink returns it versus CompactFrame"""
+
+    payloads = [bytes((k + i) & 0xff for i in range(length)) for k in range(4)]
+
+    def axis_good(k):
+        return AxiStreamFrame(bytearray(payloads[k % 4]), tuser=0)
+
+    def axis_bad(k):
+        # as received with an error flagged on the last beat only
+        return AxiStreamFrame(bytearray(payloads[k % 4]), tuser=[0]*(length-1) + [1])
+
+    def compact_good(k):
+        return CompactFrame.from_axis(axis_good(k))
+
+    def compact_bad(k):
+        return CompactFrame.from_axis(axis_bad(k))
+
+    print(f"{count} in-flight frames of {length} bytes", file=out)
+    for name, make in (("AxiStreamFrame", axis_good), ("AxiStreamFrame, per-byte tuser", axis_bad),
+                       ("CompactFrame", compact_good), ("CompactFrame, tuser on last byte", compact_bad)):
+        per_frame, gc_time = _measure(make, count)
+        print(f"  {name:34} {per_frame/1024:9.1f} KiB/frame, gc.collect {gc_time*1000:7.2f} ms", file=out)
+
+
+if __name__ == "__main__":
+    benchmark(*[int(x) for x in sys.argv[1:3]])
@@ -0,0 +1,365 @@
+#!/usr/bin/env python
+"""
+Copyright (c) 2024 Marcin Zaremba
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+
+# Co-simulation bridge
+#
+# A bench test (run_test_cosim) listens on the UNIX socket COSIM_SOCKET and
+# feeds the frames a client sends into a bench source, frames from the bench
+# sink go back to the client. Messages are a 5 byte header (type, length)
+# followed by the frame, the bench grants credits so the client never has more
+# than the window of frames queued in the simulation. "make cosim" in a bench
+# directory starts the bench and this script as the client:
+#
+#     cosim_bridge.py client cosim.sock --gen 10000 --size 64
+#     cosim_bridge.py client cosim.sock --pcap capture.pcap --check
+
+import argparse
+import itertools
+import os
+import select
+import socket
+import struct
+import sys
+import time
+
+MSG_FRAME = 1
+MSG_CREDIT = 2
+MSG_END = 3
+
+HDR = struct.Struct("<BI")
+CREDIT = struct.Struct("<I")
+
+
+class Connection:
+    """Non-blocking message framing over a stream socket, both directions buffered"""
+
+    def __init__(self, sock):
+        sock.setblocking(False)
+        self.sock = sock
+        self.inbuf = bytearray()
+        self.outbuf = bytearray()
+        self.closed = False
+
+    def send(self, kind, payload=b""):
+        self.outbuf += HDR.pack(kind, len(payload))
+        self.outbuf += payload
+
+    def pump(self, timeout=0.0):
+        wlist = [self.sock] if self.outbuf else []
+        rlist, wlist, _ = select.select([self.sock], wlist, [], timeout)
+
+        if wlist:
+            try:
+                n = self.sock.send(self.outbuf)
+                del self.outbuf[:n]
+            except BlockingIOError:
+                pass
+            except OSError:
+                self.closed = True
+
+        if rlist:
+            try:
+                data = self.sock.recv(1 << 18)
+            except BlockingIOError:
+                data = None
+            except OSError:
+                data = b""
+            if data is not None:
+                if data:
+                    self.inbuf += data
+                else:
+                    self.closed = True
+
+    def messages(self):
+        msgs = []
+        pos = 0
+        buf = self.inbuf
+        while len(buf) - pos >= HDR.size:
+            kind, length = HDR.unpack_from(buf, pos)
+            if len(buf) - pos - HDR.size < length:
+                break
+            pos += HDR.size
+            msgs.append((kind, bytes(buf[pos:pos+length])))
+            pos += length
+        del buf[:pos]
+        return msgs
+
+    def flush(self, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while self.outbuf and not self.closed and time.monotonic() < deadline:
+            self.pump(0.1)
+
+    def close(self):
+        self.sock.close()
+
+
+def frame_factory(source):
+    # frame object the bench source expects for a payload
+    name = type(source).__name__
+    if name == "GmiiSource":
+        from cocotbext.eth import GmiiFrame
+        return GmiiFrame.from_payload
+    if name == "XgmiiSource":
+        from cocotbext.eth import XgmiiFrame
+        return XgmiiFrame.from_payload
+    return bytes
+
+
+def payload_of(frame):
+    if hasattr(frame, "get_payload"):
+        return bytes(frame.get_payload())
+    if hasattr(frame, "tdata"):
+        return bytes(frame.tdata)
+    return bytes(frame)
+
+
+class CosimBridge:
+    """Bench side: client frames into source, frames from recv() back to the client"""
+
+    def __init__(self, path, source, recv, clock, window=256, poll_cycles=64, drain_polls=16, log=None):
+        self.path = path
+        self.source = source
+        self.recv = recv
+        self.clock = clock
+        self.window = window
+        self.poll_cycles = poll_cycles
+        self.drain_polls = drain_polls
+        self.log = log
+        self.to_frame = frame_factory(source)
+        self.out = []
+        self.frames_in = 0
+        self.frames_out = 0
+
+    def _accept(self, timeout):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.path)
+        server.listen(1)
+        server.settimeout(timeout)
+
+        if self.log:
+            self.log.info("cosim: waiting for a client on %s", self.path)
+
+        # the simulator is stopped until the client connects
+        try:
+            conn, _ = server.accept()
+        finally:
+            server.close()
+            os.unlink(self.path)
+
+        return Connection(conn)
+
+    async def _collect(self):
+        while True:
+            self.out.append(payload_of(await self.recv()))
+
+    async def run(self, accept_timeout=300.0):
+        import cocotb
+        from cocotb.triggers import ClockCycles
+        from cocotb.utils import get_sim_time
+
+        conn = self._accept(accept_timeout)
+        conn.send(MSG_CREDIT, CREDIT.pack(self.window))
+
+        collector = cocotb.start_soon(self._collect())
+
+        queued = 0
+        credited = 0
+        ending = False
+        quiet = 0
+
+        start = time.perf_counter()
+        start_ns = get_sim_time("ns")
+
+        while True:
+            busy = self.out or not self.source.idle()
+
+            # with nothing in flight wait a little for the client instead of spinning the simulation
+            conn.pump(0.0 if busy or ending else 0.01)
+
+            for kind, payload in conn.messages():
+                if kind == MSG_FRAME:
+                    self.source.send_nowait(self.to_frame(payload))
+                    queued += 1
+                elif kind == MSG_END:
+                    ending = True
+
+            consumed = queued - self.source.count()
+            if consumed > credited:
+                conn.send(MSG_CREDIT, CREDIT.pack(consumed - credited))
+                credited = consumed
+
+            if self.out:
+                quiet = 0
+                for payload in self.out:
+                    conn.send(MSG_FRAME, payload)
+                self.frames_out += len(self.out)
+                self.out.clear()
+            elif ending and self.source.idle():
+                quiet += 1
+
+            if conn.closed or quiet > self.drain_polls:
+                break
+
+            await ClockCycles(self.clock, self.poll_cycles)
+
+        collector.kill()
+
+        conn.send(MSG_END)
+        conn.flush()
+        conn.close()
+
+        self.frames_in = queued
+        wall = time.perf_counter() - start
+        stats = {
+            "frames_in": queued,
+            "frames_out": self.frames_out,
+            "wall_time_s": wall,
+            "sim_time_ns": get_sim_time("ns") - start_ns,
+            "frames_per_s": queued / wall if wall else 0.0,
+        }
+
+        if self.log:
+            self.log.info("cosim: %d frames in, %d frames out, %.0f frames/s", queued, self.frames_out,
+                stats["frames_per_s"])
+
+        return stats
+
+
+class CosimClient:
+    """Host side: streams frames into the bench within the granted credits"""
+
+    def __init__(self, path, connect_timeout=300.0):
+        deadline = time.monotonic() + connect_timeout
+        while True:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(path)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                sock.close()
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.2)
+
+        self.conn = Connection(sock)
+
+    def stream(self, frames, batch=32):
+        conn = self.conn
+        frames = iter(frames)
+        credits = 0
+        sent = 0
+        received = []
+        done = False
+        ended = False
+
+        start = time.perf_counter()
+
+        while not ended and not conn.closed:
+            for kind, payload in conn.messages():
+                if kind == MSG_CREDIT:
+                    credits += CREDIT.unpack(payload)[0]
+                elif kind == MSG_FRAME:
+                    received.append(payload)
+                elif kind == MSG_END:
+                    ended = True
+
+            # batches of frames go out in one write
+            while credits and not done and len(conn.outbuf) < (1 << 20):
+                n = 0
+                for payload in itertools.islice(frames, min(credits, batch)):
+                    conn.send(MSG_FRAME, payload)
+                    n += 1
+                credits -= n
+                sent += n
+                if n == 0:
+                    conn.send(MSG_END)
+                    done = True
+
+            conn.pump(0.1)
+
+        wall = time.perf_counter() - start
+        conn.close()
+
+        return sent, received, wall
+
+
+def read_pcap(path):
+    with open(path, "rb") as f:
+        header = f.read(24)
+        magic = header[:4]
+        if magic in (b"\xd4\xc3\xb2\xa1", b"\x4d\x3c\xb2\xa1"):
+            rec = struct.Struct("<IIII")
+        elif magic in (b"\xa1\xb2\xc3\xd4", b"\xa1\xb2\x3c\x4d"):
+            rec = struct.Struct(">IIII")
+        else:
+            raise ValueError(f"{path}: not a pcap file")
+
+        while True:
+            buf = f.read(rec.size)
+            if len(buf) < rec.size:
+                break
+            _, _, incl_len, _ = rec.unpack(buf)
+            yield f.read(incl_len)
+
+
+def generate(count, size):
+    for k in range(count):
+        yield bytes(itertools.islice(itertools.cycle(range(256)), k % 256, k % 256 + size))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream frames into a bench through its co-simulation socket")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("client", help="send frames, receive the bench output")
+    p.add_argument("socket")
+    p.add_argument("--pcap", help="replay the frames of a pcap file")
+    p.add_argument("--gen", type=int, default=1000, help="number of generated frames without --pcap")
+    p.add_argument("--size", type=int, default=64, help="generated frame size")
+    p.add_argument("--batch", type=int, default=32, help="frames per write")
+    p.add_argument("--check", action="store_true", help="received frames must equal the sent ones")
+    p.add_argument("--timeout", type=float, default=300.0, help="seconds to wait for the bench")
+
+    args = parser.parse_args(argv)
+
+    frames = list(read_pcap(args.pcap) if args.pcap else generate(args.gen, args.size))
+
+    client = CosimClient(args.socket, args.timeout)
+    sent, received, wall = client.stream(frames, args.batch)
+
+    print(f"sent {sent} frames, received {len(received)}, {wall:.2f} s, {sent / wall if wall else 0.0:.0f} frames/s")
+
+    if args.check:
+        mismatch = sum(a != b for a, b in zip(frames, received)) + abs(len(frames) - len(received))
+        print(f"{mismatch} mismatched frames")
+        return 1 if mismatch else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
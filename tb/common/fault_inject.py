@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+"""
+Copyright (c) 2024 Marcin Zaremba
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+
+# Fault injection into continuous receive traffic and link recovery statistics
+#
+# FaultInjector builds back to back traffic for an RX core, XGMII characters
+# or GMII cycles, and corrupts frames at the given per-frame rates:
+#
+#   error       XGMII /E/ character on a data byte, GMII rx_er on a data byte
+#   truncate    frame cut short, XGMII terminate or GMII rx_dv low after it
+#   no_term     XGMII terminate missing, GMII rx_dv staying high into the next frame
+#   preamble    a bit of the preamble or SFD flipped
+#
+# Every payload starts with its sequence number, so a received frame is
+# matched to the frame that was sent. RecoveryReport measures, after every
+# run of faulted frames, the good frames lost and the cycles until the first
+# intact frame comes out, against when the frame after the fault would have
+# come out without it. Without a simulator the XGMII models give the same
+# numbers:
+#
+#     fault_inject.py xgmii --core 64 --frames 20000 --rates error=0.01,no_term=0.01
+
+import argparse
+import logging
+import os
+import random
+import statistics
+import sys
+from collections import defaultdict
+
+from xgmii_model import MODELS, PREAMBLE, XgmiiStream, with_fcs
+
+# clock period of the XGMII cores, ns
+PERIODS = {64: 6.4, 32: 3.2}
+
+FAULTS = ["error", "truncate", "no_term", "preamble"]
+
+# each fault kind alone, then all of them
+RATE_SETS = [f"{name}=0.05" for name in FAULTS] + [",".join(f"{name}=0.02" for name in FAULTS)]
+
+
+def parse_rates(text):
+    """"error=0.01,truncate=0.02" to a rate per fault kind"""
+
+    rates = {}
+    for item in filter(None, (s.strip() for s in text.split(","))):
+        name, _, rate = item.partition("=")
+        if name not in FAULTS:
+            raise ValueError(f"unknown fault {name!r}, expected one of {', '.join(FAULTS)}")
+        rates[name] = float(rate)
+    if sum(rates.values()) > 1:
+        raise ValueError("fault rates add up to more than 1")
+    return rates
+
+
+def env_rates(default=RATE_SETS):
+    """Rate settings for a bench, TB_FAULT_RATES replaces the default ones"""
+
+    text = os.environ.get("TB_FAULT_RATES")
+    return [text] if text else list(default)
+
+
+def sequence_payload(seq, length):
+    return seq.to_bytes(4, "little") + bytes((seq + k) & 0xff for k in range(length - 4))
+
+
+class SentFrame:
+    __slots__ = ("seq", "payload", "fault", "first_cycle", "last_cycle")
+
+    def __init__(self, seq, payload, fault, first_cycle, last_cycle):
+        self.seq = seq
+        self.payload = payload
+        self.fault = fault
+        self.first_cycle = first_cycle
+        self.last_cycle = last_cycle
+
+
+class FaultInjector:
+    """Continuous traffic with faults inserted at per-frame rates"""
+
+    def __init__(self, rates, seed=None):
+        self.rates = parse_rates(rates) if isinstance(rates, str) else dict(rates)
+        self.rng = random.Random(seed)
+
+    def pick(self):
+        x = self.rng.random()
+        for name, rate in self.rates.items():
+            if x < rate:
+                return name
+            x -= rate
+        return None
+
+    def xgmii(self, sizes, lanes=8, ifg=12):
+        """XgmiiStream and the frames sent, cycles are word indices of the stream"""
+
+        rng = self.rng
+        stream = XgmiiStream(lanes)
+        stream.idle(4*lanes)
+        sent = []
+
+        for seq, size in enumerate(sizes):
+            stream.align()
+            payload = sequence_payload(seq, size)
+            frame = bytearray(with_fcs(payload))
+            fault = self.pick()
+
+            if fault == "truncate":
+                frame = frame[:rng.randrange(1, len(frame))]
+
+            pos = len(stream.data)
+            stream.frame(frame, term=fault != "no_term")
+
+            if fault == "error":
+                stream.control(pos + len(PREAMBLE) + rng.randrange(len(frame)))
+            elif fault == "preamble":
+                stream.data[pos + 1 + rng.randrange(len(PREAMBLE) - 1)] ^= 1 << rng.randrange(8)
+
+            sent.append(SentFrame(seq, payload, fault, pos // lanes, (len(stream.data) - 1) // lanes))
+            stream.idle(ifg)
+
+        stream.idle(4*lanes)
+        stream.align()
+        return stream, sent
+
+    def gmii(self, sizes, ifg=12):
+        """(rxd, rx_dv, rx_er) per cycle and the frames sent"""
+
+        rng = self.rng
+        cycles = [(0, 0, 0)]*16
+        sent = []
+
+        for seq, size in enumerate(sizes):
+            payload = sequence_payload(seq, size)
+            frame = bytearray(PREAMBLE + with_fcs(payload))
+            er = [0]*len(frame)
+            fault = self.pick()
+
+            if fault == "truncate":
+                frame = frame[:rng.randrange(len(PREAMBLE) + 1, len(frame))]
+                er = er[:len(frame)]
+            elif fault == "error":
+                er[rng.randrange(len(PREAMBLE), len(frame))] = 1
+            elif fault == "preamble":
+                frame[rng.randrange(len(PREAMBLE))] ^= 1 << rng.randrange(8)
+
+            first = len(cycles)
+            cycles.extend(zip(frame, [1]*len(frame), er))
+            sent.append(SentFrame(seq, payload, fault, first, len(cycles) - 1))
+
+            # without an end the gap is carried as data of the frame
+            cycles.extend([(0, int(fault == "no_term"), 0)]*max(ifg, 1))
+
+        cycles.extend([(0, 0, 0)]*16)
+        return cycles, sent
+
+
+class RecoveryReport:
+    """Lost frames and recovery cycles after each run of faulted frames"""
+
+    def __init__(self, name, period_ns, log=None):
+        self.name = name
+        self.period_ns = period_ns
+        self.log = log or logging.getLogger("cocotb.tb")
+        self.bursts = defaultdict(list)
+        self.lost = 0
+        self.tolerated = 0
+        self.undetected = 0
+        self.latency = None
+        self.goodput_mbps = 0.0
+        self.offered_mbps = 0.0
+
+    def add(self, sent, received):
+        intact = {}
+        for f in received:
+            seq = int.from_bytes(f.data[:4], "little") if len(f.data) >= 4 else None
+            if seq is not None and seq < len(sent) and f.data == sent[seq].payload:
+                if not f.tuser:
+                    intact.setdefault(seq, f)
+            elif not f.tuser:
+                # passed as good but matches nothing that was sent
+                self.undetected += 1
+
+        clean = [s.seq for s in sent if s.seq in intact and s.fault is None and
+                 (s.seq == 0 or sent[s.seq - 1].fault is None)]
+        if not clean:
+            return
+        self.latency = statistics.median_low(intact[s].first_cycle - sent[s].first_cycle for s in clean)
+
+        self.tolerated += sum(1 for s in sent if s.fault is not None and s.seq in intact)
+        self.lost += sum(1 for s in sent if s.fault is None and s.seq not in intact)
+
+        seqs = sorted(intact)
+        k = 0
+        while k < len(sent):
+            if sent[k].fault is None:
+                k += 1
+                continue
+            first = k
+            while k < len(sent) and sent[k].fault is not None:
+                k += 1
+            if k == len(sent):
+                break
+            kind = "+".join(sorted({s.fault for s in sent[first:k]}))
+            nxt = next((s for s in seqs if s >= k), None)
+            if nxt is None:
+                self.bursts[kind].append((len(sent) - k, None))
+                continue
+            lost = sum(1 for s in sent[k:nxt] if s.fault is None)
+            cycles = max(intact[nxt].first_cycle - (sent[k].first_cycle + self.latency), 0)
+            self.bursts[kind].append((lost, cycles))
+
+        span = intact[seqs[-1]].last_cycle - sent[0].first_cycle + 1
+        good = sum(len(sent[s].payload) for s in seqs)
+        total = sum(len(s.payload) for s in sent)
+        self.goodput_mbps = good*8*1000 / (span*self.period_ns)
+        self.offered_mbps = total*8*1000 / (span*self.period_ns)
+
+    def summary(self):
+        res = {}
+        for kind, bursts in sorted(self.bursts.items()):
+            cycles = [c for _, c in bursts if c is not None]
+            res[kind] = {
+                "faults": len(bursts),
+                "lost_frames": sum(n for n, _ in bursts),
+                "unrecovered": sum(1 for _, c in bursts if c is None),
+                "recovery_mean": statistics.mean(cycles) if cycles else None,
+                "recovery_max": max(cycles, default=None),
+            }
+        return res
+
+    def worst_case(self):
+        return max((c for bursts in self.bursts.values() for _, c in bursts if c is not None), default=0)
+
+    def report(self):
+        p = self.period_ns
+        for kind, s in self.summary().items():
+            recovery = "none recovered"
+            if s["recovery_max"] is not None:
+                recovery = (f"recovery avg/max {s['recovery_mean']:.1f}/{s['recovery_max']} cycles "
+                            f"({s['recovery_mean']*p:.1f}/{s['recovery_max']*p:.1f} ns)")
+            self.log.info("%s faults [%s]: %d, %d good frames lost, %d never recovered, %s", self.name, kind,
+                s["faults"], s["lost_frames"], s["unrecovered"], recovery)
+        self.log.info("%s: %d good frames lost, %d faulted frames passed intact, %d corrupt frames passed as good, "
+            "goodput %.1f of %.1f Mbit/s offered", self.name, self.lost, self.tolerated, self.undetected,
+            self.goodput_mbps, self.offered_mbps)
+
+
+def size_cycle(frames, sizes=(60, 64, 128, 60, 512, 60, 1514)):
+    return [sizes[k % len(sizes)] for k in range(frames)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Link recovery of the XGMII RX core models under injected faults")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("xgmii", help="faulted traffic through an XGMII RX model")
+    p.add_argument("--core", type=int, choices=sorted(MODELS), default=64)
+    p.add_argument("--frames", type=int, default=10000)
+    p.add_argument("--ifg", type=int, default=12)
+    p.add_argument("--rates", default="error=0.01,truncate=0.01,no_term=0.01,preamble=0.01")
+    p.add_argument("--seed", type=int, default=1)
+
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    model = MODELS[args.core]()
+    stream, sent = FaultInjector(args.rates, args.seed).xgmii(size_cycle(args.frames), model.lanes, args.ifg)
+
+    report = RecoveryReport(f"axis_xgmii_rx_{args.core} model", PERIODS[args.core], logging.getLogger())
+    report.add(sent, model.run(stream).frames)
+    report.report()
+
+    return 1 if report.undetected else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""
+Copyright (c) 2024 Marcin Zaremba
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+
+# GMII/MII link speeds on a 125 MHz MAC clock
+#
+# At 10/100 Mb/s the MAC clock keeps running at 125 MHz and clk_enable is
+# high in one of every 50 or 5 cycles, a nibble per enabled cycle. That is
+# slow to simulate: a 1514 byte frame at 10 Mb/s takes over 150000 cycles.
+# With TB_TIME_COMPRESS=1 (the default) the benches run a single MII speed
+# with clk_enable high every COMPRESSED_RATIO cycles, which exercises the same
+# nibble path and the clk_enable hold in a fraction of the cycles, and scale
+# the measured throughput back to the line rate. TB_TIME_COMPRESS=0 runs
+# 100 and 10 Mb/s at their real ratios:
+#
+#     factory.add_option("speed", bench_speeds())
+#
+#     speed = LinkSpeed(100)
+#     speed.start(dut.clk, dut.clk_enable, dut.mii_select)
+#     ...
+#     speed.line_rate_mbps(monitor.rate_mbps(8))
+
+import os
+
+import cocotb
+from cocotb.triggers import RisingEdge
+
+CLOCK_MHZ = 125
+
+# Mb/s: (mii_select, clock cycles per enabled cycle)
+SPEEDS = {
+    1000: (False, 1),
+    100: (True, 5),
+    10: (True, 50),
+}
+
+# clock cycles per enabled cycle of MII with TB_TIME_COMPRESS=1
+COMPRESSED_RATIO = 2
+
+
+def time_compress():
+    return os.environ.get("TB_TIME_COMPRESS", "1") != "0"
+
+
+def bench_speeds():
+    # compressed, 10 and 100 Mb/s would be the same simulation
+    return [1000, 100] if time_compress() else list(SPEEDS)
+
+
+class LinkSpeed:
+    """Drives clk_enable and mii_select for a link speed"""
+
+    def __init__(self, speed, compress=None):
+        self.speed = speed
+        self.mii, self.ratio = SPEEDS[speed]
+        self.compress = time_compress() if compress is None else compress
+        # clock cycles per enabled cycle in the simulation
+        self.sim_ratio = min(self.ratio, COMPRESSED_RATIO) if self.compress else self.ratio
+        self._task = None
+
+    def __str__(self):
+        return f"{self.speed}M{' compressed' if self.sim_ratio != self.ratio else ''}"
+
+    @property
+    def cycles_per_byte(self):
+        return self.sim_ratio * (2 if self.mii else 1)
+
+    def start(self, clock, clk_enable, mii_select):
+        mii_select.setimmediatevalue(int(self.mii))
+        clk_enable.setimmediatevalue(1)
+        if self.sim_ratio > 1 and self._task is None:
+            self._task = cocotb.start_soon(self._run(clock, clk_enable))
+        return self
+
+    def line_rate_mbps(self, sim_rate_mbps):
+        # a simulated enabled cycle stands for ratio clock cycles on the line
+        return sim_rate_mbps * self.sim_ratio / self.ratio
+
+    async def _run(self, clock, clk_enable):
+        cnt = 0
+        while True:
+            await RisingEdge(clock)
+            cnt = cnt + 1 if cnt < self.sim_ratio - 1 else 0
+            clk_enable.value = int(cnt == 0)
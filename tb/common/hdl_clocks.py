@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+"""
+Copyright (c) 2024 Marcin Zaremba
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+
+import os
+
+import cocotb
+from cocotb.clock import Clock
+from cocotb.triggers import FallingEdge, RisingEdge
+
+# set by cocotb.mk, the toplevel is the $(DUT)_hdl_clk wrapper generating clocks and resets in VHDL
+HDL_CLOCKS = os.environ.get("HDL_CLOCKS", "0") == "1"
+
+
+def start_clock(signal, period, units="ns"):
+    """Python clock on signal, nothing to do when the wrapper drives it"""
+
+    if not HDL_CLOCKS:
+        cocotb.start_soon(Clock(signal, period, units=units).start())
+
+
+async def reset(clock, rst, rst_req=None, cycles=5):
+    """Synchronous reset for cycles clock cycles, requested from the wrapper with HDL clocks"""
+
+    if HDL_CLOCKS:
+        rst_req.value = 1
+        await RisingEdge(clock)
+        rst_req.value = 0
+        await FallingEdge(rst)
+    else:
+        rst.setimmediatevalue(0)
+        rst.value = 1
+        for _ in range(cycles):
+            await RisingEdge(clock)
+        rst.value = 0
+
+    await RisingEdge(clock)
+    await RisingEdge(clock)
@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+"""
+Copyright (c) 2024 Marcin Zaremba
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import logging
+from abc import ABC, abstractmethod
+from collections import Counter, defaultdict
+
+import cocotb
+from cocotb.triggers import RisingEdge
+from cocotb.utils import get_sim_time
+
+XGMII_START = 0xfb
+XGMII_TERM = 0xfd
+
+
+def is_high(signal):
+    return signal.value.is_resolvable and signal.value.integer != 0
+
+
+class FrameTimestamp:
+    def __init__(self, first_cycle, first_ns):
+        self.first_cycle = first_cycle
+        self.first_ns = first_ns
+        self.last_cycle = first_cycle
+        self.last_ns = first_ns
+
+    def __repr__(self):
+        return (f"{type(self).__name__}(first_cycle={self.first_cycle}, last_cycle={self.last_cycle}, "
+                f"first_ns={self.first_ns}, last_ns={self.last_ns})")
+
+
+class Timestamper(ABC):
+    """Records the clock cycle and simulation time of the first and last beat of every frame"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.frames = []
+        self.cycle = 0
+        self._current = None
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = cocotb.start_soon(self._run())
+        return self
+
+    def clear(self):
+        self.frames.clear()
+        self._current = None
+
+    def _first(self):
+        self._current = FrameTimestamp(self.cycle, get_sim_time('ns'))
+
+    def _last(self):
+        if self._current is None:
+            self._first()
+        self._current.last_cycle = self.cycle
+        self._current.last_ns = get_sim_time('ns')
+        self.frames.append(self._current)
+        self._current = None
+
+    async def _run(self):
+        while True:
+            await RisingEdge(self.clock)
+            self.cycle += 1
+            self._sample()
+
+    @abstractmethod
+    def _sample(self):
+        """Checks the interface signals once per clock cycle"""
+
+
+class AxiStreamTimestamper(Timestamper):
+    """Frame boundaries from tvalid/tready/tlast; without tlast every transfer is a frame"""
+
+    def __init__(self, clock, tvalid, tready=None, tlast=None):
+        super().__init__(clock)
+        self.tvalid = tvalid
+        self.tready = tready
+        self.tlast = tlast
+
+    def _sample(self):
+        if not is_high(self.tvalid) or (self.tready is not None and not is_high(self.tready)):
+            return
+        if self._current is None:
+            self._first()
+        if self.tlast is None or is_high(self.tlast):
+            self._last()
+
+
+class GmiiTimestamper(Timestamper):
+    """Frame boundaries from the GMII data valid/enable strobe"""
+
+    def __init__(self, clock, dv):
+        super().__init__(clock)
+        self.dv = dv
+
+    def _sample(self):
+        if is_high(self.dv):
+            if self._current is None:
+                self._first()
+            self._current.last_cycle = self.cycle
+            self._current.last_ns = get_sim_time('ns')
+        elif self._current is not None:
+            self.frames.append(self._current)
+            self._current = None
+
+
+class XgmiiTimestamper(Timestamper):
+    """Frame boundaries from XGMII start and terminate control characters"""
+
+    def __init__(self, clock, xgmii_d, xgmii_c):
+        super().__init__(clock)
+        self.xgmii_d = xgmii_d
+        self.xgmii_c = xgmii_c
+        self.lanes = len(xgmii_c)
+
+    def _sample(self):
+        if not self.xgmii_c.value.is_resolvable or not self.xgmii_d.value.is_resolvable:
+            return
+        c = self.xgmii_c.value.integer
+        if not c:
+            return
+        d = self.xgmii_d.value.integer
+        for lane in range(self.lanes):
+            if not c & (1 << lane):
+                continue
+            ch = (d >> (lane*8)) & 0xff
+            if ch == XGMII_START:
+                self._first()
+            elif ch == XGMII_TERM and self._current is not None:
+                self._last()
+
+
+class LatencyReport:
+    """Latency histograms per frame size and traffic pattern"""
+
+    def __init__(self, name, period_ns, log=None):
+        self.name = name
+        self.period_ns = period_ns
+        self.log = log or logging.getLogger("cocotb.tb")
+        self.first = defaultdict(Counter)
+        self.last = defaultdict(Counter)
+
+    def add(self, sizes, inputs, outputs, pattern=None, last_outputs=None):
+        if last_outputs is None:
+            last_outputs = outputs
+
+        assert len(inputs) >= len(sizes), "missing input timestamps"
+        assert len(outputs) >= len(sizes), "missing output timestamps"
+        assert len(last_outputs) >= len(sizes), "missing output timestamps"
+
+        for size, ts_in, ts_out, ts_last in zip(sizes, inputs, outputs, last_outputs):
+            self.first[(pattern, size)][ts_out.first_cycle - ts_in.first_cycle] += 1
+            self.last[(pattern, size)][ts_last.last_cycle - ts_in.last_cycle] += 1
+
+    def summary(self):
+        res = {}
+        for key in sorted(self.first, key=lambda k: (str(k[0]), k[1])):
+            res[key] = (self._stats(self.first[key]), self._stats(self.last[key]))
+        return res
+
+    def worst_case(self, pattern=None):
+        first = [max(h) for k, h in self.first.items() if pattern is None or k[0] == pattern]
+        last = [max(h) for k, h in self.last.items() if pattern is None or k[0] == pattern]
+        return max(first, default=None), max(last, default=None)
+
+    def report(self):
+        for (pattern, size), (first, last) in self.summary().items():
+            self.log.info("%s latency [%s] size %d: %d frames, first %s, last %s", self.name, pattern, size,
+                first[0], self._format(first), self._format(last))
+
+        for pattern in sorted({k[0] for k in self.first}, key=str):
+            for label, hists in (("first", self.first), ("last", self.last)):
+                total = Counter()
+                for key, hist in hists.items():
+                    if key[0] == pattern:
+                        total.update(hist)
+                self.log.info("%s latency [%s] %s-in to %s-out histogram (cycles: frames): %s", self.name, pattern,
+                    label, label, ", ".join(f"{c}: {n}" for c, n in sorted(total.items())))
+
+    def _stats(self, hist):
+        count = sum(hist.values())
+        mean = sum(c*n for c, n in hist.items()) / count
+        return count, min(hist), mean, max(hist)
+
+    def _format(self, stats):
+        _, lo, mean, hi = stats
+        p = self.period_ns
+        return f"min/avg/max {lo}/{mean:.2f}/{hi} cycles ({lo*p:.1f}/{mean*p:.1f}/{hi*p:.1f} ns)"
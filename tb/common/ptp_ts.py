@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+Copyright (c) 2024 Marcin Zaremba
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+
+import logging
+
+import cocotb
+from cocotb.triggers import RisingEdge
+from cocotb.utils import get_time_from_sim_steps
+
+from latency import is_high
+
+
+def ts_tod_to_ns(ts):
+    # 96-bit ToD: 48-bit seconds, 32-bit nanoseconds, 16-bit fractional nanoseconds
+    return (ts >> 48)*1000000000 + ((ts >> 16) & 0xffffffff) + (ts & 0xffff) / 2**16
+
+
+class PtpTsMonitor:
+    """Collects the timestamps presented on a tdata/tvalid timestamp output"""
+
+    def __init__(self, clock, tdata, tvalid):
+        self.clock = clock
+        self.tdata = tdata
+        self.tvalid = tvalid
+        self.timestamps = []
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = cocotb.start_soon(self._run())
+        return self
+
+    def clear(self):
+        self.timestamps.clear()
+
+    async def _run(self):
+        while True:
+            await RisingEdge(self.clock)
+            if is_high(self.tvalid):
+                self.timestamps.append(self.tdata.value.integer)
+
+
+def check_ts(timestamps, frames, period_ns, offset_ns, log=None):
+    """Checks one timestamp per frame, within one clock period of the core's fixed offset from the frame SFD"""
+
+    log = log or logging.getLogger("cocotb.tb")
+
+    assert len(timestamps) == len(frames), f"{len(timestamps)} timestamps for {len(frames)} frames"
+
+    offsets = [ts_tod_to_ns(ts) - get_time_from_sim_steps(frame.sim_time_sfd, 'ns')
+        for ts, frame in zip(timestamps, frames)]
+
+    lo, hi = min(offsets), max(offsets)
+
+    log.info("PTP timestamp offset from SFD: min %.3f ns, max %.3f ns, spread %.3f ns "
+        "(expected %.3f ns, clock period %.3f ns)", lo, hi, hi - lo, offset_ns, period_ns)
+
+    for k, offset in enumerate(offsets):
+        assert abs(offset - offset_ns) <= period_ns, (
+            f"frame {k}: timestamp {offset:.3f} ns from SFD, expected {offset_ns:.3f} ns")
+
+    assert hi - lo <= period_ns
+
+    return offsets
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+"""
+Copyright (c) 2024 Marcin Zaremba
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+# Idle fast-forward
+#
+# Replaces the Python clock of a bench. skip(cycles) advances the given number
+# of rising edges with one Timer instead of a wakeup per edge. With gate=True
+# and every watched source, sink and signal quiet, the clock itself is stopped
+# for the span, so neither the clock nor the per-cycle monitors wake up; use it
+# only where the DUT has nothing left to count once its interfaces are idle,
+# such as the idle line between UART characters.
+#
+#     self.idle = Quiescence(dut.aclk, 10, gate=True).start()
+#     self.idle.watch(self.source, self.sink)
+#     self.idle.watch_signal(dut.m_axis_tvalid, 0)
+#
+#     await tb.idle.skip_ns(2000)
+#     tb.idle.report(tb.log)
+#
+# A bench whose toplevel is its $(DUT)_hdl_clk wrapper passes hdl_clock=True,
+# the wrapper drives the clock and only skipping is done here.
+#
+# The first cycles are stepped to measure the wall time of a stepped cycle,
+# the report estimates the wall time saved from it. TB_FAST_FORWARD=0 steps
+# every cycle, for comparing wall times.
+
+import math
+import os
+import time
+
+import cocotb
+from cocotb.clock import Clock
+from cocotb.triggers import RisingEdge, Timer
+
+FAST_FORWARD = os.environ.get("TB_FAST_FORWARD", "1") != "0"
+
+
+class Quiescence:
+    """Skips idle clock cycles with a single Timer, stopping the clock when the bench is quiet"""
+
+    def __init__(self, clock, period_ns, gate=False, calibrate=16, hdl_clock=False):
+        self.clock = clock
+        self.period_ns = period_ns
+        self.hdl_clock = hdl_clock
+        self.gate = gate and not hdl_clock
+        self.calibrate = calibrate
+        self.objs = []
+        self.signals = []
+        self.spans = 0
+        self.gated_spans = 0
+        self.stepped_cycles = 0
+        self.stepped_wall = 0.0
+        self.skipped_cycles = 0
+        self.skipped_wall = 0.0
+        self._clock_task = None
+
+    def start(self):
+        if not self.hdl_clock and self._clock_task is None:
+            self._start_clock()
+        return self
+
+    def watch(self, *objs):
+        """Sources and sinks that have to report idle() for the clock to be stopped"""
+
+        self.objs.extend(objs)
+
+    def watch_signal(self, signal, value=0):
+        self.signals.append((signal, value))
+
+    def quiet(self):
+        if not all(obj.idle() for obj in self.objs):
+            return False
+        for signal, value in self.signals:
+            if not signal.value.is_resolvable or signal.value.integer != value:
+                return False
+        return True
+
+    async def skip_ns(self, ns):
+        await self.skip(max(math.ceil(ns / self.period_ns), 1))
+
+    async def skip(self, cycles):
+        """Same as awaiting cycles rising edges of the clock"""
+
+        if not FAST_FORWARD:
+            step = cycles
+        elif self.stepped_cycles < self.calibrate:
+            step = min(cycles, max(self.calibrate - self.stepped_cycles, 2))
+        else:
+            step = min(cycles, 2)
+
+        if step == cycles:
+            await self._step(cycles)
+            return
+
+        await self._step(step - 1)
+
+        # on a rising edge, the clock high: wait until half a period before
+        # the last edge and let the clock, restarted low if it was stopped,
+        # produce that edge
+        start = time.perf_counter()
+        gated = self.gate and self.quiet()
+        if gated:
+            self._clock_task.kill()
+        await Timer((cycles - step + 0.5) * self.period_ns, "ns", round_mode="round")
+        if gated:
+            self._start_clock(start_high=False)
+            self.gated_spans += 1
+        await RisingEdge(self.clock)
+        self.spans += 1
+        self.skipped_cycles += cycles - step + 1
+        self.skipped_wall += time.perf_counter() - start
+
+    def saved(self):
+        """Estimated wall seconds saved against stepping every skipped cycle"""
+
+        if not self.stepped_cycles:
+            return 0.0
+        return self.skipped_cycles * self.stepped_wall / self.stepped_cycles - self.skipped_wall
+
+    def report(self, log):
+        if not self.stepped_cycles:
+            return
+        log.info("fast-forward: %d cycles skipped in %d spans (%d with the clock stopped), %.3f s wall, "
+            "stepped cycle %.1f us, estimated %.3f s saved", self.skipped_cycles, self.spans, self.gated_spans,
+            self.skipped_wall, self.stepped_wall / self.stepped_cycles * 1e6, self.saved())
+
+    async def _step(self, cycles):
+        start = time.perf_counter()
+        for _ in range(cycles):
+            await RisingEdge(self.clock)
+        self.stepped_cycles += cycles
+        self.stepped_wall += time.perf_counter() - start
+
+    def _start_clock(self, start_high=True):
+        self._clock_task = cocotb.start_soon(Clock(self.clock, self.period_ns, units="ns").start(start_high=start_high))
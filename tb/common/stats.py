@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+"""
+Copyright (c) 2024 Marcin Zaremba
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+from collections import Counter
+
+import cocotb
+from cocotb.triggers import RisingEdge
+
+from xgmii_model import RxFrameBuilder
+
+FCS_LENGTH = 4
+
+SIZE_BUCKETS = [
+    ("stat_size_lt_64", 0, 63),
+    ("stat_size_64", 64, 64),
+    ("stat_size_65_127", 65, 127),
+    ("stat_size_128_255", 128, 255),
+    ("stat_size_256_511", 256, 511),
+    ("stat_size_512_1023", 512, 1023),
+    ("stat_size_1024_1518", 1024, 1518),
+    ("stat_size_gt_1518", 1519, None),
+]
+
+COUNTERS = [
+    "stat_start_packets",
+    "stat_frames",
+    "stat_frames_good",
+    "stat_octets",
+    "stat_bad_frame",
+    "stat_bad_fcs",
+] + [name for name, _, _ in SIZE_BUCKETS]
+
+COUNTER_MAX = 2**64-1
+
+
+class PulseCounter:
+    """Counts the clock cycles a status output is non-zero, per output value"""
+
+    def __init__(self, clock, signal):
+        self.clock = clock
+        self.signal = signal
+        self.values = Counter()
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = cocotb.start_soon(self._run())
+        return self
+
+    @property
+    def count(self):
+        return sum(self.values.values())
+
+    async def _run(self):
+        while True:
+            await RisingEdge(self.clock)
+            val = self.signal.value
+            if val.is_resolvable and val.integer:
+                self.values[val.integer] += 1
+
+
+class RxOutputMonitor:
+    """Frames and status pulses of an RX core, cycle by cycle, as the reference models report them"""
+
+    def __init__(self, dut):
+        self.dut = dut
+        # axis_gmii_rx has no tkeep, every beat is one byte
+        self.tkeep = getattr(dut, "m_axis_tkeep", None)
+        self.lanes = len(dut.m_axis_tdata) // 8
+        self.builder = RxFrameBuilder()
+        self.cycle = 0
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = cocotb.start_soon(self._run())
+        return self
+
+    async def _run(self):
+        dut = self.dut
+        while True:
+            await RisingEdge(dut.clk)
+            self.cycle += 1
+
+            bad_frame = dut.error_bad_frame.value.integer
+            bad_fcs = dut.error_bad_fcs.value.integer
+            if dut.m_axis_tvalid.value.integer:
+                n = self.lanes if self.tkeep is None else bin(self.tkeep.value.integer).count("1")
+                data = dut.m_axis_tdata.value.integer.to_bytes(self.lanes, "little")[:n]
+                self.builder.beat(self.cycle, data, dut.m_axis_tlast.value.integer, dut.m_axis_tuser.value.integer,
+                                  bad_frame, bad_fcs)
+                bad_frame = bad_fcs = 0
+            self.builder.status(self.cycle, dut.start_packet.value.integer, bad_frame, bad_fcs)
+
+
+class RxStatsModel:
+    """Expected eth_stats_rx counters"""
+
+    def __init__(self):
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+    def clear(self):
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+    def _inc(self, name, val=1):
+        self.counters[name] = min(self.counters[name] + val, COUNTER_MAX)
+
+    def start_packet(self):
+        self._inc("stat_start_packets")
+
+    def frame(self, payload_len, good=True, bad_frame=False, bad_fcs=False):
+        octets = payload_len + FCS_LENGTH
+
+        self._inc("stat_frames")
+        self._inc("stat_octets", octets)
+        if good:
+            self._inc("stat_frames_good")
+        if bad_frame:
+            self._inc("stat_bad_frame")
+        if bad_fcs:
+            self._inc("stat_bad_fcs")
+
+        for name, lo, hi in SIZE_BUCKETS:
+            if octets >= lo and (hi is None or octets <= hi):
+                self._inc(name)
+                break
+
+
+def read_counters(dut):
+    return {name: getattr(dut, name).value.integer for name in COUNTERS}
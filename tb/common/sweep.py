@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+"""
+Copyright (c) 2024 Marcin Zaremba
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+
+# Generic sweeps of the benches with pytest
+#
+# Each bench module ends in a test_* function parametrized over generic sets
+# that calls run(). Every configuration gets its own build directory,
+# sim_build/<test>-<params> next to the bench, compiled once and reused while
+# the sources, compile options and generics stay the same. The configurations
+# are independent, pytest-xdist runs them in parallel:
+#
+#     cd tb && pytest -n auto
+#     cd tb && pytest uart/uart_tx/uart_tx_tb.py -k "data_width5"
+#
+# SIM selects the simulator as in the Makefiles (ghdl, questa).
+
+import hashlib
+import json
+import os
+import sys
+
+import cocotb_test.simulator
+
+TB_COMMON_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.abspath(os.path.join(TB_COMMON_DIR, "..", ".."))
+
+sys.path.insert(0, os.path.join(ROOT, "common"))
+
+import vhdl_deps  # noqa: E402
+
+# the compile options of common/cocotb.mk
+COMPILE_ARGS = {
+    "ghdl": ["--std=08"],
+    "questa": ["-2008"],
+}
+
+
+def build_key(sim, toplevel, sources, parameters, compile_args):
+    h = hashlib.sha1(json.dumps([sim, toplevel, sources, sorted(parameters.items()), compile_args]).encode())
+    for path in sources:
+        h.update(vhdl_deps.file_hash(path).encode())
+    return h.hexdigest()
+
+
+def run(request, toplevel, module, vhdl_sources, parameters=None, extra_env=None):
+    """Runs one configuration of a bench in its cached build directory"""
+
+    bench_dir = os.path.dirname(os.path.abspath(str(request.node.fspath)))
+    name = request.node.name.replace("[", "-").replace("]", "")
+    sim_build = os.path.join(bench_dir, "sim_build", name)
+
+    sim = os.environ.get("SIM", "ghdl")
+    parameters = dict(parameters or {})
+    compile_args = COMPILE_ARGS.get(sim, [])
+    sources = vhdl_deps.compile_order([os.path.abspath(s) for s in vhdl_sources])
+
+    kwargs = dict(
+        simulator=sim,
+        toplevel=toplevel,
+        module=module,
+        toplevel_lang="vhdl",
+        vhdl_sources=sources,
+        parameters=parameters,
+        compile_args=compile_args,
+        python_search=[bench_dir, TB_COMMON_DIR],
+        sim_build=sim_build,
+        extra_env=extra_env,
+    )
+
+    stamp = os.path.join(sim_build, "build_key")
+    key = build_key(sim, toplevel, sources, parameters, compile_args)
+    try:
+        with open(stamp) as f:
+            cached = f.read() == key
+    except OSError:
+        cached = False
+
+    if not cached:
+        cocotb_test.simulator.run(compile_only=True, **kwargs)
+        with open(stamp, "w") as f:
+            f.write(key)
+
+    # ghdl -m only reanalyzes what changed, other simulators compile the whole
+    # list on every run unless it is left out
+    if sim != "ghdl":
+        kwargs["vhdl_sources"] = None
+
+    cocotb_test.simulator.run(**kwargs)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+"""
+Copyright (c) 2024 Marcin Zaremba
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+
+import logging
+
+import cocotb
+from cocotb.triggers import RisingEdge
+
+from latency import is_high
+
+
+class ThroughputMonitor:
+    """Per-cycle transfer, stall and bubble counts of a valid/ready stream
+
+    A stall is a cycle with valid high and ready low, a bubble is a cycle
+    without valid between the first and the last beat of a frame.
+    """
+
+    def __init__(self, clock, tvalid, tready=None, tlast=None):
+        self.clock = clock
+        self.tvalid = tvalid
+        self.tready = tready
+        self.tlast = tlast
+        self._task = None
+        self.clear()
+
+    def start(self):
+        if self._task is None:
+            self._task = cocotb.start_soon(self._run())
+        return self
+
+    def clear(self):
+        self.cycle = 0
+        self.beats = 0
+        self.frames = 0
+        self.stalls = 0
+        self.bubbles = 0
+        self.first_cycle = None
+        self.last_cycle = None
+        self.frame_log = []
+        self._in_frame = False
+
+    @property
+    def active_cycles(self):
+        if self.first_cycle is None:
+            return 0
+        return self.last_cycle - self.first_cycle + 1
+
+    @property
+    def utilization(self):
+        return self.beats / self.active_cycles if self.beats else 0.0
+
+    def bubbles_per_frame(self):
+        # cycles from the first beat of a frame to the first beat of the next
+        # one that were neither a transfer nor a stall
+        return [nxt[0] - cur[0] - cur[1] - cur[2] for cur, nxt in zip(self.frame_log, self.frame_log[1:])]
+
+    def rate_mbps(self, period_ns, bytes_per_beat=1):
+        if not self.beats:
+            return 0.0
+        return self.beats*bytes_per_beat*8*1000 / (self.active_cycles*period_ns)
+
+    def report(self, name, period_ns, log=None, bytes_per_beat=1):
+        log = log or logging.getLogger("cocotb.tb")
+        log.info("%s: %d frames, %d beats in %d cycles (%.1f%%, %.1f Mbit/s), %d stall cycles, %d bubble cycles",
+            name, self.frames, self.beats, self.active_cycles, self.utilization*100,
+            self.rate_mbps(period_ns, bytes_per_beat), self.stalls, self.bubbles)
+
+    async def _run(self):
+        while True:
+            await RisingEdge(self.clock)
+            self.cycle += 1
+            self._sample()
+
+    def _sample(self):
+        valid = is_high(self.tvalid)
+        ready = self.tready is None or is_high(self.tready)
+
+        if valid and ready:
+            self.beats += 1
+            if self.first_cycle is None:
+                self.first_cycle = self.cycle
+            self.last_cycle = self.cycle
+            if not self._in_frame:
+                self.frame_log.append([self.cycle, 0, 0])
+            self.frame_log[-1][1] += 1
+            if self.tlast is None or is_high(self.tlast):
+                self.frames += 1
+                self._in_frame = False
+            else:
+                self._in_frame = True
+        elif valid:
+            self.stalls += 1
+            if self.frame_log:
+                self.frame_log[-1][2] += 1
+        elif self._in_frame:
+            self.bubbles += 1
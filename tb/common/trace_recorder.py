@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+"""
+Copyright (c) 2024 Marcin Zaremba
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+
+# Binary transaction trace
+#
+# Benches record one fixed size record per frame (simulation time, interface,
+# length, CRC32 of the data, status) instead of logging frame contents. The
+# trace file is written when TB_TRACE_FILE is set, cocotb.mk sets it to
+# trace.bin in the bench directory. Render a window of it with:
+#
+#     trace_recorder.py trace.bin --summary
+#     trace_recorder.py trace.bin --test run_test_001 --iface eth_header_rx --start 1000 --end 5000
+#     trace_recorder.py trace.bin --status 1
+#
+# trace_endpoint() does the same for the cocotbext sources and sinks, which
+# otherwise log every frame they send or receive at INFO.
+
+import argparse
+import atexit
+import fnmatch
+import logging
+import os
+import struct
+import sys
+import zlib
+
+MAGIC = b"TBTRACE1"
+
+# magic, simulator time precision (power of ten seconds)
+HEADER = struct.Struct("<8sb")
+
+KIND_FRAME = 0
+KIND_IFACE = 1
+KIND_TEST = 2
+
+# kind, time in simulator steps, interface, length, crc32, status
+FRAME = struct.Struct("<BQHIIB")
+# kind, time in simulator steps, interface, name length, followed by the name
+NAME = struct.Struct("<BQHH")
+
+
+class TraceInterface:
+    __slots__ = ["_write", "_pack", "_time", "_index"]
+
+    def __init__(self, recorder, index):
+        self._write = recorder._file.write
+        self._pack = FRAME.pack
+        self._time = recorder._time
+        self._index = index
+
+    def frame(self, data, status=0):
+        data = bytes(data)
+        self._write(self._pack(KIND_FRAME, self._time(), self._index, len(data), zlib.crc32(data), status))
+
+
+class NullInterface:
+    __slots__ = []
+
+    def frame(self, data, status=0):
+        pass
+
+
+class TraceRecorder:
+    """Writes trace records to a buffered file, interfaces are numbered on first use"""
+
+    def __init__(self, path, precision, time):
+        self._file = open(path, "wb", buffering=1 << 20)
+        self._file.write(HEADER.pack(MAGIC, precision))
+        self._time = time
+        self._interfaces = {}
+        self._test = None
+
+        atexit.register(self.close)
+
+    def _name(self, kind, index, text):
+        text = text.encode()
+        self._file.write(NAME.pack(kind, self._time(), index, len(text)) + text)
+
+    def interface(self, name):
+        self._mark_test()
+
+        if name not in self._interfaces:
+            self._interfaces[name] = len(self._interfaces)
+            self._name(KIND_IFACE, self._interfaces[name], name)
+
+        return TraceInterface(self, self._interfaces[name])
+
+    def _mark_test(self):
+        import cocotb
+
+        test = getattr(getattr(cocotb, "regression_manager", None), "_test", None)
+        name = test.__qualname__ if test is not None else None
+        if name != self._test:
+            self._test = name
+            self._name(KIND_TEST, 0, name or "")
+            self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+class NullRecorder:
+    def interface(self, name):
+        return NullInterface()
+
+    def close(self):
+        pass
+
+
+_recorder = None
+
+
+def get_recorder():
+    global _recorder
+
+    if _recorder is None:
+        path = os.environ.get("TB_TRACE_FILE")
+        if path:
+            from cocotb import simulator
+            from cocotb.utils import get_sim_time
+            _recorder = TraceRecorder(path, simulator.get_precision(), get_sim_time)
+        else:
+            _recorder = NullRecorder()
+
+    return _recorder
+
+
+def _frame_status(frame):
+    # tuser of an AxiStreamFrame, error of a GmiiFrame, control characters of an XgmiiFrame
+    for attr in ("tuser", "error", "ctrl"):
+        if hasattr(frame, attr):
+            flags = getattr(frame, attr)
+            break
+    else:
+        return 0
+    if isinstance(flags, (list, tuple)):
+        return int(any(flags))
+    return int(bool(flags))
+
+
+def trace_endpoint(endpoint, name):
+    """Drops the per-frame INFO logging of a cocotbext source or sink, its frames go to the trace"""
+
+    endpoint.log.setLevel(logging.WARNING)
+
+    trace = get_recorder().interface(name)
+    if isinstance(trace, NullInterface):
+        return endpoint
+
+    def record(frame):
+        trace.frame(frame.tdata if hasattr(frame, "tdata") else frame.data, _frame_status(frame))
+        return frame
+
+    # sources when a frame starts on the bus, sinks when one is complete
+    queue = endpoint.queue
+    if hasattr(endpoint, "send_nowait"):
+        get_nowait = queue.get_nowait
+        queue.get_nowait = lambda: record(get_nowait())
+    else:
+        put_nowait = queue.put_nowait
+        queue.put_nowait = lambda frame: put_nowait(record(frame))
+
+    return endpoint
+
+
+def read_trace(path):
+    """Yields (kind, time_ns, name, length, crc, status) records, name is the interface or test name"""
+
+    with open(path, "rb") as f:
+        magic, precision = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a trace file")
+
+        scale = 10.0**(precision + 9)
+        interfaces = {}
+
+        while True:
+            kind = f.read(1)
+            if not kind:
+                break
+
+            if kind[0] == KIND_FRAME:
+                buf = kind + f.read(FRAME.size - 1)
+                if len(buf) < FRAME.size:
+                    break
+                _, time, index, length, crc, status = FRAME.unpack(buf)
+                yield KIND_FRAME, time*scale, interfaces.get(index, str(index)), length, crc, status
+            else:
+                buf = kind + f.read(NAME.size - 1)
+                if len(buf) < NAME.size:
+                    break
+                _, time, index, size = NAME.unpack(buf)
+                name = f.read(size).decode()
+                if kind[0] == KIND_IFACE:
+                    interfaces[index] = name
+                else:
+                    yield KIND_TEST, time*scale, name, 0, 0, 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a window of a binary bench trace")
+    parser.add_argument("trace")
+    parser.add_argument("--test", help="test name, wildcards allowed")
+    parser.add_argument("--iface", help="interface name, wildcards allowed")
+    parser.add_argument("--start", type=float, default=0.0, help="start time in ns")
+    parser.add_argument("--end", type=float, default=float("inf"), help="end time in ns")
+    parser.add_argument("--status", type=int, help="only records with this status")
+    parser.add_argument("-n", type=int, help="stop after n records")
+    parser.add_argument("--summary", action="store_true", help="frame counts and bytes per test and interface")
+
+    args = parser.parse_args(argv)
+
+    test = None
+    shown = 0
+    summary = {}
+
+    for kind, time, name, length, crc, status in read_trace(args.trace):
+        if kind == KIND_TEST:
+            test = name
+            if not args.summary and (args.test is None or fnmatch.fnmatch(test, args.test)):
+                print(f"== {test}")
+            continue
+
+        if args.test is not None and not fnmatch.fnmatch(test or "", args.test):
+            continue
+        if args.iface is not None and not fnmatch.fnmatch(name, args.iface):
+            continue
+        if not args.start <= time <= args.end:
+            continue
+        if args.status is not None and status != args.status:
+            continue
+
+        if args.summary:
+            entry = summary.setdefault((test, name), [0, 0, 0])
+            entry[0] += 1
+            entry[1] += length
+            entry[2] += status != 0
+            continue
+
+        print(f"{time:16.3f} ns  {name:24} len {length:6} crc {crc:08x} status {status}")
+
+        shown += 1
+        if args.n is not None and shown >= args.n:
+            break
+
+    for (test, name), (frames, octets, errors) in summary.items():
+        print(f"{test or '-':40} {name:24} {frames:8} frames {octets:12} bytes {errors:6} with status")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
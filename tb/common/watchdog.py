@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+"""
+Copyright (c) 2024 Marcin Zaremba
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+
+# Hang watchdog
+#
+# A test hands the watchdog the frames it expects together with a simulated
+# time budget derived from the stimulus (frame_ns, uart_ns) and awaits every
+# receive through it. When the budget runs out the test fails right away with
+# the frames still outstanding instead of waiting on a frame that was dropped.
+# A thread also watches the wall clock: when simulated time stops advancing
+# for TB_STALL_TIMEOUT seconds the simulator process exits.
+#
+#     watchdog = Watchdog(tb.log).start()
+#     watchdog.expect([len(x) for x in test_frames], sum(frame_ns(len(x), 8) for x in test_frames))
+#     rx_frame = await watchdog.recv(tb.sink.recv())
+#
+# TB_WATCHDOG_MARGIN scales all budgets, TB_WATCHDOG=0 turns the watchdog off.
+
+import math
+import os
+import threading
+import time
+
+import cocotb
+from cocotb.triggers import Timer
+from cocotb.utils import get_sim_time
+
+WATCHDOG = os.environ.get("TB_WATCHDOG", "1") != "0"
+MARGIN = float(os.environ.get("TB_WATCHDOG_MARGIN", "2"))
+STALL_TIMEOUT = float(os.environ.get("TB_STALL_TIMEOUT", "300"))
+
+# exit status of a stalled simulator, as timeout(1)
+STALL_EXIT = 124
+
+# preamble, SFD and FCS around an Ethernet payload
+ETH_OVERHEAD = 12
+
+
+def frame_ns(length, period_ns, bytes_per_cycle=1, ifg=12, overhead=ETH_OVERHEAD):
+    """Time to move a frame of length bytes plus overhead and gap at bytes_per_cycle"""
+
+    return math.ceil((max(length, 60) + overhead + ifg) / bytes_per_cycle) * period_ns
+
+
+def uart_ns(nbytes, baud, bits=10):
+    """Time to shift nbytes UART characters of bits bits, start and stop included"""
+
+    return nbytes * bits * 1e9 / baud
+
+
+class WatchdogTimeout(Exception):
+    pass
+
+
+class Watchdog:
+    """Simulated time budget for the frames a test waits for, plus a wall clock stall check"""
+
+    def __init__(self, log, name="frame", slack_ns=10000, margin=MARGIN, stall_timeout=STALL_TIMEOUT,
+                 heartbeat_ns=10000):
+        self.log = log
+        self.name = name
+        self.slack_ns = slack_ns
+        self.margin = margin
+        self.stall_timeout = stall_timeout
+        self.heartbeat_ns = heartbeat_ns
+        self.expected = []
+        self.received = 0
+        self.deadline = None
+        self._pending = None
+        self._budget_ns = 0.0
+        self._start_ns = 0.0
+        self._beat = time.monotonic()
+        self._task = None
+        self._heartbeat = None
+
+    def start(self):
+        if WATCHDOG and self._task is None:
+            self._start_ns = get_sim_time("ns")
+            self._update()
+            self._task = cocotb.start_soon(self._run())
+            if self.stall_timeout:
+                self._heartbeat = cocotb.start_soon(self._beat_run())
+                threading.Thread(target=self._stall_run, daemon=True).start()
+        return self
+
+    def stop(self):
+        for task in (self._task, self._heartbeat):
+            if task is not None:
+                task.kill()
+        self._task = self._heartbeat = None
+
+    def expect(self, lengths, budget_ns):
+        """Frames (their lengths) the test will wait for and the time they need without margin"""
+
+        self.expected.extend(lengths)
+        self._budget_ns += budget_ns
+        self._update()
+
+    def extend(self, budget_ns):
+        self._budget_ns += budget_ns
+        self._update()
+
+    def watch(self, pending):
+        """Report pending() (descriptions of what is outstanding) instead of the expected frames"""
+
+        self._pending = pending
+
+    async def recv(self, coro):
+        res = await coro
+        self.received += 1
+        return res
+
+    def outstanding(self):
+        return self.expected[self.received:]
+
+    def report(self):
+        if self._pending is not None:
+            pending = self._pending()
+            head = f"{len(pending)} outstanding"
+        else:
+            pending = [f"{self.name} {self.received + k} ({n} bytes)" for k, n in enumerate(self.outstanding())]
+            head = f"{self.received} of {len(self.expected)} {self.name}s received, {len(pending)} outstanding"
+        listed = ", ".join(pending[:16])
+        if len(pending) > 16:
+            listed += f", ... {len(pending) - 16} more"
+        return head + (f": {listed}" if listed else "")
+
+    def _update(self):
+        self.deadline = self._start_ns + self._budget_ns * self.margin + self.slack_ns
+
+    async def _run(self):
+        while True:
+            now = get_sim_time("ns")
+            if now >= self.deadline:
+                break
+            await Timer(self.deadline - now, "ns", round_mode="ceil")
+
+        msg = (f"watchdog: simulated time budget of {self.deadline - self._start_ns:.0f} ns exceeded, "
+               + self.report())
+        self.log.error(msg)
+        raise WatchdogTimeout(msg)
+
+    async def _beat_run(self):
+        while True:
+            await Timer(self.heartbeat_ns, "ns")
+            self._beat = time.monotonic()
+
+    def _stall_run(self):
+        heartbeat = self._heartbeat
+        while heartbeat is not None and not heartbeat.done():
+            time.sleep(min(self.stall_timeout / 10, 10))
+            stalled = time.monotonic() - self._beat
+            if stalled > self.stall_timeout and not heartbeat.done():
+                self.log.error("watchdog: simulated time stalled for %.0f s of wall clock, %s, exiting",
+                               stalled, self.report())
+                for handler in self.log.handlers + self.log.root.handlers:
+                    handler.flush()
+                os._exit(STALL_EXIT)
@@ -0,0 +1,668 @@
+#!/usr/bin/env python
+"""
+Copyright (c) 2024 Marcin Zaremba
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+
+# Reference models of the XGMII receive cores
+#
+# XgmiiRx64Model and XgmiiRx32Model follow axis_xgmii_rx_64 and
+# axis_xgmii_rx_32 register by register: framing errors from control characters
+# ahead of the terminate, CRC residues with the control characters after the
+# terminate masked to zero, lane swapping on a start in lane 4 and the
+# start_packet outputs of every start character. Runs of data words inside a
+# frame and runs of idle words between frames are skipped in one step, the
+# result is the same as stepping every cycle. Models need neither cocotb nor a
+# simulator, so expected results for a bench can be computed up front and
+# corner cases swept offline:
+#
+#     xgmii_model.py bench --core 64 --frames 200000 --size 60
+#     xgmii_model.py sweep --streams 2000 --seed 1
+
+import argparse
+import random
+import re
+import sys
+import time
+import zlib
+from collections import Counter
+
+XGMII_IDLE = 0x07
+XGMII_START = 0xfb
+XGMII_TERM = 0xfd
+XGMII_ERROR = 0xfe
+
+PREAMBLE = bytes([0x55]*7 + [0xd5])
+
+# CRC32 (as zlib reports it) of a good frame followed by n zero bytes
+CRC_RESIDUE = [zlib.crc32(bytes(n), 0x2144df1c) for n in range(8)]
+
+IDLE, PREAMBLE_STATE, PAYLOAD, LAST = range(4)
+
+_START_TERM = re.compile(b"[\xfb\xfd]")
+
+
+def with_fcs(payload):
+    payload = bytes(payload)
+    return payload + zlib.crc32(payload).to_bytes(4, "little")
+
+
+class XgmiiStream:
+    """XGMII characters, one data byte and one control flag per lane, lane 0 first"""
+
+    def __init__(self, lanes=8):
+        self.lanes = lanes
+        self.data = bytearray()
+        self.ctrl = bytearray()
+
+    def __len__(self):
+        return len(self.data) // self.lanes
+
+    def append(self, data, ctrl=0):
+        self.data.extend(data)
+        self.ctrl.extend(bytes([ctrl])*len(data) if isinstance(ctrl, int) else ctrl)
+
+    def idle(self, count=1):
+        self.append(bytes([XGMII_IDLE])*count, 1)
+
+    def align(self):
+        self.idle(-len(self.data) % self.lanes)
+
+    def frame(self, frame, term=True):
+        # start, preamble, SFD, frame (with FCS) and terminate
+        self.append(bytes([XGMII_START]), 1)
+        self.append(PREAMBLE[1:] + bytes(frame))
+        if term:
+            self.append(bytes([XGMII_TERM]), 1)
+
+    def control(self, pos, char=XGMII_ERROR):
+        self.data[pos] = char
+        self.ctrl[pos] = 1
+
+    def words(self):
+        n = self.lanes
+        data, ctrl = self.data, self.ctrl
+        res = []
+        for k in range(0, len(data) - n + 1, n):
+            c = 0
+            for i in range(n):
+                if ctrl[k+i]:
+                    c |= 1 << i
+            res.append((int.from_bytes(data[k:k+n], "little"), c))
+        return res
+
+    @classmethod
+    def from_words(cls, words, lanes=8):
+        stream = cls(lanes)
+        for d, c in words:
+            stream.append(d.to_bytes(lanes, "little"), bytes((c >> i) & 1 for i in range(lanes)))
+        return stream
+
+
+def encode(frames, lanes=8, ifg=12, enable_dic=True, force_offset_start=False):
+    """Frames (with FCS) as XgmiiSource sends them, including its start lane and deficit idle choices"""
+
+    stream = XgmiiStream(lanes)
+    stream.idle(4*lanes)
+    ifg_cnt = 0
+    deficit_idle_cnt = 0
+
+    for frame in frames:
+        while ifg_cnt + deficit_idle_cnt > lanes-1 or (not enable_dic and ifg_cnt > 4):
+            stream.idle(lanes)
+            ifg_cnt -= lanes
+            if ifg_cnt < 0:
+                if enable_dic:
+                    deficit_idle_cnt = max(deficit_idle_cnt+ifg_cnt, 0)
+                ifg_cnt = 0
+
+        min_ifg = 3 - deficit_idle_cnt if enable_dic else 0
+        if lanes > 4 and (ifg_cnt > min_ifg or force_offset_start):
+            ifg_cnt -= 4
+            stream.idle(4)
+        if enable_dic:
+            deficit_idle_cnt = max(deficit_idle_cnt+ifg_cnt, 0)
+
+        stream.frame(frame)
+        k = (len(stream.data) - 1) % lanes
+        stream.align()
+        ifg_cnt = max(ifg - (lanes-k), 0)
+
+    stream.idle(4*lanes)
+    return stream
+
+
+class RxFrame:
+    """Frame on the AXI stream output with the status pulses that went with it"""
+
+    __slots__ = ("data", "tuser", "start_packet", "bad_frame", "bad_fcs", "first_cycle", "last_cycle")
+
+    def __init__(self, data, tuser, start_packet, bad_frame, bad_fcs, first_cycle, last_cycle):
+        self.data = data
+        self.tuser = tuser
+        self.start_packet = start_packet
+        self.bad_frame = bad_frame
+        self.bad_fcs = bad_fcs
+        self.first_cycle = first_cycle
+        self.last_cycle = last_cycle
+
+    def key(self, base=0):
+        return (self.data, self.tuser, self.start_packet, self.bad_frame, self.bad_fcs,
+                self.first_cycle - base, self.last_cycle - base)
+
+    def __eq__(self, other):
+        if isinstance(other, RxFrame):
+            return self.key() == other.key()
+        return NotImplemented
+
+    def __repr__(self):
+        return (f"{type(self).__name__}(len={len(self.data)}, tuser={self.tuser}, "
+                f"start_packet={self.start_packet}, bad_frame={self.bad_frame}, bad_fcs={self.bad_fcs}, "
+                f"cycles={self.first_cycle}..{self.last_cycle})")
+
+
+class RxFrameBuilder:
+    """Frames and status pulse counts from the per-cycle outputs of an RX core
+
+    The models and the bench monitors both feed one of these, a start_packet
+    pulse belongs to the next frame that starts after it.
+    """
+
+    def __init__(self):
+        self.frames = []
+        self.start_packet = Counter()
+        self.bad_frame = 0
+        self.bad_fcs = 0
+        self._data = []
+        self._first = None
+        self._pending = 0
+        self._start = 0
+
+    def beat(self, cycle, data, last=False, tuser=0, bad_frame=0, bad_fcs=0):
+        if self._first is None:
+            self._first = cycle
+            self._start = self._pending
+            self._pending = 0
+        self._data.append(data)
+        if last:
+            self.frames.append(RxFrame(b"".join(self._data), int(tuser), self._start, int(bad_frame),
+                                       int(bad_fcs), self._first, cycle))
+            self._data = []
+            self._first = None
+        self.bad_frame += bool(bad_frame)
+        self.bad_fcs += bool(bad_fcs)
+
+    def beats(self, first_cycle, data):
+        # several full beats without tlast, one per cycle from first_cycle
+        if self._first is None:
+            self._first = first_cycle
+            self._start = self._pending
+            self._pending = 0
+        self._data.append(data)
+
+    def status(self, cycle, start_packet=0, bad_frame=0, bad_fcs=0):
+        # pulses on a cycle without a beat
+        if start_packet:
+            self.start_packet[start_packet] += 1
+            self._pending = start_packet
+        self.bad_frame += bool(bad_frame)
+        self.bad_fcs += bool(bad_fcs)
+
+
+def _plain_idle_end(data, ctrl, pos):
+    # first character at or after pos that is data, a start or a terminate
+    end = ctrl.find(0, pos)
+    if end < 0:
+        end = len(ctrl)
+    m = _START_TERM.search(data, pos, end)
+    return m.start() if m else end
+
+
+def _data_end(ctrl, pos):
+    end = ctrl.find(1, pos)
+    return len(ctrl) if end < 0 else end
+
+
+_CTRL_BITS = {}
+_DECODE = {}
+
+
+def _decode(word, cw):
+    # control flags as an int, data with control lanes masked to zero, terminate lanes
+    key = bytes(word) + bytes(cw)
+    res = _DECODE.get(key)
+    if res is None:
+        c = t = 0
+        masked = bytearray(word)
+        for i, flag in enumerate(cw):
+            if flag:
+                c |= 1 << i
+                masked[i] = 0
+                if word[i] == XGMII_TERM:
+                    t |= 1 << i
+        res = _DECODE[key] = (c, bytes(masked), t)
+    return res
+
+
+def _lowest(bits):
+    return (bits & -bits).bit_length() - 1
+
+
+class XgmiiRx64Model:
+    """axis_xgmii_rx_64 outputs for an 8 lane XgmiiStream"""
+
+    lanes = 8
+
+    def __init__(self, rx_enable=True, skip=True):
+        self.rx_enable = rx_enable
+        self.skip = skip
+
+    def run(self, stream, out=None):
+        if out is None:
+            out = RxFrameBuilder()
+
+        data, ctrl = bytes(stream.data), bytes(stream.ctrl)
+        nwords = len(data) // 8
+        enable = self.rx_enable
+        skip = self.skip
+        zero4, zero8 = bytes(4), bytes(8)
+
+        state = IDLE
+        crc, crc_save = 0, -1
+        fe = fe_d0 = tp = tl = tl_d0 = 0
+        d0 = d1 = zero8
+        start_swap = start_d0 = start_d1 = 0
+        swapped = 0
+        swap_d, swap_c, swap_t = zero4, 0, 0
+
+        n = 0
+        while n < nwords:
+            p = 8*n
+
+            if skip:
+                if state == IDLE and not (start_swap or start_d0 or start_d1):
+                    k = _plain_idle_end(data, ctrl, p) // 8 - n
+                    if k >= 3:
+                        d0 = d1 = zero8
+                        fe = fe_d0 = 1
+                        tp = tl = tl_d0 = 0
+                        swap_d, swap_c, swap_t = zero4, 0xf, 0
+                        crc, crc_save = 0, -1
+                        n += k
+                        continue
+                elif (state == PAYLOAD and not (fe or fe_d0 or tp or start_swap or start_d0 or swap_c)):
+                    k = _data_end(ctrl, p) // 8 - n
+                    if k >= 3:
+                        off = p - 4 if swapped else p
+                        end = off + 8*(k-2)
+                        out.beats(n, d1 + d0 + data[off:end])
+                        crc = crc_save = zlib.crc32(data[off:end+8], zlib.crc32(d0, crc))
+                        d1, d0 = data[end:end+8], data[end+8:end+16]
+                        tl = tl_d0 = 0
+                        swap_d = data[p+8*k-4:p+8*k]
+                        start_d1 = 0
+                        n += k
+                        continue
+
+            c, masked, t = _decode(data[p:p+8], ctrl[p:p+8])
+
+            # COMB_PROC
+            crc_next = -1
+            reset_crc = 1
+            beat = None
+            last = tuser = bad_frame = bad_fcs = 0
+
+            if state == IDLE:
+                if start_d1 and enable:
+                    crc_next = zlib.crc32(d0, crc)
+                    reset_crc = 0
+                    state = PAYLOAD
+            elif state == PAYLOAD:
+                crc_next = zlib.crc32(d0, crc)
+                beat = d1
+                if fe or fe_d0:
+                    last = tuser = bad_frame = 1
+                    state = IDLE
+                elif tp:
+                    if tl <= 4:
+                        beat = d1[:4+tl]
+                        last = 1
+                        if tl == 0:
+                            good = crc_save == CRC_RESIDUE[0]
+                        else:
+                            good = crc_next == CRC_RESIDUE[8-tl]
+                        if not good:
+                            tuser = bad_frame = bad_fcs = 1
+                        state = IDLE
+                    else:
+                        state = LAST
+                else:
+                    reset_crc = 0
+            else:
+                beat = d1[:tl_d0-4]
+                last = 1
+                if not (tl_d0 >= 5 and crc_save == CRC_RESIDUE[8-tl_d0]):
+                    tuser = bad_frame = bad_fcs = 1
+                if start_d1 and enable:
+                    crc_next = zlib.crc32(d0, crc)
+                    reset_crc = 0
+                    state = PAYLOAD
+                else:
+                    state = IDLE
+
+            # SEQ_PROC
+            start_packet = 0
+            if start_swap:
+                start_packet = 2
+            if start_d0 and not swapped:
+                start_packet = 1
+
+            if swapped:
+                nd0 = swap_d + masked[:4]
+                c0 = swap_c | (c & 0xf) << 4
+                tw = swap_t | (t & 0xf) << 4
+            else:
+                nd0 = masked
+                c0 = c
+                tw = t
+
+            if tw:
+                ntl = _lowest(tw)
+                ntp = 1
+                nfe = (c0 & ((1 << ntl) - 1)) != 0
+                swapped = 0
+                # a start may follow in the same word, keep it out of the CRC
+                nd0 = nd0[:ntl] + bytes(8-ntl)
+            else:
+                ntl = ntp = 0
+                nfe = c0 != 0
+
+            nstart_d0, start_swap = start_swap, 0
+            if c & 0x01 and data[p] == XGMII_START:
+                swapped = 0
+                nstart_d0 = 1
+            elif c & 0x10 and data[p+4] == XGMII_START:
+                swapped = 1
+                start_swap = 1
+
+            swap_d, swap_c, swap_t = masked[4:], c >> 4, t >> 4
+
+            tl_d0, tl, tp = tl, ntl, ntp
+            fe_d0, fe = fe, nfe
+            crc = 0 if reset_crc else crc_next
+            crc_save = crc_next
+            d1, d0 = d0, nd0
+            start_d1, start_d0 = start_d0, nstart_d0
+
+            if beat is not None:
+                out.beat(n, beat, last, tuser, bad_frame, bad_fcs)
+            if start_packet:
+                out.status(n, start_packet)
+
+            n += 1
+
+        return out
+
+
+class XgmiiRx32Model:
+    """axis_xgmii_rx_32 outputs for a 4 lane XgmiiStream"""
+
+    lanes = 4
+
+    def __init__(self, rx_enable=True, skip=True):
+        self.rx_enable = rx_enable
+        self.skip = skip
+
+    def run(self, stream, out=None):
+        if out is None:
+            out = RxFrameBuilder()
+
+        data, ctrl = bytes(stream.data), bytes(stream.ctrl)
+        nwords = len(data) // 4
+        enable = self.rx_enable
+        skip = self.skip
+        zero4 = bytes(4)
+
+        state = IDLE
+        crc, crc_save = 0, -1
+        fe = tp = tl = tl_d0 = 0
+        d0 = d1 = d2 = zero4
+        start_d0 = start_d1 = start_d2 = 0
+
+        n = 0
+        while n < nwords:
+            p = 4*n
+
+            if skip:
+                if state == IDLE and not (start_d0 or start_d1 or start_d2):
+                    k = _plain_idle_end(data, ctrl, p) // 4 - n
+                    if k >= 4:
+                        d0 = d1 = d2 = zero4
+                        fe = 1
+                        tp = tl = tl_d0 = 0
+                        crc, crc_save = 0, -1
+                        n += k
+                        continue
+                elif state == PAYLOAD and not (fe or tp):
+                    k = _data_end(ctrl, p) // 4 - n
+                    if k >= 4:
+                        end = p + 4*(k-3)
+                        out.beats(n, d2 + d1 + d0 + data[p:end])
+                        crc = crc_save = zlib.crc32(data[p:end+8], zlib.crc32(d0, crc))
+                        d2, d1, d0 = data[end:end+4], data[end+4:end+8], data[end+8:end+12]
+                        tl = tl_d0 = 0
+                        start_d0 = start_d1 = start_d2 = 0
+                        n += k
+                        continue
+
+            c, masked, t = _decode(data[p:p+4], ctrl[p:p+4])
+
+            # COMB_PROC
+            crc_next = -1
+            reset_crc = 1
+            beat = None
+            last = tuser = bad_frame = bad_fcs = start_packet = 0
+
+            if state == IDLE:
+                if start_d2 and enable and not fe:
+                    crc_next = zlib.crc32(d0, crc)
+                    reset_crc = 0
+                    state = PREAMBLE_STATE
+            elif state == PREAMBLE_STATE:
+                crc_next = zlib.crc32(d0, crc)
+                reset_crc = 0
+                if fe:
+                    state = IDLE
+                else:
+                    start_packet = 1
+                    state = PAYLOAD
+            elif state == PAYLOAD:
+                crc_next = zlib.crc32(d0, crc)
+                beat = d2
+                if fe:
+                    last = tuser = bad_frame = 1
+                    state = IDLE
+                elif tp:
+                    if tl == 0:
+                        last = 1
+                        if crc_save != CRC_RESIDUE[0]:
+                            tuser = bad_frame = bad_fcs = 1
+                        state = IDLE
+                    else:
+                        state = LAST
+                else:
+                    reset_crc = 0
+            else:
+                beat = d2[:tl_d0]
+                last = 1
+                if not (tl_d0 >= 1 and crc_save == CRC_RESIDUE[4-tl_d0]):
+                    tuser = bad_frame = bad_fcs = 1
+                state = IDLE
+
+            # SEQ_PROC
+            if t:
+                ntl = _lowest(t)
+                ntp = 1
+                nfe = (c & ((1 << ntl) - 1)) != 0
+            else:
+                ntl = ntp = 0
+                nfe = c != 0
+
+            tl_d0, tl, tp, fe = tl, ntl, ntp, nfe
+            crc = 0 if reset_crc else crc_next
+            crc_save = crc_next
+            d2, d1, d0 = d1, d0, masked
+            start_d2, start_d1 = start_d1, start_d0
+            start_d0 = 1 if c & 0x01 and data[p] == XGMII_START else 0
+
+            if beat is not None:
+                out.beat(n, beat, last, tuser, bad_frame, bad_fcs)
+            if start_packet:
+                out.status(n, start_packet)
+
+            n += 1
+
+        return out
+
+
+MODELS = {64: XgmiiRx64Model, 32: XgmiiRx32Model}
+
+
+def random_stream(rng, lanes=8, frames=32):
+    """Frames with random gaps, start lanes and corruptions: bad FCS, control characters, missing terminate"""
+
+    stream = XgmiiStream(lanes)
+    stream.idle(4*lanes)
+    sent = []
+
+    for _ in range(frames):
+        stream.idle(rng.choice([0, 0, 1, 3, 5, 8, 12, 16]))
+        if lanes == 8 and rng.random() < 0.5:
+            stream.idle(-(len(stream.data) - 4) % 8)
+        else:
+            stream.align()
+
+        payload = bytes(rng.getrandbits(8) for _ in range(rng.choice([1, 2, 3, 4, 5, 8, 12, 46, 60, 61, 62, 63, 64,
+                                                                     rng.randrange(1, 300)])))
+        frame = bytearray(with_fcs(payload))
+        kind = rng.choices(["good", "bad_fcs", "control", "no_term"], [6, 2, 1, 1])[0]
+        if kind == "bad_fcs":
+            frame[rng.randrange(len(frame))] ^= 1 << rng.randrange(8)
+
+        pos = len(stream.data)
+        stream.frame(frame, term=kind != "no_term")
+        if kind == "control":
+            stream.control(pos + rng.randrange(1, len(frame) + 8), rng.choice([XGMII_ERROR, XGMII_IDLE, XGMII_START]))
+        sent.append((payload, kind))
+
+    stream.idle(4*lanes)
+    stream.align()
+    return stream, sent
+
+
+def bench(core=64, frames=100000, size=60, ifg=12, out=sys.stdout):
+    model = MODELS[core]()
+    payload = bytes(k & 0xff for k in range(size))
+    stream = encode([with_fcs(payload)]*frames, model.lanes, ifg)
+
+    t = time.perf_counter()
+    res = model.run(stream)
+    wall = time.perf_counter() - t
+
+    assert len(res.frames) == frames and all(f.data == payload and not f.tuser for f in res.frames)
+    print(f"axis_xgmii_rx_{core} model: {frames} frames of {size} bytes, {len(stream)} cycles, {wall:.2f} s, "
+          f"{frames / wall * 60 / 1e6:.2f} M frames/min", file=out)
+
+
+def sweep(streams=1000, seed=None, out=sys.stdout):
+    """Random corner case streams, skipping runs of words must not change any output
+
+    Also reports, per core and XgmiiSource ifg setting, how many good frames do
+    not come out unchanged.
+    """
+
+    rng = random.Random(seed)
+    failures = 0
+    totals = Counter()
+
+    for k in range(streams):
+        core = rng.choice(sorted(MODELS))
+        model = MODELS[core]
+        stream, sent = random_stream(rng, model.lanes)
+
+        fast = model().run(stream)
+        ref = model(skip=False).run(stream)
+
+        if ([f.key() for f in fast.frames] != [f.key() for f in ref.frames] or fast.start_packet != ref.start_packet
+                or (fast.bad_frame, fast.bad_fcs) != (ref.bad_frame, ref.bad_fcs)):
+            print(f"stream {k} (axis_xgmii_rx_{core}): skipping changed the outputs", file=out)
+            failures += 1
+
+        totals["frames_in"] += len(sent)
+        totals["frames_out"] += len(ref.frames)
+        totals["tuser"] += sum(f.tuser for f in ref.frames)
+        totals["bad_frame"] += ref.bad_frame
+        totals["bad_fcs"] += ref.bad_fcs
+        for value, count in ref.start_packet.items():
+            totals[f"start_packet={value:02b}"] += count
+
+    print(f"{streams} streams, {failures} failures: " + ", ".join(f"{k} {v}" for k, v in sorted(totals.items())),
+          file=out)
+
+    for core, model in sorted(MODELS.items()):
+        for enable_dic in (True, False):
+            lost = []
+            for ifg in range(13):
+                payloads = [bytes(rng.getrandbits(8) for _ in range(rng.randrange(46, 300))) for _ in range(200)]
+                res = model().run(encode([with_fcs(x) for x in payloads], model.lanes, ifg, enable_dic))
+                good = sum(f.data == x and not f.tuser for f, x in zip(res.frames, payloads))
+                lost.append(f"{ifg}: {len(payloads) - good}")
+            print(f"axis_xgmii_rx_{core}, dic={int(enable_dic)}: good frames not received unchanged per ifg "
+                  + ", ".join(lost), file=out)
+
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="XGMII RX core reference models")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("bench", help="model speed on back to back frames")
+    p.add_argument("--core", type=int, choices=sorted(MODELS), default=64)
+    p.add_argument("--frames", type=int, default=100000)
+    p.add_argument("--size", type=int, default=60, help="payload bytes, without FCS")
+    p.add_argument("--ifg", type=int, default=12)
+
+    p = sub.add_parser("sweep", help="random corner case streams, skipped against stepped cycles, ifg settings")
+    p.add_argument("--streams", type=int, default=1000)
+    p.add_argument("--seed", type=int)
+
+    args = parser.parse_args(argv)
+
+    if args.cmd == "bench":
+        bench(args.core, args.frames, args.size, args.ifg)
+        return 0
+
+    return 1 if sweep(args.streams, args.seed) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -24,8 +24,10 @@ THE SOFTWARE.
 
 import itertools
 import logging
+import os
 
-from scapy.layers.l2 import Ether
+import pytest
+from scapy.layers.l2 import Dot1AD, Dot1Q, Ether
 
 import cocotb
 from cocotb.clock import Clock
@@ -35,27 +37,61 @@ from cocotb.regression import TestFactory
 from cocotbext.axi import AxiStreamBus, AxiStreamSource, AxiStreamSink
 from cocotbext.axi.stream import define_stream
 
+import sweep
+from bench_results import record
+from cosim_bridge import CosimBridge
+from latency import AxiStreamTimestamper, LatencyReport
+from stats import PulseCounter
+from throughput import ThroughputMonitor
+from trace_recorder import get_recorder, trace_endpoint
+from watchdog import Watchdog, frame_ns
+
 EthHdrBus, EthHdrTransaction, EthHdrSource, EthHdrSink, EthHdrMonitor = define_stream("EthHdr",
-    signals=["hdr_valid", "hdr_ready", "dst_mac", "src_mac", "type"]
+    signals=["hdr_valid", "hdr_ready", "dst_mac", "src_mac", "type"],
+    optional_signals=["class", "vlan_tags", "vlan_tci", "inner_vlan_tci"]
 )
 
+LOCAL_MAC = 'DA:D1:D2:D3:D4:D5'
+OTHER_MAC = '5A:51:52:53:54:56'
+MULTICAST_MAC = '01:00:5E:00:00:FB'
+BROADCAST_MAC = 'FF:FF:FF:FF:FF:FF'
+CLASS_TYPES = [0x0800, 0x86dd, 0x88f7]
+VLAN_TPIDS = [0x88a8, 0x8100, 0x9100]
+
 
 class TB:
     def __init__(self, dut):
         self.dut = dut
 
         self.log = logging.getLogger("cocotb.tb")
-        self.log.setLevel(logging.DEBUG)
+        self.log.setLevel(logging.INFO)
+
+        self.trace = get_recorder().interface("eth_header_rx")
 
         cocotb.start_soon(Clock(dut.aclk, 8, units="ns").start())
 
         self.source = AxiStreamSource(AxiStreamBus.from_prefix(dut, "s_axis"), dut.aclk, dut.aresetn,
                                       reset_active_level=False)
+        trace_endpoint(self.source, "eth_header_rx.source")
 
         self.header_sink = EthHdrSink(EthHdrBus.from_prefix(dut, "m_eth"), dut.aclk, dut.aresetn,
                                       reset_active_level=False)
         self.payload_sink = AxiStreamSink(AxiStreamBus.from_prefix(dut, "m_eth_payload_axis"), dut.aclk,
                                           dut.aresetn, reset_active_level=False)
+        trace_endpoint(self.payload_sink, "eth_header_rx.payload_sink")
+
+        self.ts_in = AxiStreamTimestamper(dut.aclk, dut.s_axis_tvalid, dut.s_axis_tready, dut.s_axis_tlast)
+        self.input = ThroughputMonitor(dut.aclk, dut.s_axis_tvalid, dut.s_axis_tready, dut.s_axis_tlast)
+        self.output = ThroughputMonitor(dut.aclk, dut.m_eth_payload_axis_tvalid, dut.m_eth_payload_axis_tready,
+                                        dut.m_eth_payload_axis_tlast)
+        self.drops = PulseCounter(dut.aclk, dut.filter_drop)
+
+        # everything passes unless a test programs the filter
+        self.set_filter(promiscuous=True)
+        self.set_classes([])
+        self.ts_hdr = AxiStreamTimestamper(dut.aclk, dut.m_eth_hdr_valid, dut.m_eth_hdr_ready)
+        self.ts_payload = AxiStreamTimestamper(dut.aclk, dut.m_eth_payload_axis_tvalid,
+                                               dut.m_eth_payload_axis_tready, dut.m_eth_payload_axis_tlast)
 
     def set_idle_generator(self, generator=None):
         if generator:
@@ -66,6 +102,26 @@ class TB:
             self.header_sink.set_pause_generator(generator())
             self.payload_sink.set_pause_generator(generator())
 
+    def set_filter(self, macs=(), broadcast=True, multicast=False, promiscuous=False):
+        depth = len(self.dut.cfg_cam_valid)
+        assert len(macs) <= depth
+
+        cam = 0
+        for k, mac in enumerate(macs):
+            cam |= int(mac.replace(':', ''), 16) << (k*48)
+
+        self.dut.cfg_cam_mac.value = cam
+        self.dut.cfg_cam_valid.value = (1 << len(macs)) - 1
+        self.dut.cfg_accept_broadcast.value = broadcast
+        self.dut.cfg_accept_multicast.value = multicast
+        self.dut.cfg_promiscuous.value = promiscuous
+
+    def set_classes(self, types):
+        assert len(types) <= len(self.dut.cfg_class_valid)
+
+        self.dut.cfg_class_type.value = sum(t << (k*16) for k, t in enumerate(types))
+        self.dut.cfg_class_valid.value = (1 << len(types)) - 1
+
     async def reset(self):
         self.dut.aresetn.value = 0
         for _ in range(5):
@@ -101,6 +157,10 @@ async def run_test(dut, payload_lengths=None, payload_data=None, idle_inserter=N
     tb.set_idle_generator(idle_inserter)
     tb.set_backpressure_generator(backpressure_inserter)
 
+    tb.ts_in.start()
+    tb.ts_hdr.start()
+    tb.ts_payload.start()
+
     test_pkts = []
 
     for payload in [payload_data(x) for x in payload_lengths()]:
@@ -111,10 +171,16 @@ async def run_test(dut, payload_lengths=None, payload_data=None, idle_inserter=N
 
         await tb.send(test_pkt)
 
+    # cycle_pause holds a side three cycles out of four
+    slow = 4 ** ((idle_inserter is not None) + (backpressure_inserter is not None))
+    watchdog = Watchdog(tb.log).start()
+    watchdog.expect([len(x) for x in test_pkts],
+                    slow * sum(frame_ns(len(x), 8, len(dut.s_axis_tdata) // 8, ifg=2, overhead=0) for x in test_pkts))
+
     for test_pkt in test_pkts:
-        rx_pkt = await tb.recv()
+        rx_pkt = await watchdog.recv(tb.recv())
 
-        tb.log.info("RX packet: %s", repr(rx_pkt))
+        tb.trace.frame(bytes(rx_pkt))
 
         assert bytes(rx_pkt) == bytes(test_pkt)
 
@@ -124,11 +190,247 @@ async def run_test(dut, payload_lengths=None, payload_data=None, idle_inserter=N
     await RisingEdge(dut.aclk)
     await RisingEdge(dut.aclk)
 
+    pattern = ", ".join(f"{name}={gen.__name__ if gen else None}"
+                        for name, gen in (("idle", idle_inserter), ("backpressure", backpressure_inserter)))
+
+    latency = LatencyReport("eth_header_rx", 8, tb.log)
+    latency.add([len(x) for x in test_pkts], tb.ts_in.frames, tb.ts_hdr.frames, pattern=pattern,
+        last_outputs=tb.ts_payload.frames)
+    latency.report()
+
 
 def cycle_pause():
     return itertools.cycle([1, 1, 1, 0])
 
 
+def accepted(pkt, macs=(LOCAL_MAC,), broadcast=True, multicast=False):
+    dst = pkt.dst.upper()
+    if dst == BROADCAST_MAC:
+        return broadcast
+    if dst in macs:
+        return True
+    return multicast and bool(int(dst[:2], 16) & 1)
+
+
+def expected_class(pkt, types=CLASS_TYPES):
+    return sum(1 << k for k, t in enumerate(types) if t == pkt.type)
+
+
+async def run_test_filter(dut, payload_lengths=None, payload_data=None, multicast=False, idle_inserter=None,
+                          backpressure_inserter=None):
+
+    tb = TB(dut)
+
+    await tb.reset()
+
+    tb.set_filter([LOCAL_MAC], multicast=multicast)
+    tb.set_classes(CLASS_TYPES)
+
+    tb.set_idle_generator(idle_inserter)
+    tb.set_backpressure_generator(backpressure_inserter)
+
+    tb.drops.start()
+
+    dsts = itertools.cycle([LOCAL_MAC, OTHER_MAC, BROADCAST_MAC, MULTICAST_MAC])
+    types = itertools.cycle(CLASS_TYPES + [0x8000])
+
+    test_pkts = []
+
+    for payload in [payload_data(x) for x in payload_lengths()]:
+        eth = Ether(src='5A:51:52:53:54:55', dst=next(dsts), type=next(types))
+        test_pkt = eth / payload
+
+        test_pkts.append(test_pkt.copy())
+
+        await tb.send(test_pkt)
+
+    expected = [x for x in test_pkts if accepted(x, multicast=multicast)]
+
+    slow = 4 ** ((idle_inserter is not None) + (backpressure_inserter is not None))
+    watchdog = Watchdog(tb.log).start()
+    watchdog.expect([len(x) for x in expected],
+                    slow * sum(frame_ns(len(x), 8, ifg=2, overhead=0) for x in test_pkts))
+
+    for test_pkt in expected:
+        rx_header = await watchdog.recv(tb.header_sink.recv())
+        rx_payload = await tb.payload_sink.recv()
+
+        assert rx_header.dst_mac.integer == int(test_pkt.dst.replace(':', ''), 16)
+        assert rx_header.type.integer == test_pkt.type
+        assert getattr(rx_header, "class").integer == expected_class(test_pkt)
+        assert bytes(rx_payload.tdata) == bytes(test_pkt.payload)
+
+    await tb.source.wait()
+
+    for _ in range(4):
+        await RisingEdge(dut.aclk)
+
+    assert tb.header_sink.empty()
+    assert tb.payload_sink.empty()
+    assert tb.drops.count == len(test_pkts) - len(expected)
+
+    await RisingEdge(dut.aclk)
+    await RisingEdge(dut.aclk)
+
+
+async def run_test_drop_rate(dut, accept_every=None, backpressure_inserter=None):
+
+    tb = TB(dut)
+
+    await tb.reset()
+
+    tb.set_filter([LOCAL_MAC])
+
+    tb.set_backpressure_generator(backpressure_inserter)
+
+    tb.input.start()
+    tb.drops.start()
+
+    # back-to-back minimum size frames, one in accept_every addressed to us
+    count = 256
+    test_pkts = []
+
+    for k in range(count):
+        dst = LOCAL_MAC if accept_every and k % accept_every == 0 else OTHER_MAC
+        test_pkt = Ether(src='5A:51:52:53:54:55', dst=dst, type=0x8000) / incrementing_payload(60-14)
+
+        test_pkts.append(test_pkt)
+
+        await tb.send(test_pkt)
+
+    expected = [x for x in test_pkts if accepted(x)]
+
+    watchdog = Watchdog(tb.log).start()
+    watchdog.expect([len(x) for x in expected], 4 * count * frame_ns(60, 8, ifg=0, overhead=0))
+
+    for test_pkt in expected:
+        rx_pkt = await watchdog.recv(tb.recv())
+
+        assert bytes(rx_pkt) == bytes(test_pkt)
+
+    await tb.source.wait()
+
+    for _ in range(4):
+        await RisingEdge(dut.aclk)
+
+    pattern = f"accept_every={accept_every}, backpressure={getattr(backpressure_inserter, '__name__', None)}"
+
+    tb.input.report(f"eth_header_rx input [{pattern}]", 8, tb.log)
+    tb.log.info("eth_header_rx filter [%s]: %d frames dropped, %d accepted, %d input stall cycles", pattern,
+        tb.drops.count, len(expected), tb.input.stalls)
+
+    record(pattern, frames=count, cycles=tb.input.active_cycles, throughput_mbps=tb.input.rate_mbps(8))
+
+    assert tb.drops.count == count - len(expected)
+
+    if not expected:
+        # rejected frames are consumed at one byte per cycle whatever the outputs do
+        assert tb.input.stalls == 0
+        assert tb.input.active_cycles == tb.input.beats
+
+    await RisingEdge(dut.aclk)
+    await RisingEdge(dut.aclk)
+
+
+def parse_vlan(frame, max_tags=2):
+    # expected header fields: TCIs of up to max_tags tags, the ethertype after them and the payload
+    tcis = []
+    while len(tcis) < max_tags and int.from_bytes(frame[12+4*len(tcis):14+4*len(tcis)], 'big') in VLAN_TPIDS:
+        tcis.append(int.from_bytes(frame[14+4*len(tcis):16+4*len(tcis)], 'big'))
+    offset = 12 + 4*len(tcis)
+    return tcis, int.from_bytes(frame[offset:offset+2], 'big'), frame[offset+2:]
+
+
+def untagged(k, payload):
+    return Ether(src='5A:51:52:53:54:55', dst=LOCAL_MAC, type=0x0800) / payload
+
+
+def single_tag(k, payload):
+    return (Ether(src='5A:51:52:53:54:55', dst=LOCAL_MAC) / Dot1Q(prio=k % 8, id=k % 2, vlan=k % 4096, type=0x0800)
+        / payload)
+
+
+def double_tag(k, payload):
+    return (Ether(src='5A:51:52:53:54:55', dst=LOCAL_MAC) / Dot1AD(prio=k % 8, vlan=(100 + k) % 4096)
+        / Dot1Q(prio=7 - k % 8, vlan=(k * 7) % 4096, type=0x86dd) / payload)
+
+
+def mixed_tags(k, payload):
+    return [untagged, single_tag, double_tag][k % 3](k, payload)
+
+
+async def run_test_vlan(dut, payload_lengths=None, payload_data=None, tagging=None, idle_inserter=None,
+                        backpressure_inserter=None):
+
+    tb = TB(dut)
+
+    await tb.reset()
+
+    tb.set_idle_generator(idle_inserter)
+    tb.set_backpressure_generator(backpressure_inserter)
+
+    tb.output.start()
+
+    test_frames = []
+
+    for k, payload in enumerate([payload_data(x) for x in payload_lengths()]):
+        test_frame = bytes(tagging(k, payload))
+
+        test_frames.append(test_frame)
+
+        await tb.source.send(test_frame)
+
+    slow = 4 ** ((idle_inserter is not None) + (backpressure_inserter is not None))
+    watchdog = Watchdog(tb.log).start()
+    watchdog.expect([len(x) for x in test_frames],
+                    slow * sum(frame_ns(len(x), 8, ifg=2, overhead=0) for x in test_frames))
+
+    for test_frame in test_frames:
+        rx_header = await watchdog.recv(tb.header_sink.recv())
+        rx_payload = await tb.payload_sink.recv()
+
+        tcis, eth_type, payload = parse_vlan(test_frame)
+
+        assert rx_header.dst_mac.integer == int.from_bytes(test_frame[0:6], 'big')
+        assert rx_header.src_mac.integer == int.from_bytes(test_frame[6:12], 'big')
+        assert rx_header.type.integer == eth_type
+        assert rx_header.vlan_tags.integer == len(tcis)
+        # a frame with fewer tags must not show the TCIs of an earlier one
+        assert rx_header.vlan_tci.integer == (tcis[0] if len(tcis) > 0 else 0)
+        assert rx_header.inner_vlan_tci.integer == (tcis[1] if len(tcis) > 1 else 0)
+        assert bytes(rx_payload.tdata) == payload
+
+    assert tb.header_sink.empty()
+    assert tb.payload_sink.empty()
+
+    pattern = ", ".join(f"{name}={gen.__name__ if gen else None}"
+                        for name, gen in (("tagging", tagging), ("idle", idle_inserter),
+                                          ("backpressure", backpressure_inserter)))
+
+    tb.output.report(f"eth_header_rx payload output [{pattern}]", 8, tb.log)
+
+    if idle_inserter is None and backpressure_inserter is None:
+        # tags are stripped inline, the payload leaves without gaps
+        assert tb.output.bubbles == 0
+
+    await RisingEdge(dut.aclk)
+    await RisingEdge(dut.aclk)
+
+
+async def run_test_cosim(dut):
+
+    tb = TB(dut)
+
+    await tb.reset()
+
+    # frames from the socket client on s_axis, header and payload joined back into frames
+    bridge = CosimBridge(os.environ["COSIM_SOCKET"], tb.source, tb.recv, dut.aclk, log=tb.log)
+    await bridge.run()
+
+    await RisingEdge(dut.aclk)
+    await RisingEdge(dut.aclk)
+
+
 def size_list():
     return list(range(1, 128)) + [512, 1500, 9200] + [60-14]*10
 
@@ -145,3 +447,54 @@ if cocotb.SIM_NAME:
     factory.add_option("idle_inserter", [None, cycle_pause])
     factory.add_option("backpressure_inserter", [None, cycle_pause])
     factory.generate_tests()
+
+    factory = TestFactory(run_test_filter)
+    factory.add_option("payload_lengths", [size_list])
+    factory.add_option("payload_data", [incrementing_payload])
+    factory.add_option("multicast", [False, True])
+    factory.add_option("idle_inserter", [None, cycle_pause])
+    factory.add_option("backpressure_inserter", [None, cycle_pause])
+    factory.generate_tests()
+
+    factory = TestFactory(run_test_vlan)
+    factory.add_option("payload_lengths", [size_list])
+    factory.add_option("payload_data", [incrementing_payload])
+    factory.add_option("tagging", [single_tag, double_tag, mixed_tags])
+    factory.add_option("idle_inserter", [None, cycle_pause])
+    factory.add_option("backpressure_inserter", [None, cycle_pause])
+    factory.generate_tests()
+
+    factory = TestFactory(run_test_drop_rate)
+    factory.add_option("accept_every", [None, 4])
+    factory.add_option("backpressure_inserter", [None, cycle_pause])
+    factory.generate_tests()
+
+    if os.environ.get("COSIM_SOCKET"):
+        factory = TestFactory(run_test_cosim)
+        factory.generate_tests()
+
+
+# cocotb-test
+
+tests_dir = os.path.dirname(__file__)
+hdl_dir = os.path.abspath(os.path.join(tests_dir, '..', '..', '..', 'hdl', 'eth_header'))
+
+
+# the filter tests program one CAM entry, the VLAN tests len(CLASS_TYPES) classes
+@pytest.mark.parametrize(("cam_depth", "class_depth"), [(1, 3), (4, 4), (16, 8)])
+def test_eth_header_rx(request, cam_depth, class_depth):
+    dut = "eth_header_rx"
+
+    parameters = {}
+    parameters['VLAN_ENABLE'] = "true"
+    parameters['FILTER_ENABLE'] = "true"
+    parameters['CAM_DEPTH'] = cam_depth
+    parameters['CLASS_DEPTH'] = class_depth
+
+    sweep.run(
+        request,
+        toplevel=dut,
+        module=f"{dut}_tb",
+        vhdl_sources=[os.path.join(hdl_dir, f"{dut}.vhd")],
+        parameters=parameters,
+    )
@@ -0,0 +1,181 @@
+-- Copyright (c) 2024 Marcin Zaremba
+--
+-- Permission is hereby granted, free of charge, to any person obtaining a copy
+-- of this software and associated documentation files (the "Software"), to deal
+-- in the Software without restriction, including without limitation the rights
+-- to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+-- copies of the Software, and to permit persons to whom the Software is
+-- furnished to do so, subject to the following conditions:
+--
+-- The above copyright notice and this permission notice shall be included in
+-- all copies or substantial portions of the Software.
+--
+-- THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+-- IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+-- FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+-- AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+-- LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+-- OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+-- THE SOFTWARE.
+
+-- eth_header_tx feeding eth_header_rx. The serialized frame stream between the
+-- two is brought out as axis_* for the bench to observe.
+
+library ieee;
+    use ieee.std_logic_1164.all;
+
+entity eth_header_loopback is
+    port (
+        aclk    : in    std_logic;
+        aresetn : in    std_logic;
+
+        s_eth_hdr_valid           : in    std_logic;
+        s_eth_hdr_ready           : out   std_logic;
+        s_eth_dst_mac             : in    std_logic_vector(47 downto 0);
+        s_eth_src_mac             : in    std_logic_vector(47 downto 0);
+        s_eth_type                : in    std_logic_vector(15 downto 0);
+        s_eth_payload_axis_tdata  : in    std_logic_vector(7 downto 0);
+        s_eth_payload_axis_tvalid : in    std_logic;
+        s_eth_payload_axis_tready : out   std_logic;
+        s_eth_payload_axis_tlast  : in    std_logic;
+        s_eth_payload_axis_tuser  : in    std_logic_vector(0 downto 0);
+
+        axis_tdata  : out   std_logic_vector(7 downto 0);
+        axis_tvalid : out   std_logic;
+        axis_tready : out   std_logic;
+        axis_tlast  : out   std_logic;
+        axis_tuser  : out   std_logic;
+
+        m_eth_hdr_valid           : out   std_logic;
+        m_eth_hdr_ready           : in    std_logic;
+        m_eth_dst_mac             : out   std_logic_vector(47 downto 0);
+        m_eth_src_mac             : out   std_logic_vector(47 downto 0);
+        m_eth_type                : out   std_logic_vector(15 downto 0);
+        m_eth_payload_axis_tdata  : out   std_logic_vector(7 downto 0);
+        m_eth_payload_axis_tvalid : out   std_logic;
+        m_eth_payload_axis_tready : in    std_logic;
+        m_eth_payload_axis_tlast  : out   std_logic;
+        m_eth_payload_axis_tuser  : out   std_logic_vector(0 downto 0)
+    );
+end entity eth_header_loopback;
+
+architecture rtl of eth_header_loopback is
+
+    component eth_header_tx is
+        port (
+            aclk    : in    std_logic;
+            aresetn : in    std_logic;
+
+            s_eth_hdr_valid           : in    std_logic;
+            s_eth_hdr_ready           : out   std_logic;
+            s_eth_dst_mac             : in    std_logic_vector(47 downto 0);
+            s_eth_src_mac             : in    std_logic_vector(47 downto 0);
+            s_eth_type                : in    std_logic_vector(15 downto 0);
+            s_eth_payload_axis_tdata  : in    std_logic_vector(7 downto 0);
+            s_eth_payload_axis_tvalid : in    std_logic;
+            s_eth_payload_axis_tready : out   std_logic;
+            s_eth_payload_axis_tlast  : in    std_logic;
+            s_eth_payload_axis_tuser  : in    std_logic_vector(0 downto 0);
+
+            m_axis_tdata  : out   std_logic_vector(7 downto 0);
+            m_axis_tvalid : out   std_logic;
+            m_axis_tready : in    std_logic;
+            m_axis_tlast  : out   std_logic;
+            m_axis_tuser  : out   std_logic
+        );
+    end component;
+
+    component eth_header_rx is
+        generic (
+            VLAN_ENABLE : boolean := false
+        );
+        port (
+            aclk    : in    std_logic;
+            aresetn : in    std_logic;
+
+            s_axis_tdata  : in    std_logic_vector(7 downto 0);
+            s_axis_tvalid : in    std_logic;
+            s_axis_tready : out   std_logic;
+            s_axis_tlast  : in    std_logic;
+            s_axis_tuser  : in    std_logic;
+
+            m_eth_hdr_valid           : out   std_logic;
+            m_eth_hdr_ready           : in    std_logic;
+            m_eth_dst_mac             : out   std_logic_vector(47 downto 0);
+            m_eth_src_mac             : out   std_logic_vector(47 downto 0);
+            m_eth_type                : out   std_logic_vector(15 downto 0);
+            m_eth_vlan_tags           : out   std_logic_vector(1 downto 0);
+            m_eth_vlan_tci            : out   std_logic_vector(15 downto 0);
+            m_eth_inner_vlan_tci      : out   std_logic_vector(15 downto 0);
+            m_eth_payload_axis_tdata  : out   std_logic_vector(7 downto 0);
+            m_eth_payload_axis_tvalid : out   std_logic;
+            m_eth_payload_axis_tready : in    std_logic;
+            m_eth_payload_axis_tlast  : out   std_logic;
+            m_eth_payload_axis_tuser  : out   std_logic_vector(0 downto 0)
+        );
+    end component;
+
+    signal tx_axis_tdata  : std_logic_vector(7 downto 0);
+    signal tx_axis_tvalid : std_logic;
+    signal tx_axis_tready : std_logic;
+    signal tx_axis_tlast  : std_logic;
+    signal tx_axis_tuser  : std_logic;
+
+begin
+
+    eth_header_tx_i : component eth_header_tx
+        port map (
+            aclk    => aclk,
+            aresetn => aresetn,
+
+            s_eth_hdr_valid           => s_eth_hdr_valid,
+            s_eth_hdr_ready           => s_eth_hdr_ready,
+            s_eth_dst_mac             => s_eth_dst_mac,
+            s_eth_src_mac             => s_eth_src_mac,
+            s_eth_type                => s_eth_type,
+            s_eth_payload_axis_tdata  => s_eth_payload_axis_tdata,
+            s_eth_payload_axis_tvalid => s_eth_payload_axis_tvalid,
+            s_eth_payload_axis_tready => s_eth_payload_axis_tready,
+            s_eth_payload_axis_tlast  => s_eth_payload_axis_tlast,
+            s_eth_payload_axis_tuser  => s_eth_payload_axis_tuser,
+
+            m_axis_tdata  => tx_axis_tdata,
+            m_axis_tvalid => tx_axis_tvalid,
+            m_axis_tready => tx_axis_tready,
+            m_axis_tlast  => tx_axis_tlast,
+            m_axis_tuser  => tx_axis_tuser
+        );
+
+    eth_header_rx_i : component eth_header_rx
+        port map (
+            aclk    => aclk,
+            aresetn => aresetn,
+
+            s_axis_tdata  => tx_axis_tdata,
+            s_axis_tvalid => tx_axis_tvalid,
+            s_axis_tready => tx_axis_tready,
+            s_axis_tlast  => tx_axis_tlast,
+            s_axis_tuser  => tx_axis_tuser,
+
+            m_eth_hdr_valid           => m_eth_hdr_valid,
+            m_eth_hdr_ready           => m_eth_hdr_ready,
+            m_eth_dst_mac             => m_eth_dst_mac,
+            m_eth_src_mac             => m_eth_src_mac,
+            m_eth_type                => m_eth_type,
+            m_eth_vlan_tags           => open,
+            m_eth_vlan_tci            => open,
+            m_eth_inner_vlan_tci      => open,
+            m_eth_payload_axis_tdata  => m_eth_payload_axis_tdata,
+            m_eth_payload_axis_tvalid => m_eth_payload_axis_tvalid,
+            m_eth_payload_axis_tready => m_eth_payload_axis_tready,
+            m_eth_payload_axis_tlast  => m_eth_payload_axis_tlast,
+            m_eth_payload_axis_tuser  => m_eth_payload_axis_tuser
+        );
+
+    axis_tdata  <= tx_axis_tdata;
+    axis_tvalid <= tx_axis_tvalid;
+    axis_tready <= tx_axis_tready;
+    axis_tlast  <= tx_axis_tlast;
+    axis_tuser  <= tx_axis_tuser;
+
+end architecture rtl;
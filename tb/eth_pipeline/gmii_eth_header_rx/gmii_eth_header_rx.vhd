@@ -0,0 +1,176 @@
+-- Copyright (c) 2024 Marcin Zaremba
+--
+-- Permission is hereby granted, free of charge, to any person obtaining a copy
+-- of this software and associated documentation files (the "Software"), to deal
+-- in the Software without restriction, including without limitation the rights
+-- to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+-- copies of the Software, and to permit persons to whom the Software is
+-- furnished to do so, subject to the following conditions:
+--
+-- The above copyright notice and this permission notice shall be included in
+-- all copies or substantial portions of the Software.
+--
+-- THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+-- IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+-- FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+-- AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+-- LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+-- OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+-- THE SOFTWARE.
+
+-- Receive pipeline as used in the designs: axis_gmii_rx feeding eth_header_rx
+-- on the same clock. axis_gmii_rx has no tready, every cycle eth_header_rx
+-- holds s_axis_tready low while a MAC beat is valid the beat is lost. The MAC
+-- output stream is brought out as mac_axis_* for the bench to observe.
+
+library ieee;
+    use ieee.std_logic_1164.all;
+
+entity gmii_eth_header_rx is
+    port (
+        clk : in    std_logic;
+        rst : in    std_logic;
+
+        gmii_rxd   : in    std_logic_vector(7 downto 0);
+        gmii_rx_dv : in    std_logic;
+        gmii_rx_er : in    std_logic;
+
+        mac_axis_tdata  : out   std_logic_vector(7 downto 0);
+        mac_axis_tvalid : out   std_logic;
+        mac_axis_tready : out   std_logic;
+        mac_axis_tlast  : out   std_logic;
+        mac_axis_tuser  : out   std_logic;
+
+        m_eth_hdr_valid           : out   std_logic;
+        m_eth_hdr_ready           : in    std_logic;
+        m_eth_dst_mac             : out   std_logic_vector(47 downto 0);
+        m_eth_src_mac             : out   std_logic_vector(47 downto 0);
+        m_eth_type                : out   std_logic_vector(15 downto 0);
+        m_eth_payload_axis_tdata  : out   std_logic_vector(7 downto 0);
+        m_eth_payload_axis_tvalid : out   std_logic;
+        m_eth_payload_axis_tready : in    std_logic;
+        m_eth_payload_axis_tlast  : out   std_logic;
+        m_eth_payload_axis_tuser  : out   std_logic_vector(0 downto 0);
+
+        rx_start_packet    : out   std_logic;
+        rx_error_bad_frame : out   std_logic;
+        rx_error_bad_fcs   : out   std_logic
+    );
+end entity gmii_eth_header_rx;
+
+architecture rtl of gmii_eth_header_rx is
+
+    component axis_gmii_rx is
+        port (
+            clk : in    std_logic;
+            rst : in    std_logic;
+
+            gmii_rxd   : in    std_logic_vector(7 downto 0);
+            gmii_rx_dv : in    std_logic;
+            gmii_rx_er : in    std_logic;
+
+            m_axis_tdata  : out   std_logic_vector(7 downto 0);
+            m_axis_tvalid : out   std_logic;
+            m_axis_tlast  : out   std_logic;
+            m_axis_tuser  : out   std_logic;
+
+            start_packet    : out   std_logic;
+            error_bad_frame : out   std_logic;
+            error_bad_fcs   : out   std_logic
+        );
+    end component;
+
+    component eth_header_rx is
+        generic (
+            VLAN_ENABLE : boolean := false
+        );
+        port (
+            aclk    : in    std_logic;
+            aresetn : in    std_logic;
+
+            s_axis_tdata  : in    std_logic_vector(7 downto 0);
+            s_axis_tvalid : in    std_logic;
+            s_axis_tready : out   std_logic;
+            s_axis_tlast  : in    std_logic;
+            s_axis_tuser  : in    std_logic;
+
+            m_eth_hdr_valid           : out   std_logic;
+            m_eth_hdr_ready           : in    std_logic;
+            m_eth_dst_mac             : out   std_logic_vector(47 downto 0);
+            m_eth_src_mac             : out   std_logic_vector(47 downto 0);
+            m_eth_type                : out   std_logic_vector(15 downto 0);
+            m_eth_vlan_tags           : out   std_logic_vector(1 downto 0);
+            m_eth_vlan_tci            : out   std_logic_vector(15 downto 0);
+            m_eth_inner_vlan_tci      : out   std_logic_vector(15 downto 0);
+            m_eth_payload_axis_tdata  : out   std_logic_vector(7 downto 0);
+            m_eth_payload_axis_tvalid : out   std_logic;
+            m_eth_payload_axis_tready : in    std_logic;
+            m_eth_payload_axis_tlast  : out   std_logic;
+            m_eth_payload_axis_tuser  : out   std_logic_vector(0 downto 0)
+        );
+    end component;
+
+    signal resetn : std_logic;
+
+    signal axis_tdata  : std_logic_vector(7 downto 0);
+    signal axis_tvalid : std_logic;
+    signal axis_tready : std_logic;
+    signal axis_tlast  : std_logic;
+    signal axis_tuser  : std_logic;
+
+begin
+
+    resetn <= not rst;
+
+    axis_gmii_rx_i : component axis_gmii_rx
+        port map (
+            clk => clk,
+            rst => rst,
+
+            gmii_rxd   => gmii_rxd,
+            gmii_rx_dv => gmii_rx_dv,
+            gmii_rx_er => gmii_rx_er,
+
+            m_axis_tdata  => axis_tdata,
+            m_axis_tvalid => axis_tvalid,
+            m_axis_tlast  => axis_tlast,
+            m_axis_tuser  => axis_tuser,
+
+            start_packet    => rx_start_packet,
+            error_bad_frame => rx_error_bad_frame,
+            error_bad_fcs   => rx_error_bad_fcs
+        );
+
+    eth_header_rx_i : component eth_header_rx
+        port map (
+            aclk    => clk,
+            aresetn => resetn,
+
+            s_axis_tdata  => axis_tdata,
+            s_axis_tvalid => axis_tvalid,
+            s_axis_tready => axis_tready,
+            s_axis_tlast  => axis_tlast,
+            s_axis_tuser  => axis_tuser,
+
+            m_eth_hdr_valid           => m_eth_hdr_valid,
+            m_eth_hdr_ready           => m_eth_hdr_ready,
+            m_eth_dst_mac             => m_eth_dst_mac,
+            m_eth_src_mac             => m_eth_src_mac,
+            m_eth_type                => m_eth_type,
+            m_eth_vlan_tags           => open,
+            m_eth_vlan_tci            => open,
+            m_eth_inner_vlan_tci      => open,
+            m_eth_payload_axis_tdata  => m_eth_payload_axis_tdata,
+            m_eth_payload_axis_tvalid => m_eth_payload_axis_tvalid,
+            m_eth_payload_axis_tready => m_eth_payload_axis_tready,
+            m_eth_payload_axis_tlast  => m_eth_payload_axis_tlast,
+            m_eth_payload_axis_tuser  => m_eth_payload_axis_tuser
+        );
+
+    mac_axis_tdata  <= axis_tdata;
+    mac_axis_tvalid <= axis_tvalid;
+    mac_axis_tready <= axis_tready;
+    mac_axis_tlast  <= axis_tlast;
+    mac_axis_tuser  <= axis_tuser;
+
+end architecture rtl;
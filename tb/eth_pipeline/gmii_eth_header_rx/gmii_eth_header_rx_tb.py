@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+"""
+Copyright (c) 2024 Marcin Zaremba
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+
+import itertools
+import logging
+from collections import Counter
+
+from scapy.layers.l2 import Ether
+
+import cocotb
+from cocotb.clock import Clock
+from cocotb.triggers import RisingEdge
+from cocotb.regression import TestFactory
+
+from cocotbext.eth import GmiiFrame, GmiiSource
+from cocotbext.axi import AxiStreamBus, AxiStreamSink
+from cocotbext.axi.stream import define_stream
+
+from bench_results import record
+from latency import is_high
+from throughput import ThroughputMonitor
+from trace_recorder import trace_endpoint
+from watchdog import Watchdog, frame_ns
+
+EthHdrBus, EthHdrTransaction, EthHdrSource, EthHdrSink, EthHdrMonitor = define_stream("EthHdr",
+    signals=["hdr_valid", "hdr_ready", "dst_mac", "src_mac", "type"]
+)
+
+
+class StallOrigin:
+    """Attributes every MAC beat refused by eth_header_rx to the output holding it off"""
+
+    def __init__(self, dut):
+        self.dut = dut
+        self.causes = Counter()
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = cocotb.start_soon(self._run())
+        return self
+
+    @property
+    def lost_beats(self):
+        return sum(self.causes.values())
+
+    async def _run(self):
+        dut = self.dut
+        while True:
+            await RisingEdge(dut.clk)
+            if not is_high(dut.mac_axis_tvalid) or is_high(dut.mac_axis_tready):
+                continue
+            payload = is_high(dut.m_eth_payload_axis_tvalid) and not is_high(dut.m_eth_payload_axis_tready)
+            header = is_high(dut.m_eth_hdr_valid) and not is_high(dut.m_eth_hdr_ready)
+            if payload and header:
+                self.causes["header+payload"] += 1
+            elif payload:
+                self.causes["payload"] += 1
+            elif header:
+                self.causes["header"] += 1
+            else:
+                self.causes["other"] += 1
+
+
+class TB:
+    def __init__(self, dut):
+        self.dut = dut
+
+        self.log = logging.getLogger("cocotb.tb")
+        self.log.setLevel(logging.INFO)
+
+        cocotb.start_soon(Clock(dut.clk, 8, units="ns").start())
+
+        self.source = GmiiSource(dut.gmii_rxd, dut.gmii_rx_er, dut.gmii_rx_dv, dut.clk, dut.rst)
+        trace_endpoint(self.source, "gmii_eth_header_rx.source")
+
+        self.header_sink = EthHdrSink(EthHdrBus.from_prefix(dut, "m_eth"), dut.clk, dut.rst)
+        self.payload_sink = AxiStreamSink(AxiStreamBus.from_prefix(dut, "m_eth_payload_axis"), dut.clk, dut.rst)
+        trace_endpoint(self.payload_sink, "gmii_eth_header_rx.payload_sink")
+
+        self.mac = ThroughputMonitor(dut.clk, dut.mac_axis_tvalid, dut.mac_axis_tready, dut.mac_axis_tlast)
+        self.payload = ThroughputMonitor(dut.clk, dut.m_eth_payload_axis_tvalid, dut.m_eth_payload_axis_tready,
+                                         dut.m_eth_payload_axis_tlast)
+        self.stall_origin = StallOrigin(dut)
+
+    def set_backpressure_generator(self, generator=None):
+        if generator:
+            self.header_sink.set_pause_generator(generator())
+            self.payload_sink.set_pause_generator(generator())
+
+    async def reset(self):
+        self.dut.rst.setimmediatevalue(0)
+        self.dut.rst.value = 1
+        for _ in range(5):
+            await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 0
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+
+    async def drain(self, idle_cycles=16):
+        # the source has no tready, wait for the outputs to go quiet instead of a frame count
+        await self.source.wait()
+
+        quiet = 0
+        while quiet < idle_cycles:
+            await RisingEdge(self.dut.clk)
+            busy = (is_high(self.dut.mac_axis_tvalid) or is_high(self.dut.m_eth_hdr_valid)
+                    or is_high(self.dut.m_eth_payload_axis_tvalid))
+            quiet = 0 if busy else quiet + 1
+
+    def received(self):
+        headers = []
+        while not self.header_sink.empty():
+            headers.append(self.header_sink.recv_nowait())
+
+        payloads = []
+        while not self.payload_sink.empty():
+            payloads.append(self.payload_sink.recv_nowait())
+
+        return headers, payloads
+
+
+async def run_test(dut, payload_lengths=None, payload_data=None, ifg=12, backpressure_inserter=None):
+
+    tb = TB(dut)
+
+    tb.source.ifg = ifg
+
+    await tb.reset()
+
+    tb.set_backpressure_generator(backpressure_inserter)
+
+    tb.mac.start()
+    tb.payload.start()
+    tb.stall_origin.start()
+
+    test_pkts = []
+
+    for payload in [payload_data(x) for x in payload_lengths()]:
+        eth = Ether(src='5A:51:52:53:54:55', dst='DA:D1:D2:D3:D4:D5', type=0x8000)
+        test_pkt = eth / payload
+
+        test_pkts.append(test_pkt.copy())
+
+        await tb.source.send(GmiiFrame.from_payload(bytes(test_pkt)))
+
+    # the MAC runs at line rate whatever the backpressure, refused beats are dropped
+    watchdog = Watchdog(tb.log).start()
+    watchdog.extend(sum(frame_ns(len(x), 8, ifg=ifg) for x in test_pkts))
+    watchdog.watch(lambda: [f"drain after {tb.payload.frames} of {len(test_pkts)} payload frames"])
+
+    await tb.drain()
+
+    headers, payloads = tb.received()
+
+    # in-order match of received payloads against the sent frames, skipping lost ones
+    intact = 0
+    expected = iter(test_pkts)
+    for rx_payload in payloads:
+        for test_pkt in expected:
+            if bytes(rx_payload.tdata) == bytes(test_pkt.payload):
+                intact += 1
+                break
+
+    pattern = backpressure_inserter.__name__ if backpressure_inserter else None
+
+    tb.mac.report(f"axis_gmii_rx output [backpressure={pattern}]", 8, tb.log)
+    tb.payload.report(f"eth_header_rx payload output [backpressure={pattern}]", 8, tb.log)
+    tb.log.info("lost MAC beats: %d (%s), frames sent %d, headers %d, payload frames %d, intact %d",
+        tb.stall_origin.lost_beats, ", ".join(f"{k}: {v}" for k, v in sorted(tb.stall_origin.causes.items())),
+        len(test_pkts), len(headers), len(payloads), intact)
+
+    record(f"backpressure={pattern}", frames=intact, cycles=tb.payload.active_cycles,
+        throughput_mbps=tb.payload.rate_mbps(8), lost_beats=tb.stall_origin.lost_beats)
+
+    # nothing refused at the MAC output means nothing can have been lost
+    if tb.stall_origin.lost_beats == 0:
+        assert len(headers) == len(test_pkts)
+        assert intact == len(test_pkts)
+
+    if backpressure_inserter is None:
+        # eth_header_rx keeps up with the MAC at line rate
+        assert tb.stall_origin.lost_beats == 0
+        assert tb.mac.beats == sum(len(x) for x in test_pkts)
+
+        for rx_header, test_pkt in zip(headers, test_pkts):
+            assert rx_header.dst_mac.integer == int(test_pkt.dst.replace(':', ''), 16)
+            assert rx_header.src_mac.integer == int(test_pkt.src.replace(':', ''), 16)
+            assert rx_header.type.integer == test_pkt.type
+    else:
+        assert tb.stall_origin.causes["other"] == 0
+
+    await RisingEdge(dut.clk)
+    await RisingEdge(dut.clk)
+
+
+def cycle_pause():
+    return itertools.cycle([1, 1, 1, 0])
+
+
+def sparse_pause():
+    return itertools.cycle([1] + [0]*63)
+
+
+def size_list():
+    return list(range(46, 128)) + [512, 1500, 9200] + [46]*10
+
+
+def incrementing_payload(length):
+    return bytes(itertools.islice(itertools.cycle(range(256)), length))
+
+
+if cocotb.SIM_NAME:
+
+    factory = TestFactory(run_test)
+    factory.add_option("payload_lengths", [size_list])
+    factory.add_option("payload_data", [incrementing_payload])
+    factory.add_option("ifg", [12])
+    factory.add_option("backpressure_inserter", [None, sparse_pause, cycle_pause])
+    factory.generate_tests()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+"""
+Copyright (c) 2024 Marcin Zaremba
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import logging
+import os
+
+import pytest
+
+import cocotb
+from cocotb.clock import Clock
+from cocotb.triggers import RisingEdge
+from cocotb.regression import TestFactory
+
+import sweep
+from stats import RxStatsModel, read_counters
+
+
+class TB:
+    def __init__(self, dut):
+        self.dut = dut
+
+        self.log = logging.getLogger("cocotb.tb")
+        self.log.setLevel(logging.INFO)
+
+        cocotb.start_soon(Clock(dut.clk, 6.4, units="ns").start())
+
+        self.keep_width = len(dut.s_axis_tkeep)
+        self.model = RxStatsModel()
+
+        dut.s_axis_tkeep.setimmediatevalue(0)
+        dut.s_axis_tvalid.setimmediatevalue(0)
+        dut.s_axis_tlast.setimmediatevalue(0)
+        dut.s_axis_tuser.setimmediatevalue(0)
+        dut.start_packet.setimmediatevalue(0)
+        dut.error_bad_frame.setimmediatevalue(0)
+        dut.error_bad_fcs.setimmediatevalue(0)
+        dut.stat_snapshot.setimmediatevalue(0)
+        dut.stat_clear.setimmediatevalue(0)
+
+    async def reset(self):
+        self.dut.rst.setimmediatevalue(0)
+        self.dut.rst.value = 1
+        for _ in range(5):
+            await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 0
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+
+    async def send(self, length, bad_frame=False, bad_fcs=False, ifg=1):
+        # same sequence as the MAC: start_packet, payload beats, status with the last beat
+        dut = self.dut
+        bad_frame = bad_frame or bad_fcs
+
+        dut.start_packet.value = 1
+        await RisingEdge(dut.clk)
+        dut.start_packet.value = 0
+
+        remaining = length
+        while remaining > 0:
+            n = min(remaining, self.keep_width)
+            remaining -= n
+
+            dut.s_axis_tkeep.value = (1 << n) - 1
+            dut.s_axis_tvalid.value = 1
+            dut.s_axis_tlast.value = remaining == 0
+            dut.s_axis_tuser.value = remaining == 0 and bad_frame
+            dut.error_bad_frame.value = remaining == 0 and bad_frame
+            dut.error_bad_fcs.value = remaining == 0 and bad_fcs
+            await RisingEdge(dut.clk)
+
+        dut.s_axis_tvalid.value = 0
+        dut.s_axis_tlast.value = 0
+        dut.s_axis_tuser.value = 0
+        dut.error_bad_frame.value = 0
+        dut.error_bad_fcs.value = 0
+
+        for _ in range(ifg):
+            await RisingEdge(dut.clk)
+
+        self.model.start_packet()
+        self.model.frame(length, good=not bad_frame, bad_frame=bad_frame, bad_fcs=bad_fcs)
+
+    async def snapshot(self, clear=False):
+        # flush the two stage counter pipeline
+        for _ in range(3):
+            await RisingEdge(self.dut.clk)
+
+        self.dut.stat_snapshot.value = 1
+        self.dut.stat_clear.value = clear
+        await RisingEdge(self.dut.clk)
+        self.dut.stat_snapshot.value = 0
+        self.dut.stat_clear.value = 0
+        await RisingEdge(self.dut.clk)
+
+        return read_counters(self.dut)
+
+
+async def run_test(dut, payload_lengths=None, error_pattern=None):
+
+    tb = TB(dut)
+
+    await tb.reset()
+
+    for k, length in enumerate(payload_lengths()):
+        bad_frame, bad_fcs = error_pattern(k)
+        await tb.send(length, bad_frame=bad_frame, bad_fcs=bad_fcs)
+
+    counters = await tb.snapshot()
+
+    tb.log.info("counters: %s", counters)
+
+    assert counters == tb.model.counters
+
+    await RisingEdge(dut.clk)
+    await RisingEdge(dut.clk)
+
+
+async def run_test_clear(dut, payload_lengths=None):
+
+    tb = TB(dut)
+
+    await tb.reset()
+
+    for length in payload_lengths():
+        await tb.send(length, ifg=0)
+
+    counters = await tb.snapshot(clear=True)
+
+    assert counters == tb.model.counters
+
+    # snapshot output holds until the next snapshot, running counters restart
+    tb.model.clear()
+
+    for length in payload_lengths():
+        await tb.send(length, bad_fcs=True, ifg=0)
+
+    assert read_counters(dut) == counters
+
+    counters = await tb.snapshot(clear=True)
+
+    assert counters == tb.model.counters
+
+    tb.model.clear()
+
+    counters = await tb.snapshot()
+
+    assert counters == tb.model.counters
+
+    await RisingEdge(dut.clk)
+    await RisingEdge(dut.clk)
+
+
+async def run_test_clear_in_traffic(dut, payload_lengths=None):
+
+    tb = TB(dut)
+
+    await tb.reset()
+
+    async def traffic():
+        for length in payload_lengths():
+            await tb.send(length, ifg=0)
+
+    traffic_task = cocotb.start_soon(traffic())
+
+    # read-and-clear while frames are being counted, nothing may get lost
+    totals = dict.fromkeys(tb.model.counters, 0)
+
+    while not traffic_task.done():
+        dut.stat_snapshot.value = 1
+        dut.stat_clear.value = 1
+        await RisingEdge(dut.clk)
+        dut.stat_snapshot.value = 0
+        dut.stat_clear.value = 0
+        await RisingEdge(dut.clk)
+
+        for name, val in read_counters(dut).items():
+            totals[name] += val
+
+        for _ in range(5):
+            await RisingEdge(dut.clk)
+
+    for name, val in (await tb.snapshot(clear=True)).items():
+        totals[name] += val
+
+    assert totals == tb.model.counters
+
+    await RisingEdge(dut.clk)
+    await RisingEdge(dut.clk)
+
+
+def size_list():
+    return [1, 32, 59, 60, 61] + list(range(120, 128)) + [251, 252, 507, 508, 1019, 1020, 1514, 1515, 9214] + [60]*10
+
+
+def no_errors(k):
+    return False, False
+
+
+def mixed_errors(k):
+    return k % 5 == 2, k % 3 == 1
+
+
+if cocotb.SIM_NAME:
+
+    factory = TestFactory(run_test)
+    factory.add_option("payload_lengths", [size_list])
+    factory.add_option("error_pattern", [no_errors, mixed_errors])
+    factory.generate_tests()
+
+    for test in [run_test_clear, run_test_clear_in_traffic]:
+        factory = TestFactory(test)
+        factory.add_option("payload_lengths", [size_list])
+        factory.generate_tests()
+
+
+# cocotb-test
+
+tests_dir = os.path.dirname(__file__)
+hdl_dir = os.path.abspath(os.path.join(tests_dir, '..', '..', '..', 'hdl', 'eth_stats'))
+
+
+# axis_gmii_rx, axis_xgmii_rx_32 and axis_xgmii_rx_64 outputs
+@pytest.mark.parametrize("keep_width", [1, 4, 8])
+def test_eth_stats_rx(request, keep_width):
+    dut = "eth_stats_rx"
+
+    parameters = {}
+    parameters['KEEP_WIDTH'] = keep_width
+
+    sweep.run(
+        request,
+        toplevel=dut,
+        module=f"{dut}_tb",
+        vhdl_sources=[os.path.join(hdl_dir, f"{dut}.vhd")],
+        parameters=parameters,
+    )
@@ -29,28 +29,44 @@ import logging
 import os
 
 import cocotb_test.simulator
+import pytest
 
 import cocotb
-from cocotb.clock import Clock
-from cocotb.triggers import RisingEdge, Timer
+from cocotb.triggers import RisingEdge
 from cocotb.regression import TestFactory
 
 from cocotbext.axi import AxiStreamSink, AxiStreamBus
 from cocotbext.uart import UartSource
 
+import sweep
+from quiescence import Quiescence
+from trace_recorder import get_recorder, trace_endpoint
+from watchdog import Watchdog, uart_ns
+
 
 class TB:
     def __init__(self, dut, baud=921600):
         self.dut = dut
+        self.baud = baud
+        self.width = len(dut.m_axis_tdata)
 
         self.log = logging.getLogger("cocotb.tb")
-        self.log.setLevel(logging.DEBUG)
+        self.log.setLevel(logging.INFO)
+
+        self.trace = get_recorder().interface("uart_rx")
+
+        # the line is idle between writes, stop the clock over the gaps
+        self.idle = Quiescence(dut.aclk, 10, gate=True).start()
 
-        cocotb.start_soon(Clock(dut.aclk, 10, units="ns").start())
+        self.source = UartSource(dut.rxd, baud=baud, bits=self.width, stop_bits=1)
+        self.source.log.setLevel(logging.WARNING)
 
-        self.source = UartSource(dut.rxd, baud=baud, bits=len(dut.m_axis_tdata), stop_bits=1)
+        self.sink = AxiStreamSink(AxiStreamBus.from_prefix(dut, "m_axis"), dut.aclk, dut.aresetn, reset_active_level=False,
+            byte_size=self.width)
+        trace_endpoint(self.sink, "uart_rx.sink")
 
-        self.sink = AxiStreamSink(AxiStreamBus.from_prefix(dut, "m_axis"), dut.aclk, dut.aresetn, reset_active_level=False)
+        self.idle.watch(self.source, self.sink)
+        self.idle.watch_signal(dut.m_axis_tvalid, 0)
 
         dut.prescale.setimmediatevalue(int(1/10e-9/baud))
 
@@ -62,6 +78,14 @@ class TB:
         await RisingEdge(self.dut.aclk)
         await RisingEdge(self.dut.aclk)
 
+    async def recv(self, length):
+        rx_data = bytearray()
+
+        while len(rx_data) < length:
+            rx_data.extend(await self.sink.read())
+
+        return rx_data
+
 
 async def run_test(dut, payload_lengths=None, payload_data=None):
 
@@ -69,20 +93,27 @@ async def run_test(dut, payload_lengths=None, payload_data=None):
 
     await tb.reset()
 
-    for test_data in [payload_data(x) for x in payload_lengths()]:
+    # characters narrower than DATA_WIDTH = 8 keep the low bits of the payload
+    mask = (1 << tb.width) - 1
+    test_frames = [bytearray(b & mask for b in payload_data(x)) for x in payload_lengths()]
 
-        await tb.source.write(test_data)
+    # each write is followed by a 2 us gap
+    watchdog = Watchdog(tb.log, name="write").start()
+    watchdog.expect([len(x) for x in test_frames], sum(uart_ns(len(x), tb.baud, tb.width + 2) + 2000 for x in test_frames))
 
-        rx_data = bytearray()
+    for test_data in test_frames:
 
-        while len(rx_data) < len(test_data):
-            rx_data.extend(await tb.sink.read())
+        await tb.source.write(test_data)
 
-        tb.log.info("Read data: %s", rx_data)
+        rx_data = await watchdog.recv(tb.recv(len(test_data)))
+
+        tb.trace.frame(rx_data)
 
         assert tb.sink.empty()
 
-        await Timer(2, 'us')
+        await tb.idle.skip_ns(2000)
+
+    tb.idle.report(tb.log)
 
     await RisingEdge(dut.aclk)
     await RisingEdge(dut.aclk)
@@ -117,3 +148,25 @@ if cocotb.SIM_NAME:
     factory.add_option("payload_lengths", [size_list])
     factory.add_option("payload_data", [incrementing_payload, prbs_payload])
     factory.generate_tests()
+
+
+# cocotb-test
+
+tests_dir = os.path.dirname(__file__)
+hdl_dir = os.path.abspath(os.path.join(tests_dir, '..', '..', '..', 'hdl', 'uart'))
+
+
+@pytest.mark.parametrize("data_width", [5, 6, 7, 8], ids=lambda w: f"data_width{w}")
+def test_uart_rx(request, data_width):
+    dut = "uart_rx"
+
+    parameters = {}
+    parameters['DATA_WIDTH'] = data_width
+
+    sweep.run(
+        request,
+        toplevel=dut,
+        module=f"{dut}_tb",
+        vhdl_sources=[os.path.join(hdl_dir, f"{dut}.vhd")],
+        parameters=parameters,
+    )